@@ -0,0 +1,358 @@
+"""
+Micro-benchmarks for pure-CPU paths that run once per article or per title.
+
+Run from the repository root:
+
+    DIGEST_NAME=ai python benchmarks/hot_paths.py
+    DIGEST_NAME=ai python benchmarks/hot_paths.py --save-baseline
+
+Results are compared against `benchmarks/baseline.json` (if present) and the
+script exits with a non-zero code when any benchmark got slower than
+`--tolerance` times its baseline.
+"""
+
+import argparse
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import json
+import os
+from pathlib import Path
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from urllib.parse import urlparse
+
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(_REPO_ROOT / "src"), str(_REPO_ROOT)]
+os.environ.setdefault("DIGEST_NAME", "ai")
+
+from industry_news.digest.article import (  # noqa: E402
+    ArticleMetadata,
+    ArticleSummary,
+    summaries_to_markdown,
+)
+from industry_news.fetcher.extraction import (  # noqa: E402
+    ExtractedPage,
+    TextExtractor,
+    extract_page,
+)
+from industry_news.fetcher.hackernews_api import (  # noqa: E402
+    HackerNewsApi,
+    HackerNewsStory,
+)
+from industry_news.llm import (  # noqa: E402
+    ArticleFiltering,
+    FilterArticlesResponse,
+    TitlesChunk,
+    _pack_titles,
+)
+from industry_news.sources import Source  # noqa: E402
+
+T = TypeVar("T")
+_DEFAULT_SIZES = [1_000, 10_000, 100_000]
+_DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+_WORDS = (
+    "AI startup model open source launch rust python agents GPU inference "
+    "benchmark database compiler security release paper dataset transformer"
+).split()
+_CHUNK_TOKENS = 2000
+_MODEL_NAME = "gpt-4o"
+_TITLES_PER_CHUNK = 150  # Roughly what fits a filter prompt
+_HN_EPOCH = 1704067200
+_HN_STORY_RATIO = 0.1  # Most HN items are comments
+_ARTICLE_PAGE_SIZE = 20_000  # ~35 KB of HTML
+_DOWNLOAD_THREADS = 8
+_EXTRACTION_WORKERS = 4
+_in_thread_extractor = TextExtractor(workers=0)
+_process_extractor = TextExtractor(workers=_EXTRACTION_WORKERS)
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 12)))
+
+
+def _articles(size: int, seed: int = 0) -> List[ArticleMetadata]:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        ArticleMetadata(
+            title=_title(rng),
+            source=Source.REDDIT,
+            url=urlparse(f"https://example.com/{i}"),
+            publication_date_utc=start + timedelta(minutes=i),
+            score=rng.randint(0, 5000),
+            context={"subreddit": rng.choice(["programming", "ml"])},
+        )
+        for i in range(size)
+    ]
+
+
+def _split(items: List[T], size: int) -> List[List[T]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _hn_items(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "by": "user",
+            "id": i,
+            "score": rng.randint(0, 5000),
+            "time": 1704067200 + i,
+            "title": _title(rng),
+            "type": "story",
+            "url": f"https://example.com/{i}",
+        }
+        for i in range(size)
+    ]
+
+
+def _hn_cache_dir(size: int, seed: int = 0) -> Path:
+    """Item backups as `HackerNewsApi` stores them, removed at exit."""
+    rng = random.Random(seed)
+    cache_dir = Path(tempfile.mkdtemp(prefix="hn_items_"))
+    atexit.register(shutil.rmtree, cache_dir, ignore_errors=True)
+    for i in range(size):
+        item: Dict[str, Any] = (
+            {
+                "by": "user",
+                "descendants": rng.randint(0, 500),
+                "id": i,
+                "score": rng.randint(0, 5000),
+                "time": _HN_EPOCH + i,
+                "title": _title(rng),
+                "type": "story",
+                "url": f"https://example.com/{i}",
+            }
+            if rng.random() < _HN_STORY_RATIO
+            else {
+                "by": "user",
+                "id": i,
+                "parent": max(0, i - 1),
+                "text": " ".join(_WORDS),
+                "time": _HN_EPOCH + i,
+                "type": "comment",
+            }
+        )
+        (cache_dir / f"{i}.json").write_text(json.dumps(item))
+    return cache_dir
+
+
+def _decode_hn_items_with_pydantic(
+    cache_dir: Path, size: int
+) -> List[Optional[HackerNewsStory]]:
+    """
+    The decode path `HackerNewsApi._get_story` replaced: every item backup
+    is parsed with `json` and every live story, in the window or not, is
+    validated by pydantic from the raw JSON.
+    """
+    stories: List[Optional[HackerNewsStory]] = []
+    for item_id in range(size):
+        raw: bytes = (cache_dir / f"{item_id}.json").read_bytes()
+        item: Dict[str, Any] = json.loads(raw)
+        stories.append(
+            HackerNewsStory.model_validate_json(raw)
+            if item["type"] == "story"
+            and not item.get("dead")
+            and not item.get("deleted")
+            else None
+        )
+    return stories
+
+
+def _html_page(size: int) -> bytes:
+    paragraphs = "".join(
+        f"<p>{' '.join(_WORDS)} <a href='/{i}'>link</a></p>"
+        for i in range(max(1, size // 100))
+    )
+    return f"<html><body>{paragraphs}</body></html>".encode()
+
+
+def _benchmarks(size: int) -> Dict[str, Callable[[], Any]]:
+    articles: List[ArticleMetadata] = _articles(size)
+    descriptions: List[str] = [metadata.description() for metadata in articles]
+    chunks: List[TitlesChunk] = [
+        TitlesChunk.from_lines(
+            descriptions[start:start + _TITLES_PER_CHUNK],
+            list(range(start, min(start + _TITLES_PER_CHUNK, size))),
+        )
+        for start in range(0, size, _TITLES_PER_CHUNK)
+    ]
+    responses: List[FilterArticlesResponse] = [
+        FilterArticlesResponse(
+            reasonings=["Reason."] * len(chunk),
+            relevant_articles=list(range(1, len(chunk) + 1, 3)),
+        )
+        for chunk in chunks
+    ]
+    reasons_by_index: Dict[int, str] = {
+        index: "Reason." for index in range(0, size, 3)
+    }
+    hn_items: List[Dict[str, Any]] = _hn_items(size)
+    hn_cache_dir: Path = _hn_cache_dir(size)
+    hacker_news = HackerNewsApi(data_backup_path=hn_cache_dir)
+    # Half of the cached items are in the window.
+    hn_since = datetime.fromtimestamp(_HN_EPOCH + size // 4, timezone.utc)
+    hn_until = datetime.fromtimestamp(
+        _HN_EPOCH + size * 3 // 4, timezone.utc
+    )
+    page: bytes = _html_page(size)
+    # Pages extracted by threads downloading them concurrently.
+    article_pages: List[bytes] = [_html_page(_ARTICLE_PAGE_SIZE)] * max(
+        1, size // 500
+    )
+    _process_extractor.extract(page, None)  # Starts the workers
+    summaries: List[ArticleSummary] = [
+        ArticleSummary(metadata, "A summary.") for metadata in articles
+    ]
+
+    return {
+        "ArticleMetadata.description": lambda: [
+            metadata.description() for metadata in articles
+        ],
+        "TitlesChunk.from_lines": lambda: [
+            TitlesChunk.from_lines(lines, list(range(len(lines))))
+            for lines in _split(descriptions, _TITLES_PER_CHUNK)
+        ],
+        "ArticleFiltering._filter_titles_chunk": lambda: [
+            ArticleFiltering._filter_titles_chunk(chunk, response)
+            for chunk, response in zip(chunks, responses)
+        ],
+        "ArticleFiltering._filter_metadata_adding_reasons": lambda: (
+            ArticleFiltering._filter_metadata_adding_reasons(
+                articles, reasons_by_index
+            )
+        ),
+        "llm._pack_titles": lambda: _pack_titles(
+            descriptions,
+            chunk_size=_CHUNK_TOKENS,
+            max_chunks=size,
+            model_name=_MODEL_NAME,
+        ),
+        "HackerNewsStory validation": lambda: [
+            HackerNewsStory(**item) for item in hn_items
+        ],
+        "HackerNewsApi._get_story (cached)": lambda: [
+            hacker_news._get_story(item_id, hn_since, hn_until)
+            for item_id in range(size)
+        ],
+        "HackerNewsStory.model_validate_json (cached)": lambda: (
+            _decode_hn_items_with_pydantic(hn_cache_dir, size)
+        ),
+        "extraction.extract_page": lambda: extract_page(page, None),
+        "TextExtractor in threads": lambda: _extract_concurrently(
+            _in_thread_extractor, article_pages
+        ),
+        f"TextExtractor in {_EXTRACTION_WORKERS} processes": lambda: (
+            _extract_concurrently(_process_extractor, article_pages)
+        ),
+        "summaries_to_markdown": lambda: summaries_to_markdown(summaries),
+    }
+
+
+def _extract_concurrently(
+    extractor: TextExtractor, pages: List[bytes]
+) -> List[Optional[ExtractedPage]]:
+    with ThreadPoolExecutor(max_workers=_DOWNLOAD_THREADS) as executor:
+        return list(
+            executor.map(lambda page: extractor.extract(page, None), pages)
+        )
+
+
+def run(sizes: List[int], repeat: int) -> Dict[str, float]:
+    """
+    Returns:
+        Dict[str, float]: [`<benchmark>@<size>`, best time in seconds]
+    """
+    results: Dict[str, float] = {}
+
+    for size in sizes:
+        for name, benchmark in _benchmarks(size).items():
+            try:
+                best: float = min(
+                    timeit.repeat(benchmark, number=1, repeat=repeat)
+                )
+            except Exception as e:  # E.g. tiktoken encodings not available
+                print(f"{name:<50} {size:>8} skipped: {e!r}"[:120])
+                continue
+            results[f"{name}@{size}"] = best
+            print(f"{name:<50} {size:>8} {best * 1000:>10.2f} ms")
+
+    return results
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], tolerance: float
+) -> List[str]:
+    """
+    Returns:
+        List[str]: Descriptions of benchmarks slower than the baseline.
+    """
+    return [
+        f"{key}: {results[key] * 1000:.2f} ms "
+        f"(baseline {baseline[key] * 1000:.2f} ms)"
+        for key in results
+        if key in baseline and results[key] > baseline[key] * tolerance
+    ]
+
+
+def _load_baseline(path: Path) -> Optional[Dict[str, float]]:
+    if not path.exists():
+        return None
+    with path.open("r") as file:
+        baseline: Dict[str, float] = json.load(file)
+    return baseline
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=_DEFAULT_SIZES
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=Path, default=_DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Overwrite the baseline with the results of this run.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.3,
+        help="Allowed slowdown ratio before a benchmark is reported.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    results: Dict[str, float] = run(args.sizes, args.repeat)
+
+    if args.save_baseline:
+        baseline: Dict[str, float] = _load_baseline(args.baseline) or {}
+        baseline.update(results)
+        with args.baseline.open("w") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    stored_baseline: Optional[Dict[str, float]] = _load_baseline(
+        args.baseline
+    )
+    if stored_baseline is None:
+        print(f"No baseline at {args.baseline}, run with --save-baseline.")
+        return 0
+
+    regressions: List[str] = compare(results, stored_baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
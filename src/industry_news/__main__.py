@@ -1,29 +1,123 @@
 import logging
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import List, Optional, Tuple
 import argparse
 from pathlib import Path
 
-from industry_news.digest.news_digest import NewsDigest
+from industry_news.config import Config, load_config
+from industry_news.deadline import NO_DEADLINE, Deadline, deadline_scope
+from industry_news.digest.news_digest import NewsDigest, backfill_windows
+from industry_news.fetcher.fetch_cache import FetchCache
+from industry_news.profiling import enable_profiling
+from industry_news.service import serve
 
 from industry_news.utils import load_datetime_from_file, write_datetime_to_file
 
 logging.basicConfig(level=logging.INFO)
 
 LAST_DIGEST_END = Path("last_digest_end.txt")
+SERVICE_HOST = "127.0.0.1"
 
 
 def main() -> None:
     default_since: int = _default_since_days()
     args = _parse_args(default_since)
+    if args.serve:
+        serve(
+            args.digests or [load_config().digest.name],
+            host=SERVICE_HOST,
+            port=args.serve,
+        )
+        return
+
     now: datetime = datetime.now().astimezone(timezone.utc)
     until: datetime = now - args.until_days
-    NewsDigest().to_markdown_file(
-        since=now - args.since_days,
-        until=until,
-        output_file=args.output_file
+    if args.profile or args.trace_memory:
+        digest_config = load_config(
+            args.digests[0] if args.digests else None
+        ).digest
+        enable_profiling(
+            output_dir=digest_config.out_path / digest_config.name,
+            cpu=args.profile,
+            memory=args.trace_memory,
+        )
+    deadline: Deadline = (
+        Deadline.after(args.deadline.total_seconds())
+        if args.deadline
+        else NO_DEADLINE
     )
-    write_datetime_to_file(LAST_DIGEST_END, until)
+    with deadline_scope(deadline):
+        if args.backfill:
+            _backfill(
+                args.digests or [load_config().digest.name],
+                backfill_windows(
+                    since=args.backfill[0],
+                    until=args.backfill[1],
+                    window=args.window_days,
+                    stride=args.stride_days or args.window_days,
+                ),
+            )
+            return
+        complete: bool = (
+            _multiple_digests(
+                args.digests, since=now - args.since_days, until=until
+            )
+            if args.digests
+            else NewsDigest().to_markdown_file(
+                since=now - args.since_days,
+                until=until,
+                output_file=args.output_file
+            )
+        )
+    # Otherwise, the next run covers the window again, so sources skipped
+    # by the deadline aren't lost.
+    if complete:
+        write_datetime_to_file(LAST_DIGEST_END, until)
+    else:
+        logging.warning(
+            "Some sources were skipped, %s isn't updated.", LAST_DIGEST_END
+        )
+
+
+def _multiple_digests(
+    digest_names: List[str], since: datetime, until: datetime
+) -> bool:
+    """
+    Builds digests one after another, each with its own prompts and
+    budgets, but fetches every source and article page only once, the
+    latter as configured for the first digest.
+
+    Returns:
+        bool: Whether every digest was complete.
+    """
+    configs: List[Config] = [load_config(name) for name in digest_names]
+    fetch_cache = FetchCache(configs[0].web)
+    complete: bool = True
+    for config in configs:
+        complete &= NewsDigest.for_digest(
+            config, fetch_cache
+        ).to_markdown_file(since=since, until=until)
+    return complete
+
+
+def _backfill(
+    digest_names: List[str], windows: List[Tuple[datetime, datetime]]
+) -> None:
+    """
+    Regenerates past digests. Unlike regular runs, articles written to
+    earlier digests aren't skipped and `LAST_DIGEST_END` isn't updated.
+    Article pages are fetched as configured for the first digest.
+    """
+    configs: List[Config] = [load_config(name) for name in digest_names]
+    fetch_cache = FetchCache(configs[0].web)
+    for config in configs:
+        NewsDigest.for_digest(
+            config, fetch_cache, use_seen_index=False
+        ).backfill(windows)
+
+
+def _utc_date(date: str) -> datetime:
+    return datetime.fromisoformat(date).replace(tzinfo=timezone.utc)
 
 
 def _default_since_days() -> int:
@@ -71,7 +165,95 @@ def _parse_args(default_since: int) -> argparse.Namespace:
             "Defaults to 'news_digest_<since>_<until>.md'."
         ),
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "-d",
+        "--digests",
+        nargs="+",
+        metavar="DIGEST_NAME",
+        help=(
+            "Optional parameter. "
+            "Builds several digests (names of resources directories) in a "
+            "single run, sharing fetched data between them. "
+            "Each digest is written to its default output file."
+        ),
+    )
+    parser.add_argument(
+        "--serve",
+        type=int,
+        metavar="PORT",
+        help=(
+            "Optional parameter. "
+            "Runs a local HTTP service building digests on request instead "
+            "of a single digest. Serves --digests (or the DIGEST_NAME one). "
+            "See industry_news.service for the API."
+        ),
+    )
+    parser.add_argument(
+        "--backfill",
+        nargs=2,
+        type=_utc_date,
+        metavar=("SINCE", "UNTIL"),
+        help=(
+            "Optional parameter. "
+            "Regenerates digests for windows (see --window-days and "
+            "--stride-days) between two dates (YYYY-MM-DD, UTC), written "
+            "to <out_path>/<digest name>/backfill. Each source is fetched "
+            "once for the whole range."
+        ),
+    )
+    parser.add_argument(
+        "--window-days",
+        type=lambda days: timedelta(days=int(days)),
+        default=timedelta(days=7),
+        help=(
+            "Optional parameter. "
+            "The length of each --backfill window. Defaults to 7 days."
+        ),
+    )
+    parser.add_argument(
+        "--stride-days",
+        type=lambda days: timedelta(days=int(days)),
+        help=(
+            "Optional parameter. "
+            "Days between starts of consecutive --backfill windows. "
+            "Defaults to --window-days, i.e. windows don't overlap."
+        ),
+    )
+    parser.add_argument(
+        "--deadline",
+        type=lambda minutes: timedelta(minutes=float(minutes)),
+        metavar="MINUTES",
+        help=(
+            "Optional parameter. "
+            "Finishes the run within this many minutes, skipping summaries "
+            "and sources there is no time left for. Skipped sources are "
+            "listed at the end of the digest."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Optional parameter. "
+            "Dumps a cProfile profile of each fetch/filter/summarize stage "
+            "to <out_path>/<digest name>/profiles."
+        ),
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help=(
+            "Optional parameter. "
+            "Dumps the top allocation sites (tracemalloc) of each stage "
+            "to <out_path>/<digest name>/profiles."
+        ),
+    )
+    args: argparse.Namespace = parser.parse_args()
+    if args.digests and args.output_file:
+        parser.error("--output-file can't be used with --digests.")
+    if args.backfill and args.output_file:
+        parser.error("--output-file can't be used with --backfill.")
+    return args
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 import os
 from decimal import Decimal
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel, SecretStr
 from industry_news.sources import Source
 from industry_news.utils import load_as_yml
@@ -9,11 +9,137 @@ from industry_news.utils import load_as_yml
 # Config
 
 
+class SummaryBatchingConfig(BaseModel):
+    """
+    Short texts are summarized several at a time, sharing prompt
+    instructions and a round-trip.
+    """
+
+    enabled: bool = False
+    # Longer texts are always summarized on their own.
+    short_text_max_chars: int = 4000
+    batch_max_chars: int = 40000
+    batch_max_texts: int = 10
+
+
+class SummaryCompressionConfig(BaseModel):
+    """
+    Long texts are shortened locally, to their most central sentences,
+    before being sent to the summary model.
+    """
+
+    enabled: bool = False
+    max_chars: int = 8000
+    # Only the beginning of longer texts (e.g. whole books as PDFs) is
+    # considered, sentence vectors and similarities grow with the text.
+    max_input_chars: int = 100_000
+    # `textrank` or `tfidf` (similarity to the whole text, cheaper).
+    method: Literal["textrank", "tfidf"] = "textrank"
+
+
+class LLMBackendConfig(BaseModel):
+    """A provider, account and model requests can be routed to."""
+
+    provider: Literal["openai", "vertexai"]
+    model: str
+    # An OpenAI-compatible endpoint instead of OpenAI's, e.g. another
+    # provider or a local server standing in for it.
+    base_url: Optional[str] = None
+    # A key from `llm.openai_api_keys` in secrets. The default key if None.
+    api_key_name: Optional[str] = None
+    # The most calls running at once.
+    max_concurrency: int = 4
+    # The provider's quotas. Calls wait for them instead of being rejected.
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    # What requests routed to the backend may cost in a run, estimated.
+    budget_usd: Optional[Decimal] = None
+    # Of a single HTTP request. Defaults to the model's `timeout_s`.
+    timeout_s: Optional[float] = None
+
+    def label(self) -> str:
+        label: str = f"{self.provider}:{self.model}"
+        if self.base_url:
+            label += f"@{self.base_url}"
+        if self.api_key_name:
+            label += f"/{self.api_key_name}"
+        return label
+
+
+class LLMRoutingConfig(BaseModel):
+    """
+    How requests are balanced between backends of a model. Each request
+    goes to the backend with the lowest expected time to an answer, from
+    its recent latency and error rate, and falls back to others on errors.
+    """
+
+    # Weight of the latest request in moving averages of latency and
+    # errors.
+    smoothing: float = 0.2
+    # Backends failing this many times in a row (or failing before ever
+    # succeeding) are only used if no other backend is available, until the
+    # cooldown passes.
+    failures_to_cool_down: int = 3
+    cooldown_s: float = 60.0
+    # Backends rate-limiting a call (429) get no calls for this long. Calls
+    # are retried on the same backend up to `rate_limit_retries` times.
+    rate_limit_pause_s: float = 10.0
+    rate_limit_retries: int = 3
+
+
 class SummaryModelConfig(BaseModel):
     name: str
     query_cost_limit_usd: Decimal
     cost_per_1k_characters_usd: Decimal
     prompt_to_completion_len_ratio: float
+    timeout_s: float = 60.0
+    batching: SummaryBatchingConfig = SummaryBatchingConfig()
+    compression: SummaryCompressionConfig = SummaryCompressionConfig()
+    # Backends requests are routed to. If empty, the Vertex AI model
+    # `name`. Costs are estimated with this model's prices either way.
+    backends: List[LLMBackendConfig] = []
+
+
+class PreRankingConfig(BaseModel):
+    """
+    A local ranking stage run before the filter model. It's disabled unless
+    `top_k` and/or `min_percentile` is set.
+    """
+
+    top_k: Optional[int] = None
+    # E.g. 90 keeps articles ranked above 90% of the others.
+    min_percentile: Optional[float] = None
+    age_half_life_hours: float = 24.0
+    # None weighs the age decay in windows up to the half-life only.
+    age_weight: Optional[float] = None
+    velocity_weight: float = 1.0
+    comments_weight: float = 0.5
+
+
+class LocalClassifierConfig(BaseModel):
+    """
+    A classifier trained on past filter model verdicts. Articles it's
+    confident about skip the filter model.
+    """
+
+    enabled: bool = False
+    reject_below: float = 0.05
+    accept_above: float = 0.95
+    min_training_examples: int = 2000
+    # The classifier is retrained once this many new articles have verdicts,
+    # or once it's this old and any have.
+    retrain_after_examples: int = 500
+    retrain_after_days: float = 7.0
+    holdout_fraction: float = 0.2
+    # Articles are only decided locally while the classifier, evaluated on
+    # held-out verdicts, accepts with at least this precision and at most
+    # this share of auto-rejected articles were kept by the filter model.
+    min_auto_accepted_precision: float = 0.9
+    max_auto_rejected_kept_ratio: float = 0.02
+    # Share of confidently decided articles sent to the filter model
+    # anyway, so recorded verdicts don't only cover the uncertain band.
+    audit_fraction: float = 0.05
+    feature_bits: int = 18
 
 
 class FilterModelConfig(BaseModel):
@@ -21,15 +147,56 @@ class FilterModelConfig(BaseModel):
     query_cost_limit_usd: Decimal
     prompt_to_completion_len_ratio: float
     context_size_limit: int
+    timeout_s: float = 120.0
+    # Price of a prompt token served from the provider's prompt cache
+    # relative to a regular one.
+    cached_prompt_price_ratio: float = 0.5
+    # When a limit of articles is passed, filtering stops once this many
+    # more articles than the limit are accepted. None filters everything.
+    early_stop_margin: Optional[int] = 5
+    pre_ranking: PreRankingConfig = PreRankingConfig()
+    local_classifier: LocalClassifierConfig = LocalClassifierConfig()
+    # Backends requests are routed to, all with OpenAI's chat API. If
+    # empty, the OpenAI model `name`. Costs, context size and tokens are
+    # calculated for this model either way.
+    backends: List[LLMBackendConfig] = []
 
 
 class LLMConfig(BaseModel):
     filter_model: FilterModelConfig
     summary_model: SummaryModelConfig
+    routing: LLMRoutingConfig = LLMRoutingConfig()
+
+
+class PageQualityConfig(BaseModel):
+    """
+    Downloaded pages that aren't articles (bot checks, paywall stubs, cookie
+    walls, link lists, etc.) are skipped instead of summarized.
+    """
+
+    enabled: bool = False
+    min_words: int = 80
+    # Share of the text's characters that are link anchors.
+    max_link_density: float = 0.5
+
+
+class PdfConfig(BaseModel):
+    """Limits of reading linked PDFs (papers, etc.), per document."""
+
+    max_pages: int = 8
+    max_chars: int = 30000
+    # Larger PDFs aren't downloaded completely and are skipped.
+    max_bytes: int = 20_000_000
+    max_seconds: float = 10.0
 
 
 class WebConfig(BaseModel):
     user_agent: str
+    # Processes extracting text from downloaded pages, at most one less
+    # than available CPUs. 0 extracts it in the downloading thread.
+    extraction_workers: int = 0
+    page_quality: PageQualityConfig = PageQualityConfig()
+    pdf: PdfConfig = PdfConfig()
 
 
 class SingleSourceConfig(BaseModel):
@@ -41,11 +208,31 @@ class SourcesConfig(BaseModel):
     with_summary: List[SingleSourceConfig]
     without_summary: List[SingleSourceConfig]
     articles_per_source_limit: int
+    # How long fetching, filtering and summarizing articles from a single
+    # source + subspace may take. Work left after that is skipped.
+    per_source_time_budget_s: Optional[float] = None
+    # Stored Hacker News and Reddit items that were younger than this when
+    # fetched get their scores refreshed by later runs. Older ones are
+    # assumed to be settled. None disables refreshing.
+    score_refresh_age_h: Optional[float] = None
+
+
+class SeenIndexConfig(BaseModel):
+    """
+    An index of articles included in earlier digests. Such articles are
+    skipped before filtering.
+    """
+
+    enabled: bool = False
+    retention_days: int = 90
+    expected_articles: int = 100_000
+    false_positive_rate: float = 0.01
 
 
 class DigestConfig(BaseModel):
     out_path: Path
     name: str
+    seen_index: SeenIndexConfig = SeenIndexConfig()
 
 
 class Config(BaseModel):
@@ -55,17 +242,21 @@ class Config(BaseModel):
     digest: DigestConfig
 
 
-_config: Optional[Config] = None
+_configs: Dict[str, Config] = {}
 
 
-def load_config() -> Config:
-    global _config
-    if _config is None:
-        # This is a hacky solution, replace it with proper
-        # config injection.
-        digest_name: str = os.environ["DIGEST_NAME"]
-        _config = Config(**load_as_yml(f"{digest_name}/config.yml"))
-    return _config
+def load_config(digest_name: Optional[str] = None) -> Config:
+    """
+    Args:
+        digest_name: A resources directory of the digest. Defaults to the
+        `DIGEST_NAME` env variable.
+    """
+    # This is a hacky solution, replace it with proper
+    # config injection.
+    name: str = digest_name or os.environ["DIGEST_NAME"]
+    if name not in _configs:
+        _configs[name] = Config(**load_as_yml(f"{name}/config.yml"))
+    return _configs[name]
 
 
 # Secrets
@@ -74,6 +265,9 @@ def load_config() -> Config:
 class LLMSecrets(BaseModel):
     openai_api_key: SecretStr
     service_account_file_path: Path
+    # Keys of other accounts (or OpenAI-compatible providers) by name, see
+    # `LLMBackendConfig.api_key_name`.
+    openai_api_keys: Dict[str, SecretStr] = {}
 
 
 class RedditSecrets(BaseModel):
@@ -0,0 +1,118 @@
+from concurrent import futures
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import partial
+import math
+import time
+from typing import Callable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Calls that time out keep running in the background (clients should time
+# them out too), so the pool should be large enough not to be exhausted by
+# a few hung calls.
+_TIMEOUT_POOL_SIZE = 8
+_timeout_pool: Optional[ThreadPoolExecutor] = None
+
+
+class Deadline:
+    """A point in time (monotonic clock) after which work should stop."""
+
+    def __init__(self, at: float = math.inf) -> None:
+        self._at = at
+
+    @staticmethod
+    def after(seconds: float) -> "Deadline":
+        return Deadline(time.monotonic() + seconds)
+
+    def remaining_s(self) -> float:
+        return max(self._at - time.monotonic(), 0.0)
+
+    def expired(self, reserve_s: float = 0.0) -> bool:
+        """
+        Args:
+            reserve_s: Treats the deadline as expired this many seconds
+            earlier, e.g. to leave time for writing results.
+        """
+        return self.remaining_s() <= reserve_s
+
+    def is_set(self) -> bool:
+        return self._at != math.inf
+
+    def earlier(self, seconds: Optional[float]) -> "Deadline":
+        """
+        Returns:
+            Deadline: This deadline or one `seconds` from now, whichever
+            comes first.
+        """
+        if seconds is None:
+            return self
+        return Deadline(min(self._at, time.monotonic() + seconds))
+
+    def reserving(self, seconds: float) -> "Deadline":
+        """The same deadline, `seconds` earlier."""
+        return Deadline(self._at - seconds)
+
+    def timeout_s(self, default_s: float) -> float:
+        """A timeout for a single call that doesn't exceed the deadline."""
+        return min(default_s, self.remaining_s())
+
+
+NO_DEADLINE = Deadline()
+_current_deadline: ContextVar[Deadline] = ContextVar(
+    "current_deadline", default=NO_DEADLINE
+)
+
+
+def current_deadline() -> Deadline:
+    """
+    The deadline of the innermost :py:func:`deadline_scope`. Long-running
+    loops (walking a source, summarizing articles, etc.) check it to stop
+    early instead of having it threaded through every signature.
+    """
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline) -> Iterator[Deadline]:
+    """Nested scopes can only make the deadline earlier."""
+    outer: Deadline = _current_deadline.get()
+    effective: Deadline = deadline if deadline._at < outer._at else outer
+    token = _current_deadline.set(effective)
+    try:
+        yield effective
+    finally:
+        _current_deadline.reset(token)
+
+
+def call_with_timeout(func: Callable[[], T], timeout_s: float) -> T:
+    """
+    For clients without a reliable timeout of their own. The call is
+    abandoned, not cancelled, once `timeout_s` passes. If it's still queued
+    behind hung calls by then, or the current deadline has passed, it
+    doesn't start at all.
+
+    Raises:
+        concurrent.futures.TimeoutError
+    """
+    global _timeout_pool
+    if _timeout_pool is None:
+        _timeout_pool = ThreadPoolExecutor(
+            max_workers=_TIMEOUT_POOL_SIZE, thread_name_prefix="timeout"
+        )
+    context = copy_context()
+    future: "Future[T]" = _timeout_pool.submit(
+        context.run,
+        partial(_unless_abandoned, func, time.monotonic() + timeout_s),
+    )
+    return future.result(timeout=timeout_s)
+
+
+def _unless_abandoned(func: Callable[[], T], abandoned_at: float) -> T:
+    """Runs in the caller's context, so it sees the caller's deadline."""
+    if time.monotonic() >= abandoned_at or current_deadline().expired():
+        raise futures.TimeoutError(
+            "The call was abandoned before it started."
+        )
+    return func()
@@ -1,22 +1,73 @@
-from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional
-from urllib.parse import ParseResult
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+from urllib.parse import ParseResult, urlparse
 
 from industry_news.sources import Source
 from industry_news import markdown as md
 
+# Shared by all articles without context instead of allocating a new dict for
+# each one.
+_NO_CONTEXT: Mapping[str, str] = MappingProxyType({})
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class ArticleMetadata:
     title: str
     source: Source
     url: ParseResult
     publication_date_utc: datetime
     score: int
-    context: Dict[str, str] = field(default_factory=lambda: defaultdict(str))
+    comments: int = 0
+    context: Mapping[str, str] = field(default_factory=lambda: _NO_CONTEXT)
     why_is_relevant: Optional[str] = None
+    # A source-native id (a Hacker News item id, a Reddit fullname, etc.),
+    # used to refresh the score. Not shown to the filter model.
+    source_id: Optional[str] = None
+
+    def with_reason(self, why_is_relevant: str) -> "ArticleMetadata":
+        """A cheaper equivalent of `dataclasses.replace`, which introspects
+        all fields on every call."""
+        return ArticleMetadata(
+            self.title,
+            self.source,
+            self.url,
+            self.publication_date_utc,
+            self.score,
+            self.comments,
+            self.context,
+            why_is_relevant,
+            self.source_id,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """A JSON-serializable form, without `why_is_relevant`."""
+        return {
+            "title": self.title,
+            "source": self.source.value,
+            "url": self.url.geturl(),
+            "publication_date_utc": self.publication_date_utc.isoformat(),
+            "score": self.score,
+            "comments": self.comments,
+            "context": dict(self.context),
+            "source_id": self.source_id,
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "ArticleMetadata":
+        return ArticleMetadata(
+            title=data["title"],
+            source=Source(data["source"]),
+            url=urlparse(data["url"]),
+            publication_date_utc=datetime.fromisoformat(
+                data["publication_date_utc"]
+            ),
+            score=data["score"],
+            comments=data.get("comments", 0),
+            context=data.get("context") or _NO_CONTEXT,
+            source_id=data.get("source_id"),
+        )
 
     def description(self) -> str:
         context_str: str = " ".join(
@@ -24,16 +75,22 @@ class ArticleMetadata:
         )
         return f"Title: {self.title}. {context_str}"
 
-    @staticmethod
-    def title_from_description(description: str) -> str:
-        return description.split("Title: ")[1].split(".")[0]
-
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ArticleSummary:
     metadata: ArticleMetadata
     summary: str
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {"metadata": self.metadata.to_dict(), "summary": self.summary}
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "ArticleSummary":
+        return ArticleSummary(
+            metadata=ArticleMetadata.from_dict(data["metadata"]),
+            summary=data["summary"],
+        )
+
     def to_markdown_str(self) -> str:
         title_link: str = md.link(
             f"[{self.metadata.score}] {self.metadata.title}",
@@ -46,5 +103,29 @@ class ArticleSummary:
         return f"{title_header}\n" f"{collapsible_summary}"
 
 
+@dataclass(frozen=True, slots=True)
+class SkippedArticle:
+    """An article that made the cut, but had nothing worth summarizing."""
+
+    metadata: ArticleMetadata
+    # E.g. "a paywall" or "download failed".
+    reason: str
+
+    def to_markdown_str(self) -> str:
+        title_link: str = md.link(
+            f"[{self.metadata.score}] {self.metadata.title}",
+            self.metadata.url.geturl(),
+        )
+        return f"- {title_link}: {self.reason}"
+
+
 def summaries_to_markdown(summaries: List[ArticleSummary]) -> str:
     return "\n\n".join([summary.to_markdown_str() for summary in summaries])
+
+
+def skipped_to_markdown(skipped: Sequence[SkippedArticle]) -> str:
+    # A blank line first, so the list inside HTML is rendered as Markdown.
+    return md.collapsible_section(
+        "\n" + "\n".join(article.to_markdown_str() for article in skipped),
+        f"Skipped articles ({len(skipped)})",
+    )
@@ -0,0 +1,260 @@
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import sys
+from typing import Iterator, List, Mapping, Optional, Sequence
+from urllib.parse import ParseResult, urlparse
+
+import numpy as np
+import numpy.typing as npt
+
+from industry_news.digest.article import ArticleMetadata
+from industry_news.sources import Source
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_SOURCES: List[Source] = list(Source)
+_SOURCE_CODES: Mapping[Source, int] = {
+    source: code for code, source in enumerate(_SOURCES)
+}
+_URL_CACHE_SIZE = 4096
+
+Indices = npt.NDArray[np.intp]
+
+
+class ArticleBatch:
+    """
+    A column-oriented, read-only collection of articles for bulk stages
+    (ranking, sorting, top-k) on large fetch windows.
+
+    Scores and publication dates live in NumPy arrays, sources and subspaces
+    are stored as small integer codes into interned string tables and URLs
+    are kept as strings and parsed only when an article is materialized.
+    Sorting and filtering produce a new index array over the same columns
+    instead of copying articles.
+    """
+
+    __slots__ = (
+        "_titles",
+        "_urls",
+        "_contexts",
+        "_reasons",
+        "_source_codes",
+        "_subspace_codes",
+        "_subspaces",
+        "_scores",
+        "_comments",
+        "_timestamps_us",
+        "_source_ids",
+        "_rows",
+    )
+
+    def __init__(
+        self,
+        titles: List[str],
+        urls: List[str],
+        contexts: List[Mapping[str, str]],
+        reasons: List[Optional[str]],
+        source_codes: npt.NDArray[np.int8],
+        subspace_codes: npt.NDArray[np.int32],
+        subspaces: List[Optional[str]],
+        scores: npt.NDArray[np.int64],
+        comments: npt.NDArray[np.int64],
+        timestamps_us: npt.NDArray[np.int64],
+        source_ids: List[Optional[str]],
+        rows: Optional[Indices] = None,
+    ) -> None:
+        """Use :py:meth:`from_metadata` unless you already have columns."""
+        self._titles = titles
+        self._urls = urls
+        self._contexts = contexts
+        self._reasons = reasons
+        self._source_codes = source_codes
+        self._subspace_codes = subspace_codes
+        self._subspaces = subspaces
+        self._scores = scores
+        self._comments = comments
+        self._timestamps_us = timestamps_us
+        self._source_ids = source_ids
+        self._rows: Indices = (
+            rows if rows is not None else np.arange(len(titles), dtype=np.intp)
+        )
+
+    @classmethod
+    def from_metadata(
+        cls,
+        articles: Sequence[ArticleMetadata],
+        subspaces: Optional[Sequence[Optional[str]]] = None,
+    ) -> "ArticleBatch":
+        """
+        Args:
+            subspaces: A subspace (subreddit, category, etc.) per article.
+            Defaults to no subspace for every article.
+        """
+        subspace_table: List[Optional[str]] = []
+        subspace_lookup: dict[Optional[str], int] = {}
+        subspace_codes = np.empty(len(articles), dtype=np.int32)
+
+        for i in range(len(articles)):
+            subspace: Optional[str] = subspaces[i] if subspaces else None
+            if subspace is not None:
+                subspace = sys.intern(subspace)
+            code: Optional[int] = subspace_lookup.get(subspace)
+            if code is None:
+                code = subspace_lookup[subspace] = len(subspace_table)
+                subspace_table.append(subspace)
+            subspace_codes[i] = code
+
+        return cls(
+            titles=[article.title for article in articles],
+            urls=[article.url.geturl() for article in articles],
+            contexts=[article.context for article in articles],
+            reasons=[article.why_is_relevant for article in articles],
+            source_codes=np.fromiter(
+                (_SOURCE_CODES[article.source] for article in articles),
+                dtype=np.int8,
+                count=len(articles),
+            ),
+            subspace_codes=subspace_codes,
+            subspaces=subspace_table,
+            scores=np.fromiter(
+                (article.score for article in articles),
+                dtype=np.int64,
+                count=len(articles),
+            ),
+            comments=np.fromiter(
+                (article.comments for article in articles),
+                dtype=np.int64,
+                count=len(articles),
+            ),
+            timestamps_us=np.fromiter(
+                (
+                    _to_timestamp_us(article.publication_date_utc)
+                    for article in articles
+                ),
+                dtype=np.int64,
+                count=len(articles),
+            ),
+            source_ids=[article.source_id for article in articles],
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[ArticleMetadata]:
+        return (self._materialize(row) for row in self._rows)
+
+    def __getitem__(self, position: int) -> ArticleMetadata:
+        return self._materialize(int(self._rows[position]))
+
+    @property
+    def scores(self) -> npt.NDArray[np.int64]:
+        return self._scores[self._rows]
+
+    @property
+    def comments(self) -> npt.NDArray[np.int64]:
+        return self._comments[self._rows]
+
+    @property
+    def timestamps_us(self) -> npt.NDArray[np.int64]:
+        """Publication dates as microseconds since the Unix epoch (UTC)."""
+        return self._timestamps_us[self._rows]
+
+    @property
+    def source_codes(self) -> npt.NDArray[np.int8]:
+        """Codes of :py:class:`Source` members in definition order."""
+        return self._source_codes[self._rows]
+
+    @property
+    def subspace_codes(self) -> npt.NDArray[np.int32]:
+        return self._subspace_codes[self._rows]
+
+    def titles(self) -> List[str]:
+        return [self._titles[row] for row in self._rows]
+
+    def take(self, positions: Indices) -> "ArticleBatch":
+        """
+        Returns:
+            ArticleBatch: A batch sharing columns with this one, containing
+            articles at `positions` (relative to this batch) in that order.
+        """
+        return ArticleBatch(
+            self._titles,
+            self._urls,
+            self._contexts,
+            self._reasons,
+            self._source_codes,
+            self._subspace_codes,
+            self._subspaces,
+            self._scores,
+            self._comments,
+            self._timestamps_us,
+            self._source_ids,
+            self._rows[positions],
+        )
+
+    def filter(self, mask: npt.NDArray[np.bool_]) -> "ArticleBatch":
+        return self.take(np.flatnonzero(mask))
+
+    def sorted_by_score(self, descending: bool = True) -> "ArticleBatch":
+        # A stable sort keeps the fetch order for equal scores, just like
+        # `sorted` does for lists of articles.
+        keys: npt.NDArray[np.int64] = (
+            -self.scores if descending else self.scores
+        )
+        return self.take(np.argsort(keys, kind="stable"))
+
+    def top_k(self, k: int) -> "ArticleBatch":
+        """
+        Returns:
+            ArticleBatch: At most `k` articles with the highest scores, sorted
+            in descending order by score.
+        """
+        if k >= len(self):
+            return self.sorted_by_score()
+        if k <= 0:
+            return self.take(np.empty(0, dtype=np.intp))
+
+        scores: npt.NDArray[np.int64] = self.scores
+        kth_score: np.int64 = np.partition(scores, len(scores) - k)[
+            len(scores) - k
+        ]
+        above: Indices = np.flatnonzero(scores > kth_score)
+        # Same tie-breaking as `sorted_by_score()[:k]`: earlier articles win.
+        ties: Indices = np.flatnonzero(scores == kth_score)[: k - len(above)]
+        candidates: Indices = np.sort(np.concatenate((above, ties)))
+        order: Indices = np.argsort(-scores[candidates], kind="stable")
+        return self.take(candidates[order])
+
+    def to_metadata(self) -> List[ArticleMetadata]:
+        return list(self)
+
+    def subspace(self, position: int) -> Optional[str]:
+        code: int = int(self._subspace_codes[self._rows[position]])
+        return self._subspaces[code]
+
+    def _materialize(self, row: int) -> ArticleMetadata:
+        return ArticleMetadata(
+            title=self._titles[row],
+            source=_SOURCES[self._source_codes[row]],
+            url=_parse_url(self._urls[row]),
+            publication_date_utc=_from_timestamp_us(
+                int(self._timestamps_us[row])
+            ),
+            score=int(self._scores[row]),
+            comments=int(self._comments[row]),
+            context=self._contexts[row],
+            why_is_relevant=self._reasons[row],
+            source_id=self._source_ids[row],
+        )
+
+
+def _to_timestamp_us(date_time: datetime) -> int:
+    return (date_time - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_timestamp_us(timestamp_us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=timestamp_us)
+
+
+@lru_cache(maxsize=_URL_CACHE_SIZE)
+def _parse_url(url: str) -> ParseResult:
+    return urlparse(url)
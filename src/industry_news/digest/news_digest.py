@@ -1,52 +1,232 @@
-from dataclasses import dataclass, field
-from datetime import datetime
+import asyncio
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import partial
+import logging
 from pathlib import Path
-from typing import List, Optional
-from industry_news.config import load_config
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+from industry_news.config import Config, load_config
+from industry_news.deadline import current_deadline, deadline_scope
 from industry_news.digest.article import (
     ArticleMetadata,
     ArticleSummary,
+    SkippedArticle,
+    skipped_to_markdown,
     summaries_to_markdown,
 )
+from industry_news.digest.seen_index import SeenArticleIndex
 from industry_news.fetcher.fetcher import (
     Fetcher,
     MetadataFetcher,
+    SiteText,
     SummaryFetcher,
-    fetch_site_text,
 )
+from industry_news.fetcher.fetch_cache import FetchCache
 from industry_news.fetcher.fetchers_init import (
     init_metadata_fetchers,
     init_summary_fetchers,
 )
 from industry_news.llm import ArticleFiltering, TextSummarizer
 from industry_news.markdown import header
+from industry_news.profiling import profiled_stage
 from industry_news.utils import fail_gracefully
 
 
+_LOGGER = logging.getLogger(__name__)
+# Time left for writing results once the deadline is reached.
+_OUTPUT_RESERVE_S = 5.0
+# Streamed articles are checked against the seen index and prepared for
+# filtering this many at a time.
+_STREAM_BATCH_SIZE = 200
+T = TypeVar("T")
+
+
+def _seen_index(config: Config) -> Optional[SeenArticleIndex]:
+    if not config.digest.seen_index.enabled:
+        return None
+    return SeenArticleIndex(
+        data_dir=config.digest.out_path / "data" / "seen",
+        digest_name=config.digest.name,
+        config=config.digest.seen_index,
+    )
+
+
+def backfill_windows(
+    since: datetime, until: datetime, window: timedelta, stride: timedelta
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Windows of length `window` starting every `stride` from `since`, until
+    one reaches `until`. The last one is cut off at `until`.
+
+    Raises:
+        ValueError: If `window` or `stride` isn't positive.
+    """
+    if window <= timedelta(0) or stride <= timedelta(0):
+        raise ValueError("Backfill window and stride must be positive.")
+    windows: List[Tuple[datetime, datetime]] = []
+    window_since: datetime = since
+    while window_since < until:
+        window_until: datetime = min(window_since + window, until)
+        windows.append((window_since, window_until))
+        if window_until == until:
+            break
+        window_since += stride
+    return windows
+
+
 @dataclass(frozen=True, eq=False, match_args=False)
 class NewsDigest:
 
-    _text_summarizer: TextSummarizer = TextSummarizer()
-    _article_filtering: ArticleFiltering = ArticleFiltering()
+    _text_summarizer: TextSummarizer = field(default_factory=TextSummarizer)
+    _article_filtering: ArticleFiltering = field(
+        default_factory=ArticleFiltering
+    )
     _summary_fetchers: List[SummaryFetcher] = field(
-        default_factory=lambda: init_summary_fetchers(load_config().sources)
+        default_factory=lambda: init_summary_fetchers(load_config())
     )
     _metadata_fetchers: List[MetadataFetcher] = field(
-        default_factory=lambda: init_metadata_fetchers(load_config().sources)
+        default_factory=lambda: init_metadata_fetchers(load_config())
     )
     _output_dir: Path = field(
         default_factory=lambda: load_config().digest.out_path / load_config().digest.name
     )
+    _fetch_cache: FetchCache = field(
+        default_factory=lambda: FetchCache(load_config().web)
+    )
+    _per_source_time_budget_s: Optional[float] = field(
+        default_factory=lambda: (
+            load_config().sources.per_source_time_budget_s
+        )
+    )
+    _seen_index: Optional[SeenArticleIndex] = field(
+        default_factory=lambda: _seen_index(load_config())
+    )
+    _articles_per_source_limit: int = field(
+        default_factory=lambda: (
+            load_config().sources.articles_per_source_limit
+        )
+    )
+
+    @classmethod
+    def for_digest(
+        cls,
+        config: Config,
+        fetch_cache: Optional[FetchCache] = None,
+        use_seen_index: bool = True,
+    ) -> "NewsDigest":
+        """
+        Builds a digest from a config other than the one selected by the
+        `DIGEST_NAME` env variable. Digests sharing `fetch_cache` fetch each
+        source and article only once.
+
+        Args:
+            use_seen_index: False to include articles written to earlier
+            digests (and not mark written ones), e.g. when regenerating
+            past digests.
+        """
+        return cls(
+            _text_summarizer=TextSummarizer.for_digest(config),
+            _article_filtering=ArticleFiltering.for_digest(config),
+            _summary_fetchers=init_summary_fetchers(config),
+            _metadata_fetchers=init_metadata_fetchers(config),
+            _output_dir=config.digest.out_path / config.digest.name,
+            _fetch_cache=fetch_cache or FetchCache(config.web),
+            _per_source_time_budget_s=(
+                config.sources.per_source_time_budget_s
+            ),
+            _seen_index=_seen_index(config) if use_seen_index else None,
+            _articles_per_source_limit=(
+                config.sources.articles_per_source_limit
+            ),
+        )
+
+    def for_new_job(self) -> "NewsDigest":
+        """
+        A copy for a single request of a long-lived process, with its own
+        fetch cache and filter verdicts. LLM clients and fetchers are
+        shared.
+        """
+        return replace(
+            self,
+            _fetch_cache=FetchCache(
+                self._fetch_cache.web_config, self._fetch_cache.executor
+            ),
+            _article_filtering=self._article_filtering.for_new_job(),
+        )
+
+    def backfill(
+        self,
+        windows: List[Tuple[datetime, datetime]],
+        articles_per_source_limit: Optional[int] = None,
+    ) -> List[Path]:
+        """
+        Builds a digest for each of `windows`, written to
+        `<output dir>/backfill` (replacing earlier backfills of the same
+        windows). Each source is fetched once for the union of the windows
+        and partitioned in memory. Downloaded articles and filter model
+        verdicts are reused wherever windows overlap.
+
+        Returns:
+            List[Path]: Output files, one per window.
+        """
+        if not windows:
+            return []
+        self._prefetch(
+            since=min(since for since, _ in windows),
+            until=max(until for _, until in windows),
+        )
+
+        output_files: List[Path] = []
+        for since, until in windows:
+            output_file: Path = (
+                self._output_dir
+                / "backfill"
+                / self._output_file(since, until).name
+            )
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            # Digests are appended to output files section by section.
+            output_file.unlink(missing_ok=True)
+            _LOGGER.info("Backfilling %s - %s.", since, until)
+            self.to_markdown_file(
+                since, until, output_file, articles_per_source_limit
+            )
+            output_files.append(output_file)
+        return output_files
+
+    def _prefetch(self, since: datetime, until: datetime) -> None:
+        """Fills the fetch cache, so windows within [since, until] are
+        served from memory."""
+        for summary_fetcher in self._summary_fetchers:
+            fail_gracefully(
+                lambda: self._fetch_cache.article_summaries(
+                    summary_fetcher, since, until
+                )
+            )
+        for metadata_fetcher in self._metadata_fetchers:
+            fail_gracefully(
+                lambda: self._fetch_cache.articles_metadata(
+                    metadata_fetcher, since, until
+                )
+            )
 
     def to_markdown_file(
         self,
         since: datetime,
         until: Optional[datetime] = None,
         output_file: Optional[Path] = None,
-        articles_per_source_limit: int = (
-            load_config().sources.articles_per_source_limit
-        ),
-    ) -> None:
+        articles_per_source_limit: Optional[int] = None,
+    ) -> bool:
         """Fetches articles from sources defined in _summary_fetchers and
         _metadata_fetchers. Filters out articles that do not meet the criteria,
         summarizes those that remained (if necessary) and writes results to a
@@ -58,7 +238,17 @@ class NewsDigest:
             subspace(subreddit, category, etc). The actual number of fetched
             and summarized articles will be larger.
 
-            Defaults to `articles_per_source_limit` config value.
+            Defaults to the digest's `articles_per_source_limit` config
+            value.
+
+        Stops before the current deadline (see
+        :py:mod:`industry_news.deadline`), skipping sources there is no time
+        left for and listing them at the end of the file, along with ones
+        whose deadline (or time budget) was reached while processing them.
+
+        Returns:
+            bool: False if any source was skipped or cut short, i.e. a
+            later run should cover the window again.
         """
         if not until:
             until = datetime.now()
@@ -66,13 +256,33 @@ class NewsDigest:
         if not output_file:
             output_file = self._output_file(since, until)
 
-        self._from_sources_without_summaries(
-            since, until, output_file, articles_per_source_limit
-        )
+        if articles_per_source_limit is None:
+            articles_per_source_limit = self._articles_per_source_limit
 
-        self._from_sources_providing_summaries(
-            since, until, output_file, articles_per_source_limit
-        )
+        skipped: List[Fetcher] = []
+        cut_short: List[Fetcher] = []
+        with deadline_scope(current_deadline().reserving(_OUTPUT_RESERVE_S)):
+            self._from_sources_without_summaries(
+                since,
+                until,
+                output_file,
+                articles_per_source_limit,
+                skipped,
+                cut_short,
+            )
+
+            self._from_sources_providing_summaries(
+                since,
+                until,
+                output_file,
+                articles_per_source_limit,
+                skipped,
+                cut_short,
+            )
+
+        if skipped or cut_short:
+            NewsDigest._write_skipped_to_file(output_file, skipped, cut_short)
+        return not skipped and not cut_short
 
     def _from_sources_providing_summaries(
         self,
@@ -80,21 +290,43 @@ class NewsDigest:
         until: datetime,
         output_file: Path,
         articles_per_source_limit: int,
+        skipped: List[Fetcher],
+        cut_short: List[Fetcher],
     ) -> None:
         for summary_fetcher in self._summary_fetchers:
-            summaries: List[ArticleSummary] = (
-                summary_fetcher.article_summaries(since, until)
-            )
+            if current_deadline().expired():
+                skipped.append(summary_fetcher)
+                continue
 
-            filtered_summaries: List[ArticleSummary] = (
-                self._article_filtering.filter_summaries(summaries)
-            )
+            stage: str = NewsDigest._stage_name(summary_fetcher)
+            with deadline_scope(
+                current_deadline().earlier(self._per_source_time_budget_s)
+            ):
+                with profiled_stage(f"{stage}_fetch"):
+                    summaries: List[ArticleSummary] = asyncio.run(
+                        self._collected_unseen(
+                            self._fetch_cache.stream_article_summaries(
+                                summary_fetcher, since, until
+                            ),
+                            lambda summary: summary.metadata,
+                            self._shortlisted_summaries,
+                        )
+                    )
+
+                with profiled_stage(f"{stage}_filter"):
+                    filtered_summaries: List[ArticleSummary] = (
+                        self._article_filtering.filter_summaries(
+                            summaries, limit=articles_per_source_limit
+                        )
+                    )
+                if current_deadline().expired():
+                    cut_short.append(summary_fetcher)
             filtered_summaries = filtered_summaries[:articles_per_source_limit]
 
             # Make sure we write to a file after processing each source, so we
             # can preserve some results even in case of a failure.
             if filtered_summaries:
-                NewsDigest._write_markdown_to_file(
+                self._write_markdown_to_file(
                     summary_fetcher, output_file, filtered_summaries
                 )
 
@@ -104,32 +336,134 @@ class NewsDigest:
         until: datetime,
         output_file: Path,
         articles_per_source_limit: int,
+        skipped: List[Fetcher],
+        cut_short: List[Fetcher],
     ) -> None:
         for metadata_fetcher in self._metadata_fetchers:
-            summaries: Optional[List[ArticleSummary]] = fail_gracefully(
-                lambda: self._fetch_and_summarize(
-                    metadata_fetcher, since, until, articles_per_source_limit
+            if current_deadline().expired():
+                skipped.append(metadata_fetcher)
+                continue
+
+            with deadline_scope(
+                current_deadline().earlier(self._per_source_time_budget_s)
+            ):
+                results: Optional[
+                    Tuple[List[ArticleSummary], List[SkippedArticle]]
+                ] = fail_gracefully(
+                    lambda: self._fetch_and_summarize(
+                        metadata_fetcher,
+                        since,
+                        until,
+                        articles_per_source_limit,
+                    )
                 )
-            )
+                if current_deadline().expired():
+                    cut_short.append(metadata_fetcher)
 
             # Make sure we write to a file after processing each source, so we
             # can preserve some results even in case of a failure.
-            if summaries:
-                NewsDigest._write_markdown_to_file(
-                    metadata_fetcher, output_file, summaries
+            if results and (results[0] or results[1]):
+                self._write_markdown_to_file(
+                    metadata_fetcher, output_file, *results
                 )
 
-    @staticmethod
     def _write_markdown_to_file(
-        fetcher: Fetcher, output_file: Path, summaries: List[ArticleSummary]
+        self,
+        fetcher: Fetcher,
+        output_file: Path,
+        summaries: List[ArticleSummary],
+        skipped: Sequence[SkippedArticle] = (),
     ) -> None:
-        subspace: str = f": {fetcher.subspace()}" if fetcher.subspace() else ""
+        """
+        Written articles are skipped by later digests, unlike the listed
+        `skipped` ones (e.g. paywalled), which may be readable later.
+        """
         section_header: str = header(
-            f"{fetcher.source().value}{subspace}", level=2
+            NewsDigest._display_name(fetcher), level=2
         )
         articles_markdown_str: str = summaries_to_markdown(summaries)
+        if skipped:
+            articles_markdown_str += "\n\n" + skipped_to_markdown(skipped)
         with output_file.open("a") as file:
             file.write(f"{section_header}\n{articles_markdown_str}\n\n")
+        if self._seen_index is not None:
+            self._seen_index.add(summary.metadata for summary in summaries)
+
+    async def _collected_unseen(
+        self,
+        articles: AsyncIterator[T],
+        metadata: Callable[[T], ArticleMetadata],
+        shortlist: Callable[[List[T], List[T]], List[T]],
+    ) -> List[T]:
+        """
+        Collects articles streamed from a source, skipping ones included in
+        earlier digests. Batches of them are shortlisted for filtering
+        while the rest is still being fetched.
+
+        Args:
+            shortlist: Called with articles shortlisted so far and the next
+            unseen ones, returns the new shortlist.
+        """
+        collected: List[T] = []
+        batch: List[T] = []
+        async for article in articles:
+            batch.append(article)
+            if len(batch) == _STREAM_BATCH_SIZE:
+                collected = shortlist(
+                    collected, self._unseen(batch, metadata)
+                )
+                batch = []
+        return shortlist(collected, self._unseen(batch, metadata))
+
+    def _unseen(
+        self, articles: List[T], metadata: Callable[[T], ArticleMetadata]
+    ) -> List[T]:
+        if not articles or self._seen_index is None:
+            return articles
+        seen: List[bool] = self._seen_index.seen(
+            [metadata(article) for article in articles]
+        )
+        return [
+            article for article, is_seen in zip(articles, seen) if not is_seen
+        ]
+
+    def _shortlisted_summaries(
+        self, shortlisted: List[ArticleSummary], streamed: List[ArticleSummary]
+    ) -> List[ArticleSummary]:
+        """Summaries aren't pre-ranked, so all of them are kept."""
+        self._article_filtering.prepare(
+            [summary.metadata for summary in streamed]
+        )
+        return shortlisted + streamed
+
+    @staticmethod
+    def _write_skipped_to_file(
+        output_file: Path, skipped: List[Fetcher], cut_short: List[Fetcher]
+    ) -> None:
+        notes: List[str] = []
+        if skipped:
+            notes.append(
+                "The deadline was reached before these sources were "
+                f"processed:\n{NewsDigest._fetchers_list(skipped)}"
+            )
+        if cut_short:
+            notes.append(
+                "The deadline was reached while processing these sources, "
+                "some of their articles may be missing:\n"
+                f"{NewsDigest._fetchers_list(cut_short)}"
+            )
+        with output_file.open("a") as file:
+            file.write(
+                f"{header('Skipped sources', level=2)}\n"
+                + "\n\n".join(notes)
+                + "\n\n"
+            )
+
+    @staticmethod
+    def _fetchers_list(fetchers: List[Fetcher]) -> str:
+        return "\n".join(
+            f"- {NewsDigest._display_name(fetcher)}" for fetcher in fetchers
+        )
 
     def _fetch_and_summarize(
         self,
@@ -137,31 +471,148 @@ class NewsDigest:
         since: datetime,
         until: datetime,
         articles_per_source_limit: int,
-    ) -> List[ArticleSummary]:
-        articles_metadata: List[ArticleMetadata] = fetcher.articles_metadata(
-            since, until
-        )
-        filtered_metadata: List[ArticleMetadata] = (
-            self._article_filtering.filter_metadata(articles_metadata)
+    ) -> Tuple[List[ArticleSummary], List[SkippedArticle]]:
+        """
+        Returns:
+            Tuple[List[ArticleSummary], List[SkippedArticle]]: Summaries
+            of the best articles and ones skipped in their favor (e.g.
+            paywalled or failed to download).
+        """
+        stage: str = NewsDigest._stage_name(fetcher)
+        with profiled_stage(f"{stage}_fetch"):
+            articles_metadata: List[ArticleMetadata] = asyncio.run(
+                self._collected_unseen(
+                    self._fetch_cache.stream_articles_metadata(
+                        fetcher, since, until
+                    ),
+                    lambda metadata: metadata,
+                    partial(
+                        self._article_filtering.shortlist,
+                        subspace=fetcher.subspace(),
+                    ),
+                )
+            )
+        with profiled_stage(f"{stage}_filter"):
+            filtered_metadata: List[ArticleMetadata] = (
+                self._article_filtering.filter_metadata(
+                    articles_metadata,
+                    fetcher.subspace(),
+                    limit=articles_per_source_limit,
+                )
+            )
+        skip_reasons: Dict[int, str] = {}
+        with profiled_stage(f"{stage}_summarize"):
+            summaries_by_index: Dict[int, str] = self._summarize_articles(
+                filtered_metadata, articles_per_source_limit, skip_reasons
+            )
+        return (
+            [
+                ArticleSummary(metadata, summaries_by_index[index])
+                for index, metadata in enumerate(filtered_metadata)
+                if index in summaries_by_index
+            ],
+            [
+                SkippedArticle(filtered_metadata[index], reason)
+                for index, reason in skip_reasons.items()
+            ],
         )
-        filtered_metadata = filtered_metadata[:articles_per_source_limit]
-        summary_texts: List[str] = self._summarize_articles(filtered_metadata)
-        return [
-            ArticleSummary(metadata, summary)
-            for metadata, summary in zip(filtered_metadata, summary_texts)
-        ]
+
+    @staticmethod
+    def _display_name(fetcher: Fetcher) -> str:
+        subspace: str = f": {fetcher.subspace()}" if fetcher.subspace() else ""
+        return f"{fetcher.source().value}{subspace}"
+
+    @staticmethod
+    def _stage_name(fetcher: Fetcher) -> str:
+        subspace: str = f"_{fetcher.subspace()}" if fetcher.subspace() else ""
+        return f"{fetcher.source().value}{subspace}"
 
     def _summarize_articles(
-        self, filtered_metadata: List[ArticleMetadata]
-    ) -> List[str]:
-        summary_texts: List[str] = self._text_summarizer.summarize(
-            (
-                text
-                for metadata in filtered_metadata
-                if (text := fetch_site_text(metadata.url)) is not None
+        self,
+        filtered_metadata: List[ArticleMetadata],
+        limit: int,
+        skip_reasons: Dict[int, str],
+    ) -> Dict[int, str]:
+        """
+        Summarizes the best `limit` articles. Articles that can't be
+        downloaded or summarized are replaced by the next ones in
+        `filtered_metadata`, until `limit` summaries are ready, candidates
+        run out or the cost limit (or the deadline) is reached.
+
+        Args:
+            skip_reasons: Why articles had no text to summarize are added
+            to it by their index in `filtered_metadata`.
+
+        Returns:
+            Dict[int, str]: Summaries by index in `filtered_metadata`.
+        """
+        summaries: Dict[int, str] = {}
+        candidates: Iterator[int] = iter(range(len(filtered_metadata)))
+        spent_usd: Decimal = Decimal(0)
+
+        while len(summaries) < limit:
+            offered: List[int] = []
+            results: Dict[int, Optional[str]]
+            results, spent_usd = self._text_summarizer.summarize_by_key(
+                self._downloaded_texts(
+                    filtered_metadata,
+                    candidates,
+                    limit - len(summaries),
+                    offered,
+                    skip_reasons,
+                ),
+                spent_usd,
             )
-        )
-        return summary_texts
+            summaries.update(
+                (index, summary)
+                for index, summary in results.items()
+                if summary is not None
+            )
+            if not offered or len(results) < len(offered):
+                break  # No candidates left or out of budget/time
+
+            failed: int = len(results) - sum(
+                1 for summary in results.values() if summary is not None
+            )
+            if failed and len(summaries) < limit:
+                _LOGGER.info(
+                    "Failed to summarize %d articles, trying next ones.",
+                    failed,
+                )
+
+        return summaries
+
+    def _downloaded_texts(
+        self,
+        filtered_metadata: List[ArticleMetadata],
+        candidates: Iterator[int],
+        count: int,
+        offered: List[int],
+        skip_reasons: Dict[int, str],
+    ) -> Iterator[Tuple[int, str]]:
+        """
+        Yields texts of the next `count` candidates that could be
+        downloaded, skipping the others. Indices of yielded candidates are
+        appended to `offered`, reasons for skipped ones are added to
+        `skip_reasons`.
+        """
+        while len(offered) < count:
+            index: Optional[int] = next(candidates, None)
+            if index is None:
+                return
+            site: SiteText = self._fetch_cache.site(
+                filtered_metadata[index].url
+            )
+            if site.text is None:
+                _LOGGER.info(
+                    "Skipping %s (%s), trying the next article.",
+                    filtered_metadata[index].url.geturl(),
+                    site.skip_reason,
+                )
+                skip_reasons[index] = site.skip_reason or "no text"
+                continue
+            offered.append(index)
+            yield index, site.text
 
     def _output_file(self, since: datetime, until: datetime) -> Path:
         datetime_format: str = "%Y-%m-%d-%H"
@@ -0,0 +1,156 @@
+from datetime import datetime, timezone
+import logging
+import math
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from industry_news.config import PreRankingConfig, load_config
+from industry_news.digest.article_batch import ArticleBatch
+
+_LOGGER = logging.getLogger(__name__)
+_MICROSECONDS_IN_HOUR = 3_600_000_000
+_MICROSECONDS_IN_SECOND = 1_000_000
+# Used unless configured, for windows up to the age half-life. In longer
+# ones, the decay would mostly favor the last hours of the window.
+_DEFAULT_AGE_WEIGHT = 0.5
+
+FloatArray = npt.NDArray[np.float64]
+
+
+class PreRanking:
+    """
+    Cheap, local ranking of articles used to decide which titles are worth
+    sending to the filter model.
+
+    Articles are ranked per source/subspace, as they're filtered, so a busy
+    subreddit doesn't drown a quiet one. A rank of an article is a sum of:
+    - its engagement (score + weighted comments), standardized,
+    - its engagement per hour of age (velocity) when it was observed,
+      standardized the same way, so a fresh story isn't beaten just by
+      being older,
+    - an exponential decay of that age.
+    """
+
+    def __init__(self, config: Optional[PreRankingConfig] = None) -> None:
+        self._config: PreRankingConfig = (
+            config or load_config().llm.filter_model.pre_ranking
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return (
+            self._config.top_k is not None
+            or self._config.min_percentile is not None
+        )
+
+    @property
+    def bounded(self) -> bool:
+        """Whether :py:meth:`shortlist` can drop articles."""
+        return self._config.top_k is not None
+
+    def shortlist(
+        self, batch: ArticleBatch, observed_at: Optional[datetime] = None
+    ) -> ArticleBatch:
+        """
+        Bounds articles collected from a stream to the best `top_k` so far.
+        The others aren't likely to be selected once the rest is collected,
+        though ranks of all articles shift a little with each batch.
+
+        Returns:
+            ArticleBatch: The best ranked `top_k` articles of `batch`, in no
+            particular order. The whole batch without `top_k`.
+        """
+        top_k: Optional[int] = self._config.top_k
+        if top_k is None or len(batch) <= top_k:
+            return batch
+        ranks: FloatArray = self.ranks(batch, observed_at)
+        return batch.take(np.argpartition(-ranks, top_k - 1)[:top_k])
+
+    def select(
+        self, batch: ArticleBatch, observed_at: Optional[datetime] = None
+    ) -> ArticleBatch:
+        """
+        Args:
+            observed_at: When scores and comments of the articles were
+            fetched. Defaults to now.
+
+        Returns:
+            ArticleBatch: Articles that survived pre-ranking, sorted in
+            descending order by rank. The whole batch if pre-ranking is
+            disabled.
+        """
+        if not self.enabled or len(batch) == 0:
+            return batch
+
+        ranks: FloatArray = self.ranks(batch, observed_at)
+        order = np.argsort(-ranks, kind="stable")
+        keep: int = len(batch)
+
+        if self._config.min_percentile is not None:
+            threshold: float = float(
+                np.percentile(ranks, self._config.min_percentile)
+            )
+            keep = int(np.count_nonzero(ranks >= threshold))
+        if self._config.top_k is not None:
+            keep = min(keep, self._config.top_k)
+
+        _LOGGER.info(
+            "Pre-ranking kept %d out of %d articles.", keep, len(batch)
+        )
+        return batch.take(order[:keep])
+
+    def ranks(
+        self, batch: ArticleBatch, observed_at: Optional[datetime] = None
+    ) -> FloatArray:
+        engagement: FloatArray = np.maximum(
+            batch.scores + self._config.comments_weight * batch.comments, 0.0
+        )
+        age_hours: FloatArray = PreRanking._age_hours(batch, observed_at)
+        velocity: FloatArray = engagement / (age_hours + 1.0)
+
+        ranks: FloatArray = (
+            _zscore(np.log1p(engagement))
+            + self._config.velocity_weight * _zscore(np.log1p(velocity))
+            + self._age_weight(batch)
+            * np.exp2(-age_hours / self._config.age_half_life_hours)
+        )
+        return ranks
+
+    def _age_weight(self, batch: ArticleBatch) -> float:
+        if self._config.age_weight is not None:
+            return self._config.age_weight
+        timestamps_us = batch.timestamps_us
+        window_hours: float = (
+            int(timestamps_us.max()) - int(timestamps_us.min())
+        ) / _MICROSECONDS_IN_HOUR
+        if window_hours > self._config.age_half_life_hours:
+            return 0.0
+        return _DEFAULT_AGE_WEIGHT
+
+    @staticmethod
+    def _age_hours(
+        batch: ArticleBatch, observed_at: Optional[datetime]
+    ) -> FloatArray:
+        """
+        Ages at the time of observation, which scores and comments
+        accumulated over. Articles dated later (clock skew) are new.
+        """
+        observed_at_us: int = round(
+            (observed_at or datetime.now(timezone.utc)).timestamp()
+            * _MICROSECONDS_IN_SECOND
+        )
+        age_hours: FloatArray = (
+            np.maximum(observed_at_us - batch.timestamps_us, 0)
+            / _MICROSECONDS_IN_HOUR
+        )
+        return age_hours
+
+
+def _zscore(values: FloatArray) -> FloatArray:
+    deviations: FloatArray = values - values.mean()
+    std: float = float(np.sqrt(np.mean(deviations**2)))
+    if std < math.ulp(1.0):  # Identical values
+        return np.zeros_like(values)
+    return deviations / std
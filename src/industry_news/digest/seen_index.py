@@ -0,0 +1,260 @@
+from datetime import datetime, timedelta, timezone
+import hashlib
+import json
+import logging
+import math
+from pathlib import Path
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+from urllib.parse import ParseResult
+
+import numpy as np
+import numpy.typing as npt
+
+from industry_news.config import SeenIndexConfig
+from industry_news.digest.article import ArticleMetadata
+
+_LOGGER = logging.getLogger(__name__)
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Shorter titles ("Ask HN: Help", "[D] Question") are too generic to
+# identify an article.
+_MIN_TITLE_TOKENS = 4
+_TRACKING_PARAMS = frozenset({"ref", "fbclid", "gclid", "si"})
+
+
+class BloomFilter:
+    """
+    A fixed-size set of string keys that may report false positives but
+    never false negatives. Bit positions come from double hashing a single
+    blake2b digest.
+    """
+
+    def __init__(
+        self,
+        bit_count: int,
+        hash_count: int,
+        bits: Optional[npt.NDArray[np.bool_]] = None,
+    ) -> None:
+        self._bit_count = bit_count
+        self._hash_count = hash_count
+        self._bits: npt.NDArray[np.bool_] = (
+            bits if bits is not None else np.zeros(bit_count, dtype=bool)
+        )
+
+    @classmethod
+    def for_capacity(
+        cls, expected_items: int, false_positive_rate: float
+    ) -> "BloomFilter":
+        bit_count: int = math.ceil(
+            -expected_items * math.log(false_positive_rate) / math.log(2) ** 2
+        )
+        hash_count: int = max(
+            1, round(bit_count / expected_items * math.log(2))
+        )
+        return cls(bit_count, hash_count)
+
+    @classmethod
+    def load(cls, path: Path) -> "BloomFilter":
+        with np.load(path) as data:
+            bit_count = int(data["bit_count"])
+            bits = np.unpackbits(data["bits"], count=bit_count).astype(bool)
+            return cls(bit_count, int(data["hash_count"]), bits)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as file:
+            np.savez(
+                file,
+                bit_count=self._bit_count,
+                hash_count=self._hash_count,
+                bits=np.packbits(self._bits),
+            )
+
+    def add(self, keys: Sequence[str]) -> None:
+        self._bits[self._positions(keys)] = True
+
+    def contains(self, keys: Sequence[str]) -> npt.NDArray[np.bool_]:
+        """Whether each of `keys` may be in the set."""
+        contained: npt.NDArray[np.bool_] = self._bits[
+            self._positions(keys)
+        ].all(axis=1)
+        return contained
+
+    def _positions(self, keys: Sequence[str]) -> npt.NDArray[np.uint64]:
+        """
+        Returns:
+            npt.NDArray[np.uint64]: A (keys, hash_count) array of bit
+            positions. Arithmetic wraps around at 64 bits.
+        """
+        digests = np.frombuffer(
+            b"".join(
+                hashlib.blake2b(key.encode(), digest_size=16).digest()
+                for key in keys
+            ),
+            dtype="<u8",
+        ).reshape(len(keys), 2)
+        first = digests[:, :1]
+        second = digests[:, 1:] | np.uint64(1)
+        steps = np.arange(self._hash_count, dtype=np.uint64)
+        positions: npt.NDArray[np.uint64] = (
+            first + steps * second
+        ) % np.uint64(self._bit_count)
+        return positions
+
+
+class SeenArticleIndex:
+    """
+    Canonical URLs and title fingerprints of articles included in earlier
+    digests. Kept as an exact set (key -> when it was added) on disk plus a
+    Bloom filter, so the exact set is only read when the filter reports a
+    possible match. Entries older than the retention period expire.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        digest_name: str,
+        config: SeenIndexConfig,
+    ) -> None:
+        self._entries_path: Path = data_dir / f"{digest_name}.json"
+        self._bloom_path: Path = data_dir / f"{digest_name}_bloom.npz"
+        self._config = config
+        self._retention = timedelta(days=config.retention_days)
+        self._entries: Optional[Dict[str, float]] = None
+        self._bloom: BloomFilter = self._load_bloom()
+
+    def seen(self, articles: Sequence[ArticleMetadata]) -> List[bool]:
+        keys_by_article: List[List[str]] = [
+            article_keys(article) for article in articles
+        ]
+        keys: List[str] = [key for keys in keys_by_article for key in keys]
+        if not keys:
+            return []
+        maybe_seen: Set[str] = {
+            key
+            for key, contained in zip(keys, self._bloom.contains(keys))
+            if contained
+        }
+        # The exact set is read only if needed.
+        entries: Dict[str, float] = (
+            self._loaded_entries() if maybe_seen else {}
+        )
+        oldest_valid: float = self._oldest_valid_timestamp()
+        result: List[bool] = [
+            any(
+                entries.get(key, -math.inf) >= oldest_valid
+                for key in article_keys
+                if key in maybe_seen
+            )
+            for article_keys in keys_by_article
+        ]
+
+        if any(result):
+            _LOGGER.info(
+                "Skipping %d articles included in earlier digests.",
+                sum(result),
+            )
+        return result
+
+    def unseen(
+        self, articles: Sequence[ArticleMetadata]
+    ) -> List[ArticleMetadata]:
+        return [
+            article
+            for article, seen in zip(articles, self.seen(articles))
+            if not seen
+        ]
+
+    def add(self, articles: Iterable[ArticleMetadata]) -> None:
+        """
+        Marks articles as seen and saves the index. It's reloaded first, so
+        entries saved by other processes since it was read are kept.
+        """
+        self._entries = None
+        self._bloom = self._load_bloom()
+        entries: Dict[str, float] = self._loaded_entries()
+        now: float = datetime.now(timezone.utc).timestamp()
+        keys: List[str] = [
+            key for article in articles for key in article_keys(article)
+        ]
+        for key in keys:
+            entries[key] = now
+        if keys:
+            self._bloom.add(keys)
+        self._save()
+
+    def _save(self) -> None:
+        entries: Dict[str, float] = self._loaded_entries()
+        oldest_valid: float = self._oldest_valid_timestamp()
+        expired: List[str] = [
+            key for key, added in entries.items() if added < oldest_valid
+        ]
+        for key in expired:
+            del entries[key]
+        if expired:
+            # Expired keys can't be removed from a Bloom filter.
+            self._bloom = self._build_bloom(entries)
+
+        self._entries_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._entries_path.open("w") as file:
+            json.dump(entries, file)
+        self._bloom.save(self._bloom_path)
+
+    def _loaded_entries(self) -> Dict[str, float]:
+        if self._entries is None:
+            entries: Dict[str, float] = {}
+            if self._entries_path.exists():
+                with self._entries_path.open("r") as file:
+                    entries = json.load(file)
+            self._entries = entries
+        return self._entries
+
+    def _load_bloom(self) -> BloomFilter:
+        if self._bloom_path.exists():
+            return BloomFilter.load(self._bloom_path)
+        # E.g. the filter file was deleted, but the exact set wasn't.
+        return self._build_bloom(self._loaded_entries())
+
+    def _build_bloom(self, entries: Dict[str, float]) -> BloomFilter:
+        bloom = BloomFilter.for_capacity(
+            max(self._config.expected_articles, len(entries)),
+            self._config.false_positive_rate,
+        )
+        if entries:
+            bloom.add(list(entries))
+        return bloom
+
+    def _oldest_valid_timestamp(self) -> float:
+        return (datetime.now(timezone.utc) - self._retention).timestamp()
+
+
+def article_keys(article: ArticleMetadata) -> List[str]:
+    """The canonical URL and, unless the title is very short, a title
+    fingerprint, so resubmissions under another URL match too."""
+    keys: List[str] = [f"url:{canonical_url(article.url)}"]
+    tokens: List[str] = _TOKEN_PATTERN.findall(article.title.lower())
+    if len(tokens) >= _MIN_TITLE_TOKENS:
+        keys.append(f"title:{' '.join(tokens)}")
+    return keys
+
+
+def canonical_url(url: ParseResult) -> str:
+    """
+    Drops what doesn't change the linked page: the scheme, a `www.` prefix,
+    a trailing slash, the fragment and tracking query params.
+    """
+    host: str = url.netloc.lower().removeprefix("www.")
+    path: str = url.path.rstrip("/")
+    # Params are compared as they are, without decoding them.
+    query: str = "&".join(
+        sorted(
+            param
+            for param in url.query.split("&")
+            if param and not _is_tracking_param(param.partition("=")[0])
+        )
+    )
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+def _is_tracking_param(name: str) -> bool:
+    return name.startswith("utm_") or name in _TRACKING_PARAMS
@@ -0,0 +1,349 @@
+from concurrent import futures
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from email.message import Message
+from functools import partial
+from io import BytesIO
+import logging
+import multiprocessing
+from multiprocessing.queues import SimpleQueue
+import os
+import re
+import signal
+import threading
+import time
+from types import FrameType
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from pypdf import PdfReader
+from requests.models import Response
+
+from industry_news.config import PdfConfig
+
+_LOGGER = logging.getLogger(__name__)
+_PDF_MAGIC = b"%PDF-"
+# Unlike these, <noscript> is kept, as it's what "enable JavaScript" stubs
+# say.
+_NON_TEXT_TAGS = ["script", "style", "template"]
+_PDF_ABSTRACT = re.compile(r"^\s*abstract\b", re.IGNORECASE | re.MULTILINE)
+# An abstract further than that is likely a mention in the body.
+_PDF_ABSTRACT_MAX_OFFSET = 5000
+_PDF_REFERENCES = re.compile(
+    r"^\s*(\d+\.?\s*)?(references|bibliography)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+# Past its own `max_seconds`, a PDF worker stuck in native code (e.g.
+# inflating a huge stream) is killed after that much longer.
+_PDF_KILL_GRACE_S = 5.0
+_START_POLL_S = 0.05
+
+
+@dataclass(frozen=True)
+class ExtractedPage:
+    text: str
+    # Characters of `text` that are link anchors.
+    link_chars: int
+
+
+_Task = Callable[[], Optional[ExtractedPage]]
+
+
+def extract_page(
+    content: bytes, encoding: Optional[str]
+) -> Optional[ExtractedPage]:
+    """
+    Runs in worker processes, so it only takes and returns cheap to pickle
+    values.
+
+    Args:
+        encoding: The one declared by the server, if any. Otherwise it's
+        detected from the page (e.g. its `<meta charset>`).
+    """
+    try:
+        soup = BeautifulSoup(content, "html.parser", from_encoding=encoding)
+        # Not text, but they'd pad word counts of e.g. bot check stubs
+        # (see :py:mod:`industry_news.fetcher.page_quality`).
+        for element in soup.find_all(_NON_TEXT_TAGS):
+            element.decompose()
+        return ExtractedPage(
+            text=soup.get_text(),
+            link_chars=sum(
+                len(link.get_text(strip=True)) for link in soup.find_all("a")
+            ),
+        )
+    except Exception as e:
+        _LOGGER.exception(e)
+        return None
+
+
+def extract_pdf(
+    content: bytes, max_pages: int, max_chars: int, max_seconds: float
+) -> Optional[ExtractedPage]:
+    """
+    Reads pages in order until `max_pages`, `max_chars` or `max_seconds` is
+    reached. For papers, the text starts at the abstract (skipping the
+    title page preamble) and ends before the references.
+
+    In worker processes, `max_seconds` interrupts a page being read, since
+    a single page of a malformed PDF can take minutes. Elsewhere, it's
+    only checked between pages.
+    """
+    started_s: float = time.monotonic()
+    texts: List[str] = []
+    try:
+        with _time_limit(max_seconds):
+            reader = PdfReader(BytesIO(content))
+            chars: int = 0
+            for page in reader.pages[:max_pages]:
+                texts.append(page.extract_text() or "")
+                chars += len(texts[-1])
+                if (
+                    chars >= max_chars
+                    or time.monotonic() - started_s > max_seconds
+                ):
+                    break
+    except _TimeLimitExceeded:
+        _LOGGER.warning(
+            "Stopped reading a PDF after %s s, at page %d.",
+            max_seconds,
+            len(texts) + 1,
+        )
+    except Exception as e:  # Broken and encrypted PDFs aren't rare.
+        _LOGGER.warning("Failed to read a PDF: %r", e)
+        return None
+
+    text: str = "\n".join(texts)
+    abstract: Optional[re.Match[str]] = _PDF_ABSTRACT.search(
+        text, endpos=_PDF_ABSTRACT_MAX_OFFSET
+    )
+    if abstract:
+        text = text[abstract.start():]
+    references: Optional[re.Match[str]] = _PDF_REFERENCES.search(text)
+    if references:
+        text = text[: references.start()]
+    return ExtractedPage(text=text[:max_chars], link_chars=0)
+
+
+class _TimeLimitExceeded(Exception):
+    pass
+
+
+@contextmanager
+def _time_limit(seconds: float) -> Iterator[None]:
+    """
+    Raises `_TimeLimitExceeded` in the block once `seconds` pass. Only in
+    the main thread of worker processes: signals can't interrupt other
+    threads, and the calling process may have its own SIGALRM handler.
+    Elsewhere, the block runs without a limit.
+    """
+    if (
+        multiprocessing.parent_process() is None
+        or threading.current_thread() is not threading.main_thread()
+        or not hasattr(signal, "setitimer")  # Not on Windows
+    ):
+        yield
+        return
+
+    def _raise(signum: int, frame: Optional[FrameType]) -> None:
+        raise _TimeLimitExceeded()
+
+    previous_handler = signal.signal(signal.SIGALRM, _raise)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+def is_pdf(response: Response, first_bytes: bytes = b"") -> bool:
+    content_type: str = response.headers.get("Content-Type", "")
+    return (
+        "application/pdf" in content_type.lower()
+        or first_bytes.startswith(_PDF_MAGIC)
+    )
+
+
+def declared_encoding(response: Response) -> Optional[str]:
+    """
+    The charset from the Content-Type header. Unlike `response.encoding`,
+    there's no ISO-8859-1 fallback for text without a declared charset,
+    which would override the page's own declaration.
+    """
+    message = Message()
+    message["Content-Type"] = response.headers.get("Content-Type", "")
+    charset = message.get_content_charset()
+    return str(charset) if charset else None
+
+
+class TextExtractor:
+    """
+    Extracts text from downloaded pages in a pool of processes, so parsing
+    doesn't hold the GIL of threads downloading other pages. With no
+    workers, pages are parsed in the calling thread.
+    """
+
+    def __init__(self, workers: int = 0) -> None:
+        self._workers = workers
+        self._pool: Optional[_WorkerPool] = None
+        self._pool_lock = threading.Lock()
+
+    def extract(
+        self, content: bytes, encoding: Optional[str]
+    ) -> Optional[ExtractedPage]:
+        return self._run(partial(extract_page, content, encoding))
+
+    def extract_pdf(
+        self, content: bytes, config: PdfConfig
+    ) -> Optional[ExtractedPage]:
+        return self._run(
+            _pdf_task(content, config),
+            timeout_s=config.max_seconds + _PDF_KILL_GRACE_S,
+        )
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.executor.shutdown(cancel_futures=True)
+                self._pool = None
+
+    def _run(
+        self, task: _Task, timeout_s: Optional[float] = None
+    ) -> Optional[ExtractedPage]:
+        """
+        Args:
+            timeout_s: Once the task starts, its worker is killed after
+            that long and there's no result. Not enforced when parsing in
+            the calling thread.
+        """
+        submitted = self._submit(task)
+        if submitted is None:
+            return task()
+        pool, future = submitted
+        try:
+            if timeout_s is None:
+                return future.result()
+            _wait_started(future)
+            return future.result(timeout=timeout_s)
+        except futures.TimeoutError:
+            _LOGGER.warning(
+                "Text extraction took over %s s, killing its worker.",
+                timeout_s,
+            )
+            self._recycle(pool)
+            return None
+        except BrokenProcessPool as e:
+            return self._in_thread_after(e, pool, task)
+
+    def _submit(
+        self, task: _Task
+    ) -> Optional[Tuple["_WorkerPool", "Future[Optional[ExtractedPage]]"]]:
+        """
+        Args:
+            task: A partial of a module-level function, so it can be
+            pickled.
+        """
+        if self._workers <= 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = _WorkerPool(self._workers)
+            pool: _WorkerPool = self._pool
+        try:
+            return pool, pool.executor.submit(task)
+        except BrokenProcessPool:
+            return None
+
+    def _in_thread_after(
+        self, error: Exception, pool: "_WorkerPool", task: _Task
+    ) -> Optional[ExtractedPage]:
+        """E.g. a worker got killed. The pool is recreated on next use."""
+        _LOGGER.warning("Text extraction pool broke (%r), retrying.", error)
+        self._recycle(pool)
+        return task()
+
+    def _recycle(self, pool: "_WorkerPool") -> None:
+        """
+        Kills the workers of `pool`, unless another thread already replaced
+        it. Tasks of other threads running in it are retried in their
+        thread.
+        """
+        with self._pool_lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        pool.kill()
+
+
+class _WorkerPool:
+    """
+    A process pool whose workers can be killed, even ones stuck in a task.
+    There's no public way to stop a running task before Python 3.14, so
+    workers report their pids as they start.
+    """
+
+    def __init__(self, workers: int) -> None:
+        # Forking a process with running threads (downloads, timeouts) can
+        # deadlock the child.
+        context = multiprocessing.get_context("spawn")
+        self._pids: "SimpleQueue[int]" = context.SimpleQueue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_report_pid,
+            initargs=(self._pids,),
+        )
+
+    def kill(self) -> None:
+        """Tasks of other threads running in the pool fail with
+        `BrokenProcessPool`."""
+        while not self._pids.empty():
+            try:
+                os.kill(self._pids.get(), signal.SIGTERM)
+            except OSError:  # Already exited
+                pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _report_pid(pids: "SimpleQueue[int]") -> None:
+    pids.put(os.getpid())
+
+
+def _wait_started(future: "Future[Optional[ExtractedPage]]") -> None:
+    """Tasks queued behind others in the pool aren't timed yet."""
+    while not (future.running() or future.done()):
+        futures.wait([future], timeout=_START_POLL_S)
+
+
+def _pdf_task(content: bytes, config: PdfConfig) -> _Task:
+    return partial(
+        extract_pdf,
+        content,
+        max_pages=config.max_pages,
+        max_chars=config.max_chars,
+        max_seconds=config.max_seconds,
+    )
+
+
+_extractors: Dict[int, TextExtractor] = {}
+
+
+def default_extractor(workers: int) -> TextExtractor:
+    """
+    Shared by all fetchers asking for as many workers, but leaving a CPU to
+    downloading threads. More processes than CPUs are slower than parsing
+    in the calling thread.
+    """
+    workers = max(min(workers, _available_cpus() - 1), 0)
+    if workers not in _extractors:
+        _extractors[workers] = TextExtractor(workers)
+    return _extractors[workers]
+
+
+def _available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):  # Not on macOS and Windows
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
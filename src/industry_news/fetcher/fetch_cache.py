@@ -0,0 +1,211 @@
+from concurrent.futures import Executor
+from datetime import datetime, timezone
+import logging
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from urllib.parse import ParseResult
+
+from industry_news.config import WebConfig
+from industry_news.digest.article import ArticleMetadata, ArticleSummary
+from industry_news.deadline import current_deadline
+from industry_news.fetcher.fetcher import (
+    Fetcher,
+    MetadataFetcher,
+    SiteText,
+    SummaryFetcher,
+    fetch_site,
+)
+from industry_news.sources import Source
+
+_LOGGER = logging.getLogger(__name__)
+_FetchKey = Tuple[Source, Optional[str], datetime, datetime]
+T = TypeVar("T")
+
+
+class FetchCache:
+    """
+    Memoizes fetcher results and article downloads for the lifetime of a
+    process, so digests built one after another (with different prompts and
+    budgets) fetch each source + subspace and each article page only once.
+    A window within an already fetched one (e.g. a backfill window within
+    the prefetched union of all windows) is served from memory. Results
+    cut short by the deadline, or of windows ending in the future (whose
+    articles aren't all published yet), aren't cached.
+
+    Callers must not mutate returned lists.
+    """
+
+    def __init__(
+        self, web_config: WebConfig, executor: Optional[Executor] = None
+    ) -> None:
+        """
+        Args:
+            web_config: How article pages are downloaded and extracted,
+            shared by digests sharing the cache.
+            executor: Runs streaming fetchers, see
+            :py:func:`industry_news.fetcher.fetcher.iterate_in_thread`.
+        """
+        self.web_config = web_config
+        self.executor = executor
+        self._metadata: Dict[_FetchKey, List[ArticleMetadata]] = {}
+        self._summaries: Dict[_FetchKey, List[ArticleSummary]] = {}
+        self._sites: Dict[str, SiteText] = {}
+
+    def articles_metadata(
+        self, fetcher: MetadataFetcher, since: datetime, until: datetime
+    ) -> List[ArticleMetadata]:
+        key: _FetchKey = (fetcher.source(), fetcher.subspace(), since, until)
+        if key in self._metadata:
+            return self._metadata[key]
+        items: Optional[List[ArticleMetadata]] = _covered(
+            self._metadata,
+            key,
+            lambda metadata: metadata.publication_date_utc,
+        )
+        if items is None:
+            items = fetcher.articles_metadata(since, until)
+            if not _cacheable(fetcher, until):
+                return items
+        self._metadata[key] = items
+        return items
+
+    def article_summaries(
+        self, fetcher: SummaryFetcher, since: datetime, until: datetime
+    ) -> List[ArticleSummary]:
+        key: _FetchKey = (fetcher.source(), fetcher.subspace(), since, until)
+        if key in self._summaries:
+            return self._summaries[key]
+        items: Optional[List[ArticleSummary]] = _covered(
+            self._summaries,
+            key,
+            lambda summary: summary.metadata.publication_date_utc,
+        )
+        if items is None:
+            items = fetcher.article_summaries(since, until)
+            if not _cacheable(fetcher, until):
+                return items
+        self._summaries[key] = items
+        return items
+
+    async def stream_articles_metadata(
+        self, fetcher: MetadataFetcher, since: datetime, until: datetime
+    ) -> AsyncIterator[ArticleMetadata]:
+        """
+        Like :py:meth:`articles_metadata`, yielding articles as they're
+        fetched. They're cached only if the stream is consumed to the end
+        (and wasn't cut short by the deadline).
+        """
+        key: _FetchKey = (fetcher.source(), fetcher.subspace(), since, until)
+        cached: Optional[List[ArticleMetadata]] = (
+            self._metadata[key]
+            if key in self._metadata
+            else _covered(
+                self._metadata,
+                key,
+                lambda metadata: metadata.publication_date_utc,
+            )
+        )
+        if cached is not None:
+            for metadata in cached:
+                yield metadata
+            self._metadata[key] = cached
+            return
+
+        fetched: List[ArticleMetadata] = []
+        async for metadata in fetcher.stream_articles_metadata(
+            since, until, self.executor
+        ):
+            fetched.append(metadata)
+            yield metadata
+        if _cacheable(fetcher, until):
+            self._metadata[key] = fetched
+
+    async def stream_article_summaries(
+        self, fetcher: SummaryFetcher, since: datetime, until: datetime
+    ) -> AsyncIterator[ArticleSummary]:
+        """See :py:meth:`stream_articles_metadata`."""
+        key: _FetchKey = (fetcher.source(), fetcher.subspace(), since, until)
+        cached: Optional[List[ArticleSummary]] = (
+            self._summaries[key]
+            if key in self._summaries
+            else _covered(
+                self._summaries,
+                key,
+                lambda summary: summary.metadata.publication_date_utc,
+            )
+        )
+        if cached is not None:
+            for summary in cached:
+                yield summary
+            self._summaries[key] = cached
+            return
+
+        fetched: List[ArticleSummary] = []
+        async for summary in fetcher.stream_article_summaries(
+            since, until, self.executor
+        ):
+            fetched.append(summary)
+            yield summary
+        if _cacheable(fetcher, until):
+            self._summaries[key] = fetched
+
+    def site(self, url: ParseResult) -> SiteText:
+        """Skipped pages are remembered too, failed downloads are retried
+        when requested again."""
+        key: str = url.geturl()
+        if key in self._sites:
+            return self._sites[key]
+        site: SiteText = fetch_site(url, self.web_config)
+        if not site.failed:
+            self._sites[key] = site
+        return site
+
+
+def _cacheable(fetcher: Fetcher, until: datetime) -> bool:
+    """
+    Fetchers only cut a walk short once the deadline passes (see
+    :py:mod:`industry_news.deadline`), so items fetched before that are
+    complete. Ones fetched after may have a gap, and windows served from
+    them would silently miss articles. So would ones served from a window
+    ending after it was fetched.
+    """
+    if until > datetime.now(timezone.utc):
+        return False
+    if current_deadline().expired():
+        _LOGGER.info(
+            "Not caching %s articles fetched past the deadline.",
+            fetcher.source().value,
+        )
+        return False
+    return True
+
+
+def _covered(
+    fetched: Dict[_FetchKey, List[T]],
+    key: _FetchKey,
+    publication_date: Callable[[T], datetime],
+) -> Optional[List[T]]:
+    """Items of `key`'s window if a fetched window of the same source +
+    subspace contains it."""
+    source, subspace, since, until = key
+    for (
+        fetched_source, fetched_subspace, fetched_since, fetched_until
+    ), items in fetched.items():
+        if (
+            (fetched_source, fetched_subspace) == (source, subspace)
+            and fetched_since <= since
+            and until <= fetched_until
+        ):
+            return [
+                item
+                for item in items
+                if since <= publication_date(item) <= until
+            ]
+    return None
@@ -1,17 +1,42 @@
+import asyncio
+from concurrent.futures import Executor
+from contextvars import copy_context
+from dataclasses import dataclass
 from datetime import datetime
 from abc import ABC, abstractmethod
 from enum import Enum
+from functools import partial
 from urllib.parse import ParseResult
 import logging
-from typing import List, Optional
-from bs4 import BeautifulSoup
+import threading
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 from industry_news.digest.article import ArticleSummary, ArticleMetadata
 from industry_news.sources import Source
+from industry_news.config import PdfConfig, WebConfig
+from industry_news.fetcher.extraction import (
+    ExtractedPage,
+    TextExtractor,
+    declared_encoding,
+    default_extractor,
+    is_pdf,
+)
+from industry_news.fetcher.page_quality import PageQualityFilter
 from industry_news.fetcher.web_tools import get_with_retries
 from requests.models import Response
 from industry_news.utils import fail_gracefully
 
 LOGGER = logging.getLogger(__name__)
+_CHUNK_BYTES = 64 * 1024
+T = TypeVar("T")
 
 
 class CONTINUE_PAGINATING(Enum):
@@ -35,39 +60,188 @@ class Fetcher(ABC):
 
 
 class MetadataFetcher(Fetcher):
-    @abstractmethod
     def articles_metadata(
         self, since: datetime, until: datetime
     ) -> List[ArticleMetadata]:
+        return list(self.iter_articles_metadata(since, until))
+
+    @abstractmethod
+    def iter_articles_metadata(
+        self, since: datetime, until: datetime
+    ) -> Iterator[ArticleMetadata]:
+        """
+        Yields articles as they're fetched, so callers can start processing
+        them before a walk of the source finishes. Articles stored by
+        earlier runs come last.
+        """
         pass
 
+    def stream_articles_metadata(
+        self,
+        since: datetime,
+        until: datetime,
+        executor: Optional[Executor] = None,
+    ) -> AsyncIterator[ArticleMetadata]:
+        """:py:meth:`iter_articles_metadata` run in a thread, see
+        :py:func:`iterate_in_thread`."""
+        return iterate_in_thread(
+            partial(self.iter_articles_metadata, since, until), executor
+        )
+
 
 class SummaryFetcher(Fetcher):
-    @abstractmethod
     def article_summaries(
         self, since: datetime, until: datetime
     ) -> List[ArticleSummary]:
-        pass
+        return list(self.iter_article_summaries(since, until))
 
+    @abstractmethod
+    def iter_article_summaries(
+        self, since: datetime, until: datetime
+    ) -> Iterator[ArticleSummary]:
+        """See :py:meth:`MetadataFetcher.iter_articles_metadata`."""
+        pass
 
-def fetch_site_text(url: ParseResult) -> Optional[str]:
-    text: Optional[str] = None
+    def stream_article_summaries(
+        self,
+        since: datetime,
+        until: datetime,
+        executor: Optional[Executor] = None,
+    ) -> AsyncIterator[ArticleSummary]:
+        """:py:meth:`iter_article_summaries` run in a thread, see
+        :py:func:`iterate_in_thread`."""
+        return iterate_in_thread(
+            partial(self.iter_article_summaries, since, until), executor
+        )
+
+
+async def iterate_in_thread(
+    iterator: Callable[[], Iterator[T]], executor: Optional[Executor] = None
+) -> AsyncIterator[T]:
+    """
+    Runs a blocking iterator (walking a source over HTTP, etc.) in a thread
+    with the caller's context (e.g. its deadline) and yields its items to
+    the event loop as they come. If the caller stops iterating, the thread
+    stops after its current item.
+
+    Args:
+        executor: Runs the iterator. The event loop's default one if None,
+        whose threads (and their HTTP sessions) end with the loop.
+    """
+    loop = asyncio.get_running_loop()
+    items: asyncio.Queue[Tuple[_Produced, Any]] = asyncio.Queue()
+    stopped = threading.Event()
+
+    def produce() -> None:
+        try:
+            for item in iterator():
+                if stopped.is_set():
+                    return
+                loop.call_soon_threadsafe(
+                    items.put_nowait, (_Produced.ITEM, item)
+                )
+        except Exception as e:
+            loop.call_soon_threadsafe(items.put_nowait, (_Produced.ERROR, e))
+        else:
+            loop.call_soon_threadsafe(items.put_nowait, (_Produced.END, None))
+
+    producer = loop.run_in_executor(
+        executor, copy_context().run, produce
+    )
+    try:
+        while True:
+            kind, value = await items.get()
+            if kind == _Produced.END:
+                break
+            if kind == _Produced.ERROR:
+                raise value
+            yield value
+    finally:
+        stopped.set()
+    await producer
+
+
+class _Produced(Enum):
+    ITEM = 1
+    ERROR = 2
+    END = 3
+
+
+@dataclass(frozen=True)
+class SiteText:
+    """Text of a downloaded page or why there is none."""
+
+    text: Optional[str]
+    skip_reason: Optional[str] = None
+    # The download or text extraction failed, unlike pages skipped for
+    # their content, it may succeed if retried later.
+    failed: bool = False
+
+
+def fetch_site(url: ParseResult, config: WebConfig) -> SiteText:
+    """Pages not worth summarizing (paywall stubs, bot checks, etc.) have no
+    text, see :py:mod:`industry_news.fetcher.page_quality`."""
     response: Optional[Response] = _send_request(url)
-
-    if response is not None:
-        text = _retrieve_text(response)
-
-    return text
+    if response is None:
+        return SiteText(None, "download failed", failed=True)
+
+    extractor: TextExtractor = default_extractor(config.extraction_workers)
+    with response:
+        if is_pdf(response) or url.path.lower().endswith(".pdf"):
+            content: Optional[bytes] = _read_capped(
+                response, config.pdf.max_bytes
+            )
+            if content is None:
+                return SiteText(None, "PDF too large")
+            page: Optional[ExtractedPage] = _retrieve_pdf(
+                content, extractor, config.pdf
+            )
+        else:
+            page = _retrieve_page(response, extractor, config.pdf)
+    if page is None:
+        return SiteText(None, "text extraction failed", failed=True)
+
+    skip_reason: Optional[str] = PageQualityFilter(
+        config.page_quality
+    ).low_value_reason(page)
+    if skip_reason is not None:
+        return SiteText(None, skip_reason)
+    return SiteText(page.text)
 
 
 def _send_request(url: ParseResult) -> Optional[Response]:
     LOGGER.info(f"Retrieving an article from {url.geturl()}")
     response: Optional[Response] = fail_gracefully(
-        lambda: get_with_retries(url)
+        lambda: get_with_retries(url, stream=True)
     )
     return response
 
 
-def _retrieve_text(response: Response) -> Optional[str]:
-    soup: BeautifulSoup = BeautifulSoup(response.content, "html.parser")
-    return fail_gracefully(soup.get_text)
+def _retrieve_page(
+    response: Response, extractor: TextExtractor, pdf_config: PdfConfig
+) -> Optional[ExtractedPage]:
+    """Parsed in a process pool if configured, see
+    :py:class:`industry_news.fetcher.extraction.TextExtractor`."""
+    content: bytes = response.content
+    if is_pdf(response, content):  # E.g. served as application/octet-stream
+        return _retrieve_pdf(content, extractor, pdf_config)
+    return extractor.extract(content, declared_encoding(response))
+
+
+def _retrieve_pdf(
+    content: bytes, extractor: TextExtractor, config: PdfConfig
+) -> Optional[ExtractedPage]:
+    return extractor.extract_pdf(content, config)
+
+
+def _read_capped(response: Response, max_bytes: int) -> Optional[bytes]:
+    """The body of a streamed response, or None if it's over `max_bytes`.
+    Reading stops there, without downloading the rest."""
+    if int(response.headers.get("Content-Length") or 0) > max_bytes:
+        return None
+    content = bytearray()
+    for chunk in response.iter_content(chunk_size=_CHUNK_BYTES):
+        content += chunk
+        if len(content) > max_bytes:
+            return None
+    return bytes(content)
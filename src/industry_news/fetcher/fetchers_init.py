@@ -1,10 +1,11 @@
-from industry_news.config import SingleSourceConfig, SourcesConfig
+from industry_news.config import Config, SingleSourceConfig
 from industry_news.fetcher.hackernews_api import HackerNewsApi
 from industry_news.sources import Source
 from industry_news.fetcher.fetcher import MetadataFetcher, SummaryFetcher
 from industry_news.fetcher.futuretools_scraper import FutureToolsScraper
 
 
+from pathlib import Path
 from typing import Callable, Dict, List, Optional
 
 from industry_news.fetcher.reddit_api import RedditApi
@@ -12,51 +13,61 @@ from industry_news.fetcher.researchhub_api import ResearchHubApi
 
 
 METADATA_FETCHERS_BY_SOURCE: Dict[
-    Source, Callable[[Optional[str]], MetadataFetcher]
+    Source, Callable[[Optional[str], Config], MetadataFetcher]
 ] = {
-    Source.REDDIT: lambda subspace: _reddit_api(subspace),
-    Source.HACKER_NEWS: lambda _: HackerNewsApi(),
-    Source.FUTURE_TOOLS: lambda _: FutureToolsScraper(),
+    Source.REDDIT: lambda subspace, config: _reddit_api(subspace, config),
+    Source.HACKER_NEWS: lambda _, config: HackerNewsApi(
+        data_backup_path=_data_dir(config) / "hackernews",
+        score_refresh_age_h=config.sources.score_refresh_age_h,
+    ),
+    Source.FUTURE_TOOLS: lambda _, config: FutureToolsScraper(),
 }
-SUMMARY_FETCHERS_BY_SOURCE: Dict[Source, Callable[[], SummaryFetcher]] = {
-    Source.RESEARCH_HUB: lambda: ResearchHubApi()
+SUMMARY_FETCHERS_BY_SOURCE: Dict[
+    Source, Callable[[Config], SummaryFetcher]
+] = {
+    Source.RESEARCH_HUB: lambda config: ResearchHubApi(
+        data_backup_path=_data_dir(config) / "researchhub"
+    )
 }
 
 
-def init_summary_fetchers(
-    sources_config: SourcesConfig,
-) -> List[SummaryFetcher]:
+def init_summary_fetchers(config: Config) -> List[SummaryFetcher]:
     with_summary_sources: List[SingleSourceConfig] = (
-        sources_config.with_summary
+        config.sources.with_summary
     )
     return [
-        SUMMARY_FETCHERS_BY_SOURCE[config.name]()
-        for config in with_summary_sources
+        SUMMARY_FETCHERS_BY_SOURCE[source_config.name](config)
+        for source_config in with_summary_sources
     ]
 
 
-def init_metadata_fetchers(
-    sources_config: SourcesConfig,
-) -> List[MetadataFetcher]:
+def init_metadata_fetchers(config: Config) -> List[MetadataFetcher]:
     without_summary_sources: List[SingleSourceConfig] = (
-        sources_config.without_summary
+        config.sources.without_summary
     )
     fetchers: List[MetadataFetcher] = []
 
-    for config in without_summary_sources:
-        if config.subspaces:
-            for subspace in config.subspaces:
-                fetchers.append(
-                    METADATA_FETCHERS_BY_SOURCE[config.name](subspace)
-                )
+    for source_config in without_summary_sources:
+        fetcher_factory = METADATA_FETCHERS_BY_SOURCE[source_config.name]
+        if source_config.subspaces:
+            for subspace in source_config.subspaces:
+                fetchers.append(fetcher_factory(subspace, config))
         else:
-            fetchers.append(METADATA_FETCHERS_BY_SOURCE[config.name](None))
+            fetchers.append(fetcher_factory(None, config))
 
     return fetchers
 
 
-def _reddit_api(subreddit: Optional[str]) -> RedditApi:
+def _reddit_api(subreddit: Optional[str], config: Config) -> RedditApi:
     if subreddit:
-        return RedditApi(subreddit)
+        return RedditApi(
+            subreddit,
+            data_dir=_data_dir(config),
+            score_refresh_age_h=config.sources.score_refresh_age_h,
+        )
     else:
         raise ValueError("Subreddit name not provided.")
+
+
+def _data_dir(config: Config) -> Path:
+    return config.digest.out_path / "data"
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 import logging
 from bs4 import BeautifulSoup
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from requests.models import Response
 from urllib.parse import urlparse, ParseResult
 from industry_news.digest.article import ArticleMetadata
@@ -30,9 +30,9 @@ class FutureToolsScraper(MetadataFetcher):
     def subspace(self) -> Optional[str]:
         return None
 
-    def articles_metadata(
+    def iter_articles_metadata(
         self, since: datetime, until: datetime
-    ) -> List[ArticleMetadata]:
+    ) -> Iterator[ArticleMetadata]:
         self._LOGGER.info(
             "Fetching articles from FutureTools between %s and %s",
             since,
@@ -47,8 +47,7 @@ class FutureToolsScraper(MetadataFetcher):
     @staticmethod
     def _articles_from_page(
         soup: BeautifulSoup, since: datetime, until: datetime
-    ) -> List[ArticleMetadata]:
-        articles: List[ArticleMetadata] = []
+    ) -> Iterator[ArticleMetadata]:
         list_div: Tag = verify_page_element(soup.find("div", role="list"), Tag)
         list_items: List[Tag] = list_div.find_all("div", role="listitem")
 
@@ -62,18 +61,14 @@ class FutureToolsScraper(MetadataFetcher):
             elif publication_date < since:
                 break
 
-            articles.append(
-                ArticleMetadata(
-                    title=FutureToolsScraper._single_article_title(item),
-                    source=Source.FUTURE_TOOLS,
-                    url=FutureToolsScraper._single_article_url(item),
-                    publication_date_utc=publication_date,
-                    score=0,  # No scores on the site
-                )
+            yield ArticleMetadata(
+                title=FutureToolsScraper._single_article_title(item),
+                source=Source.FUTURE_TOOLS,
+                url=FutureToolsScraper._single_article_url(item),
+                publication_date_utc=publication_date,
+                score=0,  # No scores on the site
             )
 
-        return articles
-
     @staticmethod
     def _single_article_url(div: Tag) -> ParseResult:
         link_tag: Tag = verify_page_element(div.find("a"), Tag)
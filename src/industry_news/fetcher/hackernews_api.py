@@ -1,14 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, List, Optional, Union
+from typing import Any, Iterator, List, Optional, Union
 from urllib.parse import ParseResult, urlparse
-from pydantic import BaseModel, validator
+import orjson
+from pydantic import BaseModel, field_validator
 from industry_news.config import load_config
+from industry_news.deadline import current_deadline
 from industry_news.digest.article import ArticleMetadata
 from industry_news.fetcher.fetcher import MetadataFetcher
+from industry_news.fetcher.incremental import (
+    FetchCursor,
+    IncrementalStore,
+    metadata_store,
+)
 from industry_news.fetcher.web_tools import (
-    get_json_with_backup,
+    get_bytes_with_backup,
     get_with_retries,
 )
 from industry_news.sources import Source
@@ -17,6 +26,7 @@ from industry_news.utils import to_utc_datetime
 
 class HackerNewsStory(BaseModel):
     by: str
+    descendants: int = 0  # Comment count
     id: int
     score: int
     text: Optional[str] = None
@@ -25,7 +35,8 @@ class HackerNewsStory(BaseModel):
     type: str
     url: str
 
-    @validator("time", pre=True)
+    @field_validator("time", mode="before")
+    @classmethod
     def convert_epoch_to_datetime(cls, value: int) -> datetime:
         if isinstance(value, int):
             return to_utc_datetime(value).replace(microsecond=1)
@@ -37,16 +48,47 @@ class HackerNewsApi(MetadataFetcher):
     _LOGGER = logging.getLogger(__name__)
     _API_BASE_URL = "https://hacker-news.firebaseio.com/v0"
     _MAX_JUMP_SIZE = 2000
+    _REFRESH_WORKERS = 8
+    # Scores barely change within minutes, backups this young aren't
+    # refreshed.
+    _MIN_BACKUP_AGE = timedelta(minutes=10)
 
     def __init__(
         self,
         api_base_url: str = _API_BASE_URL,
-        data_backup_path: Path = load_config().digest.out_path
-        / "data"
-        / "hackernews",
+        data_backup_path: Optional[Path] = None,
+        store: Optional[IncrementalStore[ArticleMetadata]] = None,
+        score_refresh_age_h: Optional[float] = None,
     ) -> None:
+        """
+        Args:
+            data_backup_path: Defaults to the `DIGEST_NAME` digest's data
+            dir.
+            store: Stories fetched in earlier runs and the highest item id
+            seen. Defaults to a store in `data_backup_path`'s parent dir.
+            score_refresh_age_h: Stories (stored or backed up) that were
+            younger than this when fetched are fetched again for their
+            current score. None to never refresh them.
+        """
+        data_backup_path = data_backup_path or (
+            load_config().digest.out_path / "data" / "hackernews"
+        )
         self._api_base_url = api_base_url
+        # Item URLs are built from it without parsing each of them.
+        self._item_url_base: ParseResult = urlparse(
+            f"{api_base_url}/item"
+        )
         self._data_backup_path = data_backup_path
+        self._refresh_age: Optional[timedelta] = (
+            timedelta(hours=score_refresh_age_h)
+            if score_refresh_age_h is not None
+            else None
+        )
+        self._store = store or metadata_store(
+            data_backup_path.parent / "cursors" / "hackernews.json",
+            refresh=self._refreshed_stories,
+            refresh_age=self._refresh_age,
+        )
 
     @staticmethod
     def source() -> Source:
@@ -55,9 +97,9 @@ class HackerNewsApi(MetadataFetcher):
     def subspace(self) -> Optional[str]:
         return None
 
-    def articles_metadata(
+    def iter_articles_metadata(
         self, since: datetime, until: datetime
-    ) -> List[ArticleMetadata]:
+    ) -> Iterator[ArticleMetadata]:
         # Because of how marvelous the datetime comparison operator works when
         # comparing datetimes with and without microseconds:
         since = since.replace(microsecond=0)
@@ -65,45 +107,169 @@ class HackerNewsApi(MetadataFetcher):
 
         articles_metadata: List[ArticleMetadata] = []
         item_id = self._get_max_item_id()
+        cursor: Optional[FetchCursor] = self._store.cursor(since)
+        # Items up to this one were walked in earlier runs.
+        last_seen_item_id: int = int(cursor.position) if cursor else 0
+        newest_item_id: Optional[int] = None
+        complete: bool = True
 
-        while item_id > 0:
-            item: Union[HackerNewsStory, datetime] = self._get_story(item_id)
+        while item_id > last_seen_item_id:
+            if current_deadline().expired():
+                self._LOGGER.warning(
+                    "Deadline reached, stopping at item %d.", item_id
+                )
+                complete = False
+                break
+
+            item: Union[HackerNewsStory, datetime] = self._get_story(
+                item_id, since, until
+            )
             time: datetime = item if isinstance(item, datetime) else item.time
 
+            if newest_item_id is None and time <= until:
+                newest_item_id = item_id
+
             if isinstance(item, HackerNewsStory):
-                if until >= time >= since:
-                    articles_metadata.append(
-                        self._single_article_metadata(item)
-                    )
+                metadata: ArticleMetadata = self._single_article_metadata(item)
+                articles_metadata.append(metadata)
+                yield metadata
 
             if time < since:
                 break
 
             item_id -= HackerNewsApi._jump_size(current_time=time, until=until)
 
-        return articles_metadata
+        yield from self._store.merged_rest(
+            cursor,
+            articles_metadata,
+            str(newest_item_id) if newest_item_id else None,
+            since,
+            until,
+            complete,
+        )
 
     def _get_max_item_id(self) -> int:
         url: ParseResult = urlparse(f"{self._api_base_url}/maxitem.json")
         response = get_with_retries(url)
         return int(response.json())
 
-    def _get_story(self, item_id: int) -> Union[HackerNewsStory, datetime]:
-        url: ParseResult = urlparse(
-            f"{self._api_base_url}/item/{item_id}.json"
-        )
-        item_data: dict[str, Any] = get_json_with_backup(
-            url, self._id_to_filepath(item_id)
+    def _get_story(
+        self, item_id: int, since: datetime, until: datetime
+    ) -> Union[HackerNewsStory, datetime]:
+        """
+        Most items are comments or stories outside of the window, so only
+        their type, time and liveness are read from the raw JSON. Only live
+        stories published in [since, until] are validated.
+
+        Returns:
+            Union[HackerNewsStory, datetime]: The story or, for any other
+            item, its publication date.
+        """
+        url: ParseResult = self._item_url(item_id)
+        filepath: Path = self._id_to_filepath(item_id)
+        item_data: dict[str, Any] = orjson.loads(
+            get_bytes_with_backup(url, filepath)
         )
         publication_date: datetime = to_utc_datetime(item_data["time"])
 
-        logging.info(f"[Hackernews] {url.geturl()} -- {publication_date}")
+        self._LOGGER.debug(
+            "[Hackernews] item %d -- %s", item_id, publication_date
+        )
 
-        if item_data["type"] == "story" and HackerNewsApi._is_alive(item_data):
+        if (
+            item_data["type"] == "story"
+            and HackerNewsApi._is_alive(item_data)
+            # Stories get microsecond=1, see HackerNewsStory.
+            and since <= publication_date.replace(microsecond=1) <= until
+        ):
+            if self._is_stale_backup(filepath, publication_date):
+                item_data = orjson.loads(
+                    get_bytes_with_backup(
+                        self._item_url(item_id, shallow=True),
+                        filepath,
+                        refresh=True,
+                    )
+                )
+                if not item_data or not HackerNewsApi._is_alive(item_data):
+                    return publication_date
             return HackerNewsApi._data_to_story(item_data, url)
         else:
             return publication_date
 
+    def _is_stale_backup(
+        self, filepath: Path, publication_date: datetime
+    ) -> bool:
+        """Whether a story was backed up while its score was still
+        changing."""
+        if self._refresh_age is None:
+            return False
+        backed_up_at: datetime = datetime.fromtimestamp(
+            filepath.stat().st_mtime, timezone.utc
+        )
+        return (
+            backed_up_at - publication_date < self._refresh_age
+            and datetime.now(timezone.utc) - backed_up_at
+            > self._MIN_BACKUP_AGE
+        )
+
+    def _refreshed_stories(
+        self, stored: List[ArticleMetadata]
+    ) -> List[ArticleMetadata]:
+        """
+        The API has no batch endpoint, so stories are fetched again
+        concurrently, without their comment ids (see :py:meth:`_item_url`).
+        Only their score, comment count and liveness are read.
+        """
+        with ThreadPoolExecutor(
+            max_workers=self._REFRESH_WORKERS, thread_name_prefix="hn_refresh"
+        ) as executor:
+            refreshed: List[Optional[ArticleMetadata]] = list(
+                executor.map(self._refreshed_story, stored)
+            )
+        return [metadata for metadata in refreshed if metadata is not None]
+
+    def _refreshed_story(
+        self, metadata: ArticleMetadata
+    ) -> Optional[ArticleMetadata]:
+        """
+        Returns:
+            Optional[ArticleMetadata]: None if the story is dead or deleted.
+        """
+        if metadata.source_id is None:  # Stored before ids were
+            return metadata
+        item_id = int(metadata.source_id)
+        try:
+            item_data: Optional[dict[str, Any]] = orjson.loads(
+                get_bytes_with_backup(
+                    self._item_url(item_id, shallow=True),
+                    self._id_to_filepath(item_id),
+                    refresh=True,
+                )
+            )
+        except Exception as e:
+            self._LOGGER.warning("Failed to refresh item %d: %r", item_id, e)
+            return metadata
+
+        if not item_data or not HackerNewsApi._is_alive(item_data):
+            return None
+        return replace(
+            metadata,
+            score=item_data.get("score", metadata.score),
+            comments=item_data.get("descendants", metadata.comments),
+        )
+
+    def _item_url(self, item_id: int, shallow: bool = False) -> ParseResult:
+        """
+        Args:
+            shallow: Leave out nested values, i.e. ids of comments (`kids`
+            becomes `true`). Popular stories have thousands of them, while
+            a refresh only needs their score and comment count.
+        """
+        return self._item_url_base._replace(
+            path=f"{self._item_url_base.path}/{item_id}.json",
+            query="shallow=true" if shallow else "",
+        )
+
     def _id_to_filepath(self, item_id: int) -> Path:
         return self._data_backup_path / f"{item_id}.json"
 
@@ -150,4 +316,6 @@ class HackerNewsApi(MetadataFetcher):
             source=Source.HACKER_NEWS,
             publication_date_utc=item.time,
             score=item.score,
+            comments=item.descendants,
+            source_id=str(item.id),
         )
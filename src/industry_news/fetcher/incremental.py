@@ -0,0 +1,283 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar
+
+from industry_news.deadline import current_deadline
+from industry_news.digest.article import ArticleMetadata, ArticleSummary
+from industry_news.utils import from_file_backup, to_file_backup
+
+_LOGGER = logging.getLogger(__name__)
+_RETENTION = timedelta(days=60)
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class FetchCursor:
+    """
+    All items published in [covered_since, covered_until] are stored
+    locally. `position` is a source-native marker (an item id, a fullname,
+    etc.) of the newest of them, a new walk can stop once it reaches it.
+    """
+
+    covered_since: datetime
+    covered_until: datetime
+    position: str
+
+
+class IncrementalStore(Generic[T]):
+    """
+    Persists items fetched from a single source + subspace together with a
+    cursor, so the next run only needs to fetch items newer than the
+    cursor and merge them with stored ones.
+
+    Items that were young when stored (their scores still changing) can be
+    refreshed on the next run, older ones are assumed to be settled.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        to_dict: Callable[[T], Dict[str, Any]],
+        from_dict: Callable[[Dict[str, Any]], T],
+        publication_date: Callable[[T], datetime],
+        item_key: Callable[[T], str],
+        retention: timedelta = _RETENTION,
+        refresh: Optional[Callable[[List[T]], List[T]]] = None,
+        refresh_age: Optional[timedelta] = None,
+    ) -> None:
+        """
+        Args:
+            refresh: Fetches current versions of stored items, leaving out
+            ones that no longer exist. Items it fails to fetch should be
+            returned as they are.
+            refresh_age: Stored items younger than this when stored are
+            passed to `refresh` on the next merge.
+        """
+        self._path = path
+        self._to_dict = to_dict
+        self._from_dict = from_dict
+        self._publication_date = publication_date
+        self._item_key = item_key
+        self._retention = retention
+        self._refresh = refresh
+        self._refresh_age = refresh_age
+
+    def cursor(self, since: datetime) -> Optional[FetchCursor]:
+        """
+        Returns:
+            Optional[FetchCursor]: A stored cursor if stored items can be used
+            for a window starting at `since`, i.e. no items older than what is
+            stored are needed.
+        """
+        data: Optional[dict[str, Any]] = from_file_backup(self._path)
+        if not data or "cursor" not in data:
+            return None
+
+        cursor = FetchCursor(
+            covered_since=datetime.fromisoformat(
+                data["cursor"]["covered_since"]
+            ),
+            covered_until=datetime.fromisoformat(
+                data["cursor"]["covered_until"]
+            ),
+            position=data["cursor"]["position"],
+        )
+        if not cursor.covered_since <= since <= cursor.covered_until:
+            # Either older items are needed or there would be a gap between
+            # stored and fetched items.
+            _LOGGER.info(
+                "Stored items in %s cover %s - %s, fetching everything "
+                "since %s.",
+                self._path,
+                cursor.covered_since,
+                cursor.covered_until,
+                since,
+            )
+            return None
+        return cursor
+
+    def merge(
+        self,
+        cursor: Optional[FetchCursor],
+        fetched: List[T],
+        newest_position: Optional[str],
+        since: datetime,
+        until: datetime,
+        complete: bool = True,
+    ) -> List[T]:
+        """
+        Args:
+            cursor: The one returned by :py:meth:`cursor`. If None, `fetched`
+            replaces stored items.
+            fetched: Items fetched in this run, newer than the cursor.
+            newest_position: A position of the newest fetched item published
+            before `until`.
+            complete: False if the walk was cut short (e.g. by a deadline).
+            Such items are returned but not stored, since there may be a
+            gap between them and the cursor.
+
+        Returns:
+            List[T]: Fetched and stored items published in [since, until],
+            newest first.
+        """
+        items: List[T] = fetched + (
+            self._stored_items_not_in(fetched) if cursor is not None else []
+        )
+        items.sort(key=self._publication_date, reverse=True)
+
+        if complete:
+            self._save(cursor, items, newest_position, since, until)
+        else:
+            _LOGGER.info(
+                "Incomplete fetch, keeping the stored cursor in %s.",
+                self._path,
+            )
+        return [
+            item
+            for item in items
+            if since <= self._publication_date(item) <= until
+        ]
+
+    def merged_rest(
+        self,
+        cursor: Optional[FetchCursor],
+        fetched: List[T],
+        newest_position: Optional[str],
+        since: datetime,
+        until: datetime,
+        complete: bool = True,
+    ) -> List[T]:
+        """
+        Like :py:meth:`merge`, for fetchers that already yielded `fetched`
+        while walking a source: only stored items are returned.
+        """
+        fetched_keys = {self._item_key(item) for item in fetched}
+        return [
+            item
+            for item in self.merge(
+                cursor, fetched, newest_position, since, until, complete
+            )
+            if self._item_key(item) not in fetched_keys
+        ]
+
+    def _save(
+        self,
+        cursor: Optional[FetchCursor],
+        items: List[T],
+        newest_position: Optional[str],
+        since: datetime,
+        until: datetime,
+    ) -> None:
+        covered_since: datetime = cursor.covered_since if cursor else since
+        covered_until: datetime = until
+        position: Optional[str] = newest_position
+
+        if cursor and cursor.covered_until > until:
+            covered_until, position = cursor.covered_until, cursor.position
+        elif position is None and cursor:
+            position = cursor.position
+        if position is None:  # Nothing was ever fetched
+            return
+
+        oldest_kept: datetime = datetime.now(timezone.utc) - self._retention
+        if covered_since < oldest_kept:
+            covered_since = oldest_kept
+            items = [
+                item
+                for item in items
+                if self._publication_date(item) >= oldest_kept
+            ]
+
+        to_file_backup(
+            self._path,
+            {
+                "cursor": {
+                    "covered_since": covered_since.isoformat(),
+                    "covered_until": covered_until.isoformat(),
+                    "position": position,
+                },
+                "saved_at": datetime.now(timezone.utc).isoformat(),
+                "items": [self._to_dict(item) for item in items],
+            },
+        )
+
+    def _stored_items_not_in(self, fetched: List[T]) -> List[T]:
+        """Freshly fetched copies of items win over stored ones."""
+        data: Optional[dict[str, Any]] = from_file_backup(self._path)
+        fetched_keys = {self._item_key(item) for item in fetched}
+        stored: List[T] = [
+            self._from_dict(item) for item in (data or {}).get("items", [])
+        ]
+        return self._refreshed(
+            [
+                item
+                for item in stored
+                if self._item_key(item) not in fetched_keys
+            ],
+            (data or {}).get("saved_at"),
+        )
+
+    def _refreshed(self, stored: List[T], saved_at: Optional[str]) -> List[T]:
+        if (
+            self._refresh is None
+            or self._refresh_age is None
+            # Stored before refreshing was introduced
+            or saved_at is None
+            or current_deadline().expired()
+        ):
+            return stored
+
+        young_since: datetime = (
+            datetime.fromisoformat(saved_at) - self._refresh_age
+        )
+        young: List[T] = [
+            item
+            for item in stored
+            if self._publication_date(item) > young_since
+        ]
+        if not young:
+            return stored
+
+        refreshed: List[T] = self._refresh(young)
+        _LOGGER.info(
+            "Refreshed %d items in %s that were young when stored, %d no "
+            "longer exist.",
+            len(young),
+            self._path,
+            len(young) - len(refreshed),
+        )
+        young_keys = {self._item_key(item) for item in young}
+        return refreshed + [
+            item for item in stored if self._item_key(item) not in young_keys
+        ]
+
+
+def metadata_store(
+    path: Path,
+    refresh: Optional[
+        Callable[[List[ArticleMetadata]], List[ArticleMetadata]]
+    ] = None,
+    refresh_age: Optional[timedelta] = None,
+) -> IncrementalStore[ArticleMetadata]:
+    return IncrementalStore(
+        path=path,
+        to_dict=ArticleMetadata.to_dict,
+        from_dict=ArticleMetadata.from_dict,
+        publication_date=lambda metadata: metadata.publication_date_utc,
+        item_key=lambda metadata: metadata.url.geturl(),
+        refresh=refresh,
+        refresh_age=refresh_age,
+    )
+
+
+def summary_store(path: Path) -> IncrementalStore[ArticleSummary]:
+    return IncrementalStore(
+        path=path,
+        to_dict=ArticleSummary.to_dict,
+        from_dict=ArticleSummary.from_dict,
+        publication_date=lambda summary: summary.metadata.publication_date_utc,
+        item_key=lambda summary: summary.metadata.url.geturl(),
+    )
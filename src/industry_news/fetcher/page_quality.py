@@ -0,0 +1,103 @@
+import re
+from typing import Optional, Pattern, Tuple
+
+from industry_news.config import PageQualityConfig
+from industry_news.fetcher.extraction import ExtractedPage
+
+# Phrases are only looked for on short pages, long articles may quote them.
+_SHORT_PAGE_WORDS = 400
+
+
+def _patterns(
+    *reasons_and_patterns: Tuple[str, str]
+) -> Tuple[Tuple[str, Pattern[str]], ...]:
+    return tuple(
+        (reason, re.compile(pattern, re.IGNORECASE))
+        for reason, pattern in reasons_and_patterns
+    )
+
+
+_SIGNATURES = _patterns(
+    (
+        "a bot check interstitial",
+        r"just a moment\.\.\.|checking (if the site connection is "
+        r"secure|your browser)|attention required! \| cloudflare|"
+        r"verify(ing)? (you are|that you are) (a )?human|ddos protection by",
+    ),
+    (
+        "JavaScript required",
+        r"(enable|turn on) javascript|javascript (is )?(disabled|"
+        r"required)|requires javascript",
+    ),
+    (
+        "a paywall",
+        r"subscribe (now )?to (continue|keep) reading|already a "
+        r"subscriber|(this|the) (article|content|story) is (only )?"
+        r"(available|for) (to )?(paid )?subscribers|"
+        r"create a free account to continue",
+    ),
+    (
+        "a login wall",
+        r"(sign|log) in to (continue|read|view)|you must be logged in",
+    ),
+)
+# Common on regular pages too (e.g. cookie banners), so they only explain
+# why a page is too short.
+_WEAK_SIGNATURES = _patterns(
+    (
+        "a cookie wall",
+        r"(accept|agree to) (all )?cookies|cookie (settings|preferences)|"
+        r"we use cookies",
+    ),
+    ("a captcha", r"captcha"),
+    ("access denied", r"access (is )?denied|403 forbidden"),
+)
+
+
+class PageQualityFilter:
+    """
+    Recognizes pages not worth summarizing (bot checks, paywall stubs,
+    cookie walls, link lists, etc.) from their extracted text alone.
+    """
+
+    def __init__(self, config: PageQualityConfig) -> None:
+        self._enabled = config.enabled
+        self._min_words = config.min_words
+        self._max_link_density = config.max_link_density
+
+    def low_value_reason(self, page: ExtractedPage) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: Why the page isn't worth summarizing, None if it
+            is.
+        """
+        if not self._enabled:
+            return None
+
+        words: int = len(page.text.split())
+        if words < self._min_words:
+            return (
+                _matching_signature(page.text, _SIGNATURES)
+                or _matching_signature(page.text, _WEAK_SIGNATURES)
+                or f"too short ({words} words)"
+            )
+
+        link_density: float = page.link_chars / max(
+            len(page.text.strip()), 1
+        )
+        if link_density > self._max_link_density:
+            return f"mostly links ({link_density:.0%} of text)"
+
+        if words < _SHORT_PAGE_WORDS:
+            return _matching_signature(page.text, _SIGNATURES)
+        return None
+
+
+def _matching_signature(
+    text: str, signatures: Tuple[Tuple[str, Pattern[str]], ...]
+) -> Optional[str]:
+    for reason, pattern in signatures:
+        if pattern.search(text):
+            return reason
+    return None
+
@@ -1,27 +1,42 @@
+from dataclasses import replace
 import logging
+from pathlib import Path
 from urllib.parse import ParseResult, urlparse
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Set
 from redditwarp.SYNC import Client
 from redditwarp.models.submission import LinkPost, Submission
 from industry_news.digest.article import ArticleMetadata
-from industry_news.config import Secrets, load_secrets
+from industry_news.config import Secrets, load_config, load_secrets
+from industry_news.deadline import current_deadline
 from industry_news.sources import Source
 from industry_news.fetcher.fetcher import MetadataFetcher
-from industry_news.utils import retry, to_utc_datetime
+from industry_news.fetcher.incremental import (
+    FetchCursor,
+    IncrementalStore,
+    metadata_store,
+)
+from industry_news.utils import RETRIES, delay_random, to_utc_datetime
 
 
-class RedditApi(MetadataFetcher):
+_RETRY_DELAY_S = (5.0, 5.0)
+_client: Optional[Client] = None
 
-    _LOGGER = logging.getLogger(__name__)
 
-    @staticmethod
-    def _reddit_client() -> Client:
+def _reddit_client() -> Client:
+    global _client
+    if _client is None:
         secrets: Secrets = load_secrets()
-        return Client(
+        _client = Client(
             secrets.reddit.client_id,
             secrets.reddit.client_secret.get_secret_value(),
         )
+    return _client
+
+
+class RedditApi(MetadataFetcher):
+
+    _LOGGER = logging.getLogger(__name__)
 
     @staticmethod
     def source() -> Source:
@@ -30,23 +45,71 @@ class RedditApi(MetadataFetcher):
     def subspace(self) -> Optional[str]:
         return self._subreddit
 
-    def __init__(self, subreddit: str, reddit: Client = _reddit_client()):
+    def __init__(
+        self,
+        subreddit: str,
+        reddit: Optional[Client] = None,
+        store: Optional[IncrementalStore[ArticleMetadata]] = None,
+        score_refresh_age_h: Optional[float] = None,
+        data_dir: Optional[Path] = None,
+    ):
+        """
+        Args:
+            reddit: Defaults to a client shared by all subreddits.
+            store: Posts fetched in earlier runs and the fullname of the
+            newest one. Defaults to a per-subreddit store in `data_dir`.
+            score_refresh_age_h: Stored posts that were younger than this
+            when fetched are fetched again for their current score. None to
+            never refresh them.
+            data_dir: Defaults to the `DIGEST_NAME` digest's data dir.
+        """
         if not subreddit:
             raise ValueError("Subreddit cannot be blank.")
-        self._reddit = reddit
+        self._reddit = reddit or _reddit_client()
         self._subreddit = subreddit
+        self._store = store or metadata_store(
+            (data_dir or load_config().digest.out_path / "data")
+            / "cursors"
+            / f"reddit_{subreddit}.json",
+            refresh=self._refreshed_posts,
+            refresh_age=(
+                timedelta(hours=score_refresh_age_h)
+                if score_refresh_age_h is not None
+                else None
+            ),
+        )
 
-    def articles_metadata(
+    def iter_articles_metadata(
         self, since: datetime, until: datetime
-    ) -> List[ArticleMetadata]:
-        return retry(  # No convenient retry mechanism in redditwarp
-            lambda: self.articles_metadata_wihtout_retries(since, until),
-            delay_range_s=(5, 5),
-        )
+    ) -> Iterator[ArticleMetadata]:
+        """
+        No convenient retry mechanism in redditwarp, so a failed walk is
+        retried from the start, skipping posts that were already yielded.
+        """
+        yielded: Set[str] = set()
+        for attempt in range(1, RETRIES + 1):
+            try:
+                for metadata in self._iter_articles_metadata(since, until):
+                    if metadata.url.geturl() not in yielded:
+                        yielded.add(metadata.url.geturl())
+                        yield metadata
+                return
+            except Exception as e:
+                if attempt == RETRIES or current_deadline().expired(
+                    reserve_s=_RETRY_DELAY_S[1]
+                ):
+                    raise
+                self._LOGGER.exception(e)
+                delay_random(_RETRY_DELAY_S)
 
     def articles_metadata_wihtout_retries(
         self, since: datetime, until: datetime = datetime.now()
     ) -> List[ArticleMetadata]:
+        return list(self._iter_articles_metadata(since, until))
+
+    def _iter_articles_metadata(
+        self, since: datetime, until: datetime
+    ) -> Iterator[ArticleMetadata]:
         self._LOGGER.info(
             "Fetching articles from %s between %s and %s",
             self._subreddit,
@@ -55,8 +118,19 @@ class RedditApi(MetadataFetcher):
         )
         iterator = self._reddit.p.subreddit.pull.new(sr=self._subreddit)
         articles: List[ArticleMetadata] = []
+        cursor: Optional[FetchCursor] = self._store.cursor(since)
+        newest_fullname: Optional[str] = None
+        complete: bool = True
 
         for submission in iterator:
+            if current_deadline().expired():
+                self._LOGGER.warning(
+                    "Deadline reached, stopping fetching from %s.",
+                    self._subreddit,
+                )
+                complete = False
+                break
+
             metadata: ArticleMetadata = RedditApi._single_article_metadata(
                 submission
             )
@@ -65,10 +139,70 @@ class RedditApi(MetadataFetcher):
                 continue
             elif metadata.publication_date_utc < since:
                 break
+            elif cursor and RedditApi._is_stored(submission, cursor):
+                break
 
+            newest_fullname = newest_fullname or RedditApi._fullname(
+                submission
+            )
             articles.append(metadata)
+            yield metadata
+
+        yield from self._store.merged_rest(
+            cursor, articles, newest_fullname, since, until, complete
+        )
+
+    def _refreshed_posts(
+        self, stored: List[ArticleMetadata]
+    ) -> List[ArticleMetadata]:
+        """Fetches posts in batches of up to 100 (a single request each),
+        updating scores and comment counts and leaving out removed ones."""
+        ids36: List[str] = [
+            metadata.source_id.removeprefix("t3_")
+            for metadata in stored
+            if metadata.source_id is not None
+        ]
+        try:
+            submissions: Dict[str, Submission] = {
+                f"t3_{submission.id36}": submission
+                for submission in self._reddit.p.submission.bulk_fetch(ids36)
+            }
+        except Exception as e:
+            self._LOGGER.warning(
+                "Failed to refresh posts from %s: %r", self._subreddit, e
+            )
+            return stored
+
+        refreshed: List[ArticleMetadata] = []
+        for metadata in stored:
+            if metadata.source_id is None:  # Stored before ids were
+                refreshed.append(metadata)
+                continue
+            submission: Optional[Submission] = submissions.get(
+                metadata.source_id
+            )
+            if submission is None or submission.removal_category is not None:
+                continue
+            refreshed.append(
+                replace(
+                    metadata,
+                    score=submission.score,
+                    comments=submission.comment_count,
+                )
+            )
+        return refreshed
 
-        return articles
+    @staticmethod
+    def _is_stored(submission: Submission, cursor: FetchCursor) -> bool:
+        return (
+            RedditApi._fullname(submission) == cursor.position
+            # In case the newest stored post got deleted:
+            or to_utc_datetime(submission.created_ut) < cursor.covered_until
+        )
+
+    @staticmethod
+    def _fullname(submission: Submission) -> str:
+        return f"t3_{submission.id36}"
 
     @staticmethod
     def _single_article_metadata(submission: Submission) -> ArticleMetadata:
@@ -79,7 +213,9 @@ class RedditApi(MetadataFetcher):
             source=Source.REDDIT,
             publication_date_utc=publication_date,
             score=submission.score,  # Upvotes - downvotes
+            comments=submission.comment_count,
             context={"subreddit": submission.subreddit.name},
+            source_id=RedditApi._fullname(submission),
         )
 
     @staticmethod
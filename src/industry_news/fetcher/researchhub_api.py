@@ -1,10 +1,11 @@
 from datetime import datetime, timezone
 import logging
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, Iterator, List, Optional, Tuple
 from urllib.parse import ParseResult, urlparse
 
 from industry_news.config import load_config
+from industry_news.deadline import current_deadline
 from industry_news.digest.article import ArticleSummary, ArticleMetadata
 from industry_news.sources import Source
 from industry_news.fetcher.fetcher import (
@@ -16,6 +17,11 @@ from industry_news.fetcher.web_tools import (
     get_with_retries,
     modify_url_query,
 )
+from industry_news.fetcher.incremental import (
+    FetchCursor,
+    IncrementalStore,
+    summary_store,
+)
 from industry_news.utils import delay_random, from_file_backup
 
 
@@ -36,10 +42,9 @@ class ResearchHubApi(SummaryFetcher):
         self,
         site_post_url: ParseResult = _SITE_POST_URL,
         site_link: ParseResult = _SITE_LINK,
-        data_backup_path: Path = load_config().digest.out_path
-        / "data"
-        / "researchhub",
+        data_backup_path: Optional[Path] = None,
         load_data_from_backup: bool = False,
+        store: Optional[IncrementalStore[ArticleSummary]] = None,
     ):
         """
         Args:
@@ -55,11 +60,20 @@ class ResearchHubApi(SummaryFetcher):
             It still useful to use backup files if the whole retrieval process
             succeeded, but the code failed at some later stage when analyzing
             the data.
+
+            store: Articles fetched in earlier runs and the id of the newest
+            document. Defaults to a store in `data_backup_path`'s parent dir.
         """
+        data_backup_path = data_backup_path or (
+            load_config().digest.out_path / "data" / "researchhub"
+        )
         self._site_post_url: ParseResult = site_post_url
         self._site_link: ParseResult = site_link
         self._data_backup_path = data_backup_path
         self._load_data_from_backup = load_data_from_backup
+        self._store = store or summary_store(
+            data_backup_path.parent / "cursors" / "researchhub.json"
+        )
 
     @staticmethod
     def source() -> Source:
@@ -68,15 +82,25 @@ class ResearchHubApi(SummaryFetcher):
     def subspace(self) -> Optional[str]:
         return None
 
-    def article_summaries(
+    def iter_article_summaries(
         self, since: datetime, until: datetime
-    ) -> List[ArticleSummary]:
+    ) -> Iterator[ArticleSummary]:
 
         page: int = 1
         articles: List[ArticleSummary] = []
         paginating: CONTINUE_PAGINATING = CONTINUE_PAGINATING.CONTINUE
+        cursor: Optional[FetchCursor] = self._store.cursor(since)
+        newest_document_id: Optional[str] = None
+        complete: bool = True
 
         while paginating == CONTINUE_PAGINATING.CONTINUE:
+            if current_deadline().expired():
+                self._LOGGER.warning(
+                    "Deadline reached, stopping at page %d.", page
+                )
+                complete = False
+                break
+
             data: dict[str, Any] = self._fetch_page_with_delay(page)
             self._LOGGER.info(
                 "Fetching articles from ResearchHub, page: %d", page
@@ -84,13 +108,18 @@ class ResearchHubApi(SummaryFetcher):
 
             posts: List[Any] = data.get("results", [])
 
-            paginating = self._process_results_page(
-                since, until, articles, posts
+            page_start: int = len(articles)
+            paginating, page_newest_document_id = self._process_results_page(
+                since, until, articles, posts, cursor
             )
+            newest_document_id = newest_document_id or page_newest_document_id
+            yield from articles[page_start:]
 
             page += 1
 
-        return articles
+        yield from self._store.merged_rest(
+            cursor, articles, newest_document_id, since, until, complete
+        )
 
     def _fetch_page_with_delay(self, page: int) -> dict[str, Any]:
         delay_random(delay_range_s=(0.5, 1.0))
@@ -130,19 +159,35 @@ class ResearchHubApi(SummaryFetcher):
         until: datetime,
         articles: List[ArticleSummary],
         posts: List[Any],
-    ) -> CONTINUE_PAGINATING:
+        cursor: Optional[FetchCursor] = None,
+    ) -> Tuple[CONTINUE_PAGINATING, Optional[str]]:
+        """
+        Returns:
+            Tuple[CONTINUE_PAGINATING, Optional[str]]: Whether to fetch the
+            next page and an id of the newest document added from this page.
+        """
+        # An empty page means there is nothing more to fetch.
+        paginating: CONTINUE_PAGINATING = (
+            CONTINUE_PAGINATING.CONTINUE if posts else CONTINUE_PAGINATING.STOP
+        )
+        newest_document_id: Optional[str] = None
+
         for post in posts:
             metadata: Optional[ArticleMetadata] = (
                 self._single_article_metadata(post)
             )
-            paginating: CONTINUE_PAGINATING = CONTINUE_PAGINATING.CONTINUE
 
             if metadata is None:  # Skip non-article posts
                 continue
-            if metadata.publication_date_utc < since:
+            if metadata.publication_date_utc < since or (
+                cursor and self._is_stored(post, metadata, cursor)
+            ):
                 paginating = CONTINUE_PAGINATING.STOP
                 break
             if until >= metadata.publication_date_utc >= since:
+                newest_document_id = newest_document_id or str(
+                    post["documents"]["id"]
+                )
                 articles.append(
                     ArticleSummary(
                         metadata=metadata,
@@ -150,7 +195,16 @@ class ResearchHubApi(SummaryFetcher):
                     )
                 )
 
-        return paginating
+        return paginating, newest_document_id
+
+    @staticmethod
+    def _is_stored(
+        post: Any, metadata: ArticleMetadata, cursor: FetchCursor
+    ) -> bool:
+        return (
+            str(post["documents"]["id"]) == cursor.position
+            or metadata.publication_date_utc < cursor.covered_until
+        )
 
     def _single_article_metadata(self, post: Any) -> Optional[ArticleMetadata]:
         metadata: Optional[ArticleMetadata] = None
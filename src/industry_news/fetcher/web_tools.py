@@ -1,20 +1,26 @@
 import logging
 from pathlib import Path
-from typing import Any, Dict, Optional, Type, TypeVar, Tuple
+import threading
+from typing import Dict, Optional, Type, TypeVar, Tuple
 from httplib2 import RETRIES
 import requests
 from furl import furl
 from urllib.parse import urlparse, ParseResult
+from industry_news.deadline import current_deadline
 from industry_news.utils import retry
-from industry_news.utils import to_file_backup
-from industry_news.utils import from_file_backup
 
 DELAY_RANGE_S: Tuple[float, float] = (1.0, 3.0)
+CONNECT_TIMEOUT_S: float = 5.0
+READ_TIMEOUT_S: float = 30.0
+_MIN_TIMEOUT_S: float = 0.1
 USER_AGENT: str = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
     + "(KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
 )
 _LOGGER = logging.getLogger(__name__)
+# Sessions keep connections alive between requests. They aren't guaranteed
+# to be thread-safe, hence one per thread.
+_sessions = threading.local()
 
 
 T = TypeVar("T")
@@ -53,35 +59,73 @@ def get_with_retries(
     delay_range_s: Tuple[float, float] = DELAY_RANGE_S,
     user_agent: str = USER_AGENT,
     retries: int = RETRIES,
+    stream: bool = False,
 ) -> requests.models.Response:
+    """
+    Every attempt has connect and read timeouts, shortened so that they
+    don't exceed the current deadline (see :py:mod:`industry_news.deadline`).
+
+    Args:
+        stream: Only headers are read, the caller reads (and closes) the
+        body, e.g. to stop reading a large one early.
+    """
     headers: dict = {"User-Agent": user_agent}
     return retry(
-        lambda: requests.get(url.geturl(), headers), delay_range_s, retries
+        lambda: _session().get(
+            url.geturl(), headers=headers, timeout=_timeouts(), stream=stream
+        ),
+        delay_range_s,
+        retries,
+    )
+
+
+def _session() -> requests.Session:
+    if not hasattr(_sessions, "session"):
+        _sessions.session = requests.Session()
+    session: requests.Session = _sessions.session
+    return session
+
+
+def _timeouts() -> Tuple[float, float]:
+    deadline = current_deadline()
+    return (
+        max(deadline.timeout_s(CONNECT_TIMEOUT_S), _MIN_TIMEOUT_S),
+        max(deadline.timeout_s(READ_TIMEOUT_S), _MIN_TIMEOUT_S),
     )
 
 
-def get_json_with_backup(
+def get_bytes_with_backup(
     url: ParseResult,
     filepath: Path,
     delay_range_s: Tuple[float, float] = DELAY_RANGE_S,
     user_agent: str = USER_AGENT,
     retries: int = RETRIES,
-) -> dict[str, Any]:
+    refresh: bool = False,
+) -> bytes:
     """
     Since retrieval from the API is comparitvely very slow, we store fetched
     items locally. In case of any failures when can retrieve them much
     quicker than sending the same HTTP request again.
+
+    Args:
+        refresh: True to fetch the item again and replace its backup, e.g.
+        if it may have changed since.
+
+    Returns:
+        bytes: The raw response body, left to the caller to decode (e.g.
+        with orjson).
     """
-    data_from_file: Optional[dict[str, Any]] = from_file_backup(filepath)
-    item_data: dict[str, Any]
-
-    if data_from_file:
-        _LOGGER.info(f"Loaded from a backup file: {filepath}")
-        item_data = data_from_file
-    else:
-        item_data = get_with_retries(
-            url, delay_range_s, user_agent, retries
-        ).json()
-
-    to_file_backup(filepath, item_data)
-    return item_data
+    if not refresh:
+        try:
+            content: bytes = filepath.read_bytes()
+            _LOGGER.debug("Loaded from a backup file: %s", filepath)
+            return content
+        except FileNotFoundError:
+            pass
+
+    content = get_with_retries(
+        url, delay_range_s, user_agent, retries
+    ).content
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    filepath.write_bytes(content)
+    return content
@@ -1,35 +1,62 @@
-from dataclasses import replace
+from concurrent.futures import TimeoutError
+from contextlib import contextmanager
+import copy
+from dataclasses import dataclass
 from decimal import Decimal
 from functools import lru_cache, wraps
+import json
 import logging
 import math
 import os
 from pathlib import Path
+import time
 from typing import (
     Any,
     Callable,
     Dict,
     Generator,
+    Hashable,
+    Iterable,
+    Iterator,
     List,
     Optional,
+    Sequence,
+    Tuple,
     Type,
     TypeVar,
 )
 from langchain.prompts import PromptTemplate
 from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_community.callbacks import openai_info, manager
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.runnables import Runnable
 from langchain_google_vertexai import VertexAI
 from langchain_openai import ChatOpenAI
 from langchain_openai.llms.base import BaseOpenAI
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import tiktoken
 from industry_news.digest.article import ArticleMetadata, ArticleSummary
+from industry_news.digest.article_batch import ArticleBatch
+from industry_news.digest.pre_ranking import PreRanking
 from industry_news.config import (
+    Config,
     FilterModelConfig,
+    LLMBackendConfig,
+    LLMRoutingConfig,
+    SummaryBatchingConfig,
     SummaryModelConfig,
     load_config,
     load_secrets,
 )
+from industry_news.deadline import current_deadline
+from industry_news.llm_routing import LLMRouter, NoBackendAvailable
+from industry_news.relevance_classifier import LocalRelevanceFilter
 from industry_news.sources import Source
+from industry_news.text_compression import (
+    CompressionStats,
+    ExtractiveCompressor,
+)
 from industry_news.utils import (
     fail_gracefully,
     load_as_string,
@@ -38,8 +65,45 @@ from industry_news.utils import (
 
 _LOGGER = logging.getLogger(__name__)
 _PROMPT_PATH = "prompts"
-_NUM_OF_DIFFERENT_MODELS = 2
+_LINE_SEPARATOR_TOKEN_COUNT = 1
+_FALLBACK_ENCODING = "cl100k_base"
+# For English text, when estimating tokens without a tokenizer.
+_CHARS_PER_TOKEN = 4
+# Failed calls are retried by LLMRouter, which also backs off when it's
+# rate-limited, so clients retry only once on their own.
+_CLIENT_RETRIES = 1
+_FAILED_SUMMARY = "Failed to summarize."
 T = TypeVar("T")
+K = TypeVar("K", bound=Hashable)
+
+
+def _chat_openai(backend: LLMBackendConfig) -> ChatOpenAI:
+    secrets = load_secrets().llm
+    api_key = (
+        secrets.openai_api_keys[backend.api_key_name]
+        if backend.api_key_name
+        else secrets.openai_api_key
+    )
+    return ChatOpenAI(
+        max_retries=_CLIENT_RETRIES,
+        model_name=backend.model,
+        openai_api_key=api_key.get_secret_value(),
+        base_url=backend.base_url,
+        timeout=backend.timeout_s,
+    )
+
+
+def _with_timeout(
+    backends: List[LLMBackendConfig], timeout_s: float
+) -> List[LLMBackendConfig]:
+    """Backends timing out their requests after the model's `timeout_s`
+    unless they have a timeout of their own."""
+    return [
+        backend
+        if backend.timeout_s is not None
+        else backend.model_copy(update={"timeout_s": timeout_s})
+        for backend in backends
+    ]
 
 
 class TextSummarizer:
@@ -51,50 +115,276 @@ class TextSummarizer:
         os.environ[service_account_env] = str(
             load_secrets().llm.service_account_file_path
         )
-        vertex_ai = VertexAI(max_retries=3, model=model_name)
+        vertex_ai = VertexAI(max_retries=_CLIENT_RETRIES, model=model_name)
         os.environ.pop(service_account_env)
 
         return vertex_ai
 
     def __init__(
         self,
-        summary_prompt_file_name: str = (
-            f"{load_config().digest.name}/{_PROMPT_PATH}/summarize_prompt.txt"
-        ),
-        config: SummaryModelConfig = load_config().llm.summary_model,
+        summary_prompt_file_name: Optional[str] = None,
+        config: Optional[SummaryModelConfig] = None,
         vertex_ai_factory: Callable[[str], VertexAI] = _vertex_ai,
+        summary_batch_prompt_file_name: Optional[str] = None,
+        openai_factory: Callable[[LLMBackendConfig], ChatOpenAI] = (
+            _chat_openai
+        ),
+        routing: Optional[LLMRoutingConfig] = None,
     ) -> None:
+        """
+        Args:
+            summary_prompt_file_name, config, summary_batch_prompt_file_name,
+            routing: Default to ones of the `DIGEST_NAME` digest, see
+            :py:meth:`for_digest` for other digests.
+        """
+        summary_prompt_file_name = summary_prompt_file_name or (
+            f"{load_config().digest.name}/{_PROMPT_PATH}/summarize_prompt.txt"
+        )
+        summary_batch_prompt_file_name = summary_batch_prompt_file_name or (
+            f"{load_config().digest.name}/{_PROMPT_PATH}"
+            "/summarize_batch_prompt.txt"
+        )
+        config = config or load_config().llm.summary_model
+        routing = routing or load_config().llm.routing
         self._summary_prompt_file_name = summary_prompt_file_name
+        self._summary_batch_prompt_file_name = summary_batch_prompt_file_name
         self._config = config
-        self._model = _prompt_template(
-            summary_prompt_file_name
-        ) | vertex_ai_factory(config.name)
+        self._batching: SummaryBatchingConfig = config.batching
+        self._compressor: Optional[ExtractiveCompressor] = (
+            ExtractiveCompressor(config.compression)
+            if config.compression.enabled
+            else None
+        )
+        backends: List[LLMBackendConfig] = _with_timeout(
+            config.backends
+            or [LLMBackendConfig(provider="vertexai", model=config.name)],
+            config.timeout_s,
+        )
+        self._router = LLMRouter(backends, routing)
+        # Models by backend label.
+        self._models: Dict[str, Runnable[Dict[str, Any], str]] = {}
+        self._batch_models: Dict[str, Runnable[Dict[str, Any], str]] = {}
+        for backend in backends:
+            llm: Runnable[Any, str] = (
+                vertex_ai_factory(backend.model)
+                if backend.provider == "vertexai"
+                else openai_factory(backend) | StrOutputParser()
+            )
+            self._models[backend.label()] = (
+                _prompt_template(summary_prompt_file_name) | llm
+            )
+            if self._batching.enabled:
+                self._batch_models[backend.label()] = (
+                    _prompt_template(summary_batch_prompt_file_name) | llm
+                )
+
+    @classmethod
+    def for_digest(cls, config: Config) -> "TextSummarizer":
+        return cls(
+            summary_prompt_file_name=(
+                f"{config.digest.name}/{_PROMPT_PATH}/summarize_prompt.txt"
+            ),
+            config=config.llm.summary_model,
+            summary_batch_prompt_file_name=(
+                f"{config.digest.name}/{_PROMPT_PATH}"
+                "/summarize_batch_prompt.txt"
+            ),
+            routing=config.llm.routing,
+        )
 
     def summarize(
             self, text_generator: Generator[str, None, None]
     ) -> List[str]:
         """
+        If batching is enabled, short texts are collected and summarized
+        several at a time. Summaries are returned in the order of texts
+        either way.
+
         Args:
             text_generator: Use a generator to delegate loading text logic to a
             method's caller and to avoid loading all text into memory at once.
         """
-        summaries: List[str] = []
-        total_cost_usd: Decimal = Decimal(0)
+        summaries: List[Optional[str]] = self._summarize(
+            text_generator, Decimal(0)
+        )[0]
+        return [summary or _FAILED_SUMMARY for summary in summaries]
+
+    def summarize_by_key(
+            self,
+            keyed_texts: Iterable[Tuple[K, str]],
+            spent_usd: Decimal = Decimal(0),
+    ) -> Tuple[Dict[K, Optional[str]], Decimal]:
+        """
+        Like :py:meth:`summarize`, but keeps each summary bound to the key of
+        its text, so callers can tell which texts failed.
 
-        for text in text_generator:
-            total_cost_usd += self._text_cost(text)
+        Args:
+            spent_usd: Cost of earlier calls made for the same query. It
+            counts towards the cost limit.
+
+        Returns:
+            Tuple[Dict[K, Optional[str]], Decimal]: Summaries by key (None if
+            summarizing failed) and the total cost so far. Keys of texts left
+            when the cost limit or the deadline was reached are missing.
+        """
+        keys: List[K] = []
+
+        def texts() -> Iterator[str]:
+            for key, text in keyed_texts:
+                keys.append(key)
+                yield text
+
+        summaries, spent_usd = self._summarize(texts(), spent_usd)
+        return dict(zip(keys, summaries)), spent_usd
+
+    def _summarize(
+            self, texts: Iterator[str], spent_usd: Decimal
+    ) -> Tuple[List[Optional[str]], Decimal]:
+        """
+        Returns:
+            Tuple[List[Optional[str]], Decimal]: Summaries of a prefix of
+            `texts` (None if summarizing failed) and the total cost.
+        """
+        summaries: List[Optional[str]] = []
+        # Positions in `summaries` and texts waiting to be summarized.
+        batch: List[Tuple[int, str]] = []
+        total_cost_usd: Decimal = spent_usd
+        compression_stats = CompressionStats()
+
+        for text in texts:
+            if current_deadline().expired():
+                _LOGGER.warning(
+                    "Deadline reached, skipping remaining summaries."
+                )
+                break
+            text = self._compressed(text, compression_stats)
+            batched: bool = self._is_batched(text)
+            total_cost_usd += self._text_cost(text, batched)
             if total_cost_usd > self._config.query_cost_limit_usd:
                 break
 
-            summary: Optional[str] = self._invoke_model(text)
-            summaries.append(summary if summary else "Failed to summarize.")
+            position: int = len(summaries)
+            summaries.append(None)
+            if not batched:
+                summaries[position] = self._invoke_model(text)
+                continue
+            if not self._fits_in_batch(batch, text):
+                self._summarize_batch(batch, summaries)
+                batch = []
+            batch.append((position, text))
+
+        if batch:
+            self._summarize_batch(batch, summaries)
 
+        compression_stats.log()
         TextSummarizer._log_total_cost(total_cost_usd)
-        return summaries
+        return summaries, total_cost_usd
+
+    def _compressed(self, text: str, stats: CompressionStats) -> str:
+        """Texts over the compression budget are shortened, if enabled."""
+        if self._compressor is None:
+            return text
+        started_s: float = time.perf_counter()
+        compressed: str = self._compressor.compress(text)
+        if compressed is text:
+            return text
+
+        elapsed_s: float = time.perf_counter() - started_s
+        _LOGGER.info(
+            "Compressed a text from %d to %d chars in %.1f ms.",
+            len(text),
+            len(compressed),
+            1000 * elapsed_s,
+        )
+        stats.add(
+            len(text),
+            len(compressed),
+            elapsed_s,
+            self._text_cost(text) - self._text_cost(compressed),
+        )
+        return compressed
+
+    def _is_batched(self, text: str) -> bool:
+        return (
+            self._batching.enabled
+            and len(text) <= self._batching.short_text_max_chars
+        )
+
+    def _fits_in_batch(self, batch: List[Tuple[int, str]], text: str) -> bool:
+        return len(batch) < self._batching.batch_max_texts and (
+            sum(len(batch_text) for _, batch_text in batch) + len(text)
+            <= self._batching.batch_max_chars
+        )
+
+    def _summarize_batch(
+        self,
+        batch: List[Tuple[int, str]],
+        summaries: List[Optional[str]],
+    ) -> None:
+        """
+        Sets summaries of batched texts at their positions. Texts without a
+        valid summary in the model's output are summarized on their own.
+        """
+        texts: List[str] = [text for _, text in batch]
+        batch_summaries: Dict[int, str] = (
+            self._invoke_batch_model(texts) if len(texts) > 1 else {}
+        )
+        if len(texts) > 1 and len(batch_summaries) < len(texts):
+            _LOGGER.warning(
+                "No valid summary of %d out of %d batched texts, "
+                "summarizing them one by one.",
+                len(texts) - len(batch_summaries),
+                len(texts),
+            )
+
+        for index, (position, text) in enumerate(batch):
+            summaries[position] = (
+                batch_summaries[index]
+                if index in batch_summaries
+                else self._invoke_model(text)
+            )
+
+    def _invoke_batch_model(self, texts: Sequence[str]) -> Dict[int, str]:
+        """
+        Returns:
+            Dict[int, str]: Summaries by index in `texts`. Missing if the
+            model's output for a text was malformed.
+        """
+        if not self._batch_models:
+            return {}
+        prompt_variables: Dict[str, str] = {
+            "article_count": str(len(texts)),
+            "texts": _numbered_texts(texts),
+        }
+        output: Optional[Any] = fail_gracefully(
+            lambda: self._router.call(
+                lambda label: self._batch_models[label].invoke(
+                    prompt_variables
+                ),
+                self._config.timeout_s,
+                cost_usd=sum(
+                    (self._text_cost(text, batched=True) for text in texts),
+                    Decimal(0),
+                ),
+                tokens=sum(
+                    self._prompt_tokens(text, batched=True) for text in texts
+                ),
+            )
+        )
+        return (
+            _parse_batch_summaries(_verify_output(output, str), len(texts))
+            if output
+            else {}
+        )
 
     def _invoke_model(self, text: str) -> Optional[str]:
         output: Optional[Any] = fail_gracefully(
-            lambda: self._model.invoke({"text": text})
+            lambda: self._router.call(
+                lambda label: self._models[label].invoke({"text": text}),
+                self._config.timeout_s,
+                cost_usd=self._text_cost(text),
+                tokens=self._prompt_tokens(text),
+            )
         )
         return _verify_output(output=output, type_=str) if output else None
 
@@ -105,12 +395,16 @@ class TextSummarizer:
             float(total_cost_usd),
         )
 
-    def _text_cost(self, text: str) -> Decimal:
+    def _text_cost(self, text: str, batched: bool = False) -> Decimal:
+        """
+        Batched texts pay for a share of the batch prompt, assuming batches
+        are full.
+        """
         completion_to_prompt_len_ratio = Decimal(
             1.0 / self._config.prompt_to_completion_len_ratio
         )
         prompt_cost_usd: Decimal = (
-                Decimal(len(text) + self._prompt_char_len())
+                Decimal(self._prompt_char_len_with(text, batched))
                 / Decimal(1000)  # Cost is per 1k chars
                 * self._config.cost_per_1k_characters_usd
         )
@@ -119,10 +413,25 @@ class TextSummarizer:
                 prompt_cost_usd + prompt_cost_usd * completion_to_prompt_len_ratio
         )
 
+    def _prompt_tokens(self, text: str, batched: bool = False) -> int:
+        """A rough estimate, counted towards per-minute token quotas."""
+        return self._prompt_char_len_with(text, batched) // _CHARS_PER_TOKEN
+
+    def _prompt_char_len_with(self, text: str, batched: bool) -> int:
+        return len(text) + (
+            self._batch_prompt_char_len() // self._batching.batch_max_texts
+            if batched
+            else self._prompt_char_len()
+        )
+
     @lru_cache
     def _prompt_char_len(self) -> int:
         return len(load_as_string(self._summary_prompt_file_name))
 
+    @lru_cache
+    def _batch_prompt_char_len(self) -> int:
+        return len(load_as_string(self._summary_batch_prompt_file_name))
+
 
 class FilterArticlesResponse(BaseModel):
     reasonings: List[str] = Field(
@@ -133,6 +442,42 @@ class FilterArticlesResponse(BaseModel):
     )
 
 
+@dataclass(frozen=True)
+class TitlesChunk:
+    """
+    A numbered list of article descriptions sent to the filter model in a
+    single prompt, together with indices of articles each line describes.
+    """
+
+    text: str
+    article_indices: List[int]
+    # Of `text`, as estimated when packing.
+    token_count: int = 0
+
+    def __len__(self) -> int:
+        return len(self.article_indices)
+
+    def article_index(self, line_number: int) -> int:
+        """
+        Args:
+            line_number: 1-based, as in the numbered list.
+        """
+        return self.article_indices[line_number - 1]
+
+    @staticmethod
+    def from_lines(
+        lines: List[str], article_indices: List[int], token_count: int = 0
+    ) -> "TitlesChunk":
+        numbered_text: str = os.linesep.join(
+            [f"{i + 1}. {line}" for i, line in enumerate(lines)]
+        )
+        return TitlesChunk(
+            text=numbered_text,
+            article_indices=article_indices,
+            token_count=token_count,
+        )
+
+
 class ArticleFiltering:
     _SOURCE_PROMPT_KEY = "source_prompt"
     _FILTER_PROMPT_MAPPINGS: Dict[Source, Dict[str, str]] = {
@@ -146,45 +491,123 @@ class ArticleFiltering:
     }
 
     # We need to use ChatOpenAI instead of OpenAI to have structured output.
-    _OPENAI_FACTORY: Callable[[str], ChatOpenAI] = (
-        lambda model_name: ChatOpenAI(
-            max_retries=3,
-            model_name=model_name,
-            openai_api_key=load_secrets().llm.openai_api_key.get_secret_value(),
-        )
-    )
+    _OPENAI_FACTORY: Callable[[LLMBackendConfig], ChatOpenAI] = _chat_openai
 
     def __init__(
             self,
-            config: FilterModelConfig = load_config().llm.filter_model,
-            prompt_dir: Path = Path(load_config().digest.name) / _PROMPT_PATH,
+            config: Optional[FilterModelConfig] = None,
+            prompt_dir: Optional[Path] = None,
             filter_prompt_file_name: str = "filter_prompt.txt",
-            openai_factory: Callable[[str], ChatOpenAI] = _OPENAI_FACTORY,
+            openai_factory: Callable[[LLMBackendConfig], ChatOpenAI] = (
+                _OPENAI_FACTORY
+            ),
+            pre_ranking: Optional[PreRanking] = None,
+            local_filter: Optional[LocalRelevanceFilter] = None,
+            routing: Optional[LLMRoutingConfig] = None,
     ) -> None:
-        openai_model: ChatOpenAI = openai_factory(config.name)
+        """
+        Args:
+            config, prompt_dir, routing: Default to ones of the
+            `DIGEST_NAME` digest, see :py:meth:`for_digest` for other
+            digests.
+
+        Raises:
+            ValueError: If a configured backend isn't OpenAI-compatible.
+        """
+        config = config or load_config().llm.filter_model
+        prompt_dir = prompt_dir or (
+            Path(load_config().digest.name) / _PROMPT_PATH
+        )
+        routing = routing or load_config().llm.routing
+        default_backend = LLMBackendConfig(
+            provider="openai", model=config.name, timeout_s=config.timeout_s
+        )
+        backends: List[LLMBackendConfig] = _with_timeout(
+            config.backends or [default_backend], config.timeout_s
+        )
+        if any(backend.provider != "openai" for backend in backends):
+            raise ValueError(
+                "Filter model backends must have OpenAI's chat API."
+            )
+        # Costs and tokens are calculated for the configured model.
+        openai_model: ChatOpenAI = openai_factory(default_backend)
+        self._pre_ranking = pre_ranking or PreRanking(config.pre_ranking)
+        self._local_filter = local_filter or LocalRelevanceFilter(
+            config.local_classifier
+        )
         self._prompt_dir = prompt_dir
         self._filter_prompt_file_path = self._prompt_dir / filter_prompt_file_name
         self._model_name = openai_model.model_name
-        self._model = _prompt_template(
-            f"{self._prompt_dir}/{filter_prompt_file_name}"
-        ) | openai_model.with_structured_output(
-            FilterArticlesResponse, method="json_mode"
-        )
+        self._router = LLMRouter(backends, routing)
+        # Models by backend label.
+        self._models: Dict[str, Runnable[Dict[str, Any], Any]] = {
+            backend.label(): _prompt_template(
+                f"{self._prompt_dir}/{filter_prompt_file_name}"
+            )
+            | (
+                openai_model
+                if backend == default_backend
+                else openai_factory(backend)
+            ).with_structured_output(
+                FilterArticlesResponse, method="json_mode"
+            )
+            for backend in backends
+        }
         self._query_cost_limit_usd = config.query_cost_limit_usd
+        self._timeout_s = config.timeout_s
+        self._early_stop_margin = config.early_stop_margin
+        # Model verdicts by article URL (a reason if accepted), so articles
+        # filtered again, e.g. in overlapping backfill windows, aren't sent
+        # to the model twice. Kept for a single job, see `for_new_job`.
+        self._verdicts: Dict[str, Optional[str]] = {}
+        # Token counts by article description, see `prepare`.
+        self._description_tokens: Dict[str, int] = {}
         self._cost_calculator = OpenAICostCalculator(
             openai=openai_model,
             prompt_to_completion_len_ratio=(
                 config.prompt_to_completion_len_ratio
             ),
             context_size_limit=config.context_size_limit,
+            cached_prompt_price_ratio=config.cached_prompt_price_ratio,
         )
 
+    @classmethod
+    def for_digest(cls, config: Config) -> "ArticleFiltering":
+        return cls(
+            config=config.llm.filter_model,
+            prompt_dir=Path(config.digest.name) / _PROMPT_PATH,
+            local_filter=LocalRelevanceFilter(
+                config=config.llm.filter_model.local_classifier,
+                data_dir=config.digest.out_path / "data" / "filter_verdicts",
+                digest_name=config.digest.name,
+            ),
+            routing=config.llm.routing,
+        )
+
+    def for_new_job(self) -> "ArticleFiltering":
+        """
+        A copy sharing models and backend health, but not remembered
+        verdicts, so a long-lived process (see
+        :py:mod:`industry_news.service`) neither accumulates them nor
+        reuses them for later requests.
+        """
+        job: ArticleFiltering = copy.copy(self)
+        job._verdicts = {}
+        job._description_tokens = {}
+        return job
+
     def filter_summaries(
-            self, articles_summaries: List[ArticleSummary]
+            self,
+            articles_summaries: List[ArticleSummary],
+            limit: Optional[int] = None,
     ) -> List[ArticleSummary]:
         """
         Filters the list of articles based on criteria defined in a prompt.
 
+        Args:
+            limit: How many articles the caller needs. See
+            :py:meth:`filter_metadata`.
+
         Returns:
             List[ArticleMetadata]: A returned list is sorted in descending
             order by score.
@@ -197,19 +620,32 @@ class ArticleFiltering:
         sorted_articles: List[ArticleSummary] = self._sort_summaries_by_score(
             articles_summaries
         )
-        remaining_titles: Dict[str, str] = self._filter_by_titles(
-            source, [summary.metadata for summary in sorted_articles]
+        reasons_by_index: Dict[int, str] = self._filter_by_titles(
+            source,
+            [summary.metadata for summary in sorted_articles],
+            self._accept_limit(limit),
         )
 
         return ArticleFiltering._filter_summaries_adding_reasons(
-            sorted_articles, remaining_titles
+            sorted_articles, reasons_by_index
         )
 
     def filter_metadata(
-            self, articles_metadata: List[ArticleMetadata]
+            self,
+            articles_metadata: List[ArticleMetadata],
+            subspace: Optional[str] = None,
+            limit: Optional[int] = None,
     ) -> List[ArticleMetadata]:
         """
         Filters the list of articles based on criteria defined in a prompt.
+        If pre-ranking is enabled, only the best ranked articles are sent to
+        the model.
+
+        Args:
+            limit: How many articles the caller needs. Title chunks are sent
+            in descending order by score and no more are sent once `limit`
+            (+ a configured margin) of the best scored articles are accepted.
+            The result may still be longer than `limit`.
 
         Returns:
             List[ArticleMetadata]: A returned list is sorted in descending
@@ -221,18 +657,84 @@ class ArticleFiltering:
         source: Source = articles_metadata[0].source
         self._log_estimated_cost(source)
 
+        if self._pre_ranking.enabled:
+            articles_metadata = self._pre_ranking.select(
+                ArticleBatch.from_metadata(
+                    articles_metadata, [subspace] * len(articles_metadata)
+                )
+            ).to_metadata()
+
         sorted_articles_metadata: List[ArticleMetadata] = (
             self._sort_metadata_by_score(articles_metadata)
         )
 
-        remaining_titles: Dict[str, str] = self._filter_by_titles(
-            source, sorted_articles_metadata
+        reasons_by_index: Dict[int, str] = self._filter_by_titles(
+            source, sorted_articles_metadata, self._accept_limit(limit)
         )
 
         return ArticleFiltering._filter_metadata_adding_reasons(
-            sorted_articles_metadata, remaining_titles
+            sorted_articles_metadata, reasons_by_index
+        )
+
+    def shortlist(
+            self,
+            shortlisted: List[ArticleMetadata],
+            streamed: List[ArticleMetadata],
+            subspace: Optional[str] = None,
+    ) -> List[ArticleMetadata]:
+        """
+        Adds articles streamed from a source to ones shortlisted from it so
+        far, dropping ones pre-ranking won't select (see
+        :py:meth:`PreRanking.shortlist`), and prepares the rest for
+        filtering (see :py:meth:`prepare`) while the source is still being
+        fetched. Pass the result back with the next articles, then to
+        :py:meth:`filter_metadata`.
+
+        Pre-ranking by a percentile only is decided once all articles are
+        collected, so their tokens are counted only then.
+        """
+        if not self._pre_ranking.enabled:
+            self.prepare(streamed)
+            return shortlisted + streamed
+        articles_metadata: List[ArticleMetadata] = shortlisted + streamed
+        if not self._pre_ranking.bounded:
+            return articles_metadata
+
+        articles_metadata = self._pre_ranking.shortlist(
+            ArticleBatch.from_metadata(
+                articles_metadata, [subspace] * len(articles_metadata)
+            )
+        ).to_metadata()
+        self.prepare(articles_metadata)
+        return articles_metadata
+
+    def prepare(self, articles_metadata: Sequence[ArticleMetadata]) -> None:
+        """
+        Counts tokens of articles' descriptions for packing them into title
+        chunks, e.g. while the rest of a source is still being fetched.
+        Descriptions counted before are skipped.
+        """
+        descriptions: List[str] = [
+            description
+            for metadata in articles_metadata
+            if (description := metadata.description())
+            not in self._description_tokens
+        ]
+        self._description_tokens.update(
+            (description, len(tokens))
+            for description, tokens in zip(
+                descriptions,
+                _encoding(self._model_name).encode_ordinary_batch(
+                    descriptions
+                ),
+            )
         )
 
+    def _accept_limit(self, limit: Optional[int]) -> Optional[int]:
+        if limit is None or self._early_stop_margin is None:
+            return None
+        return limit + self._early_stop_margin
+
     def _log_estimated_cost(self, source: Source) -> None:
         _LOGGER.info(
             "Filtering %s articles. Estimated maximum query cost: %.3f USD.",
@@ -260,20 +762,26 @@ class ArticleFiltering:
 
     def _titles_to_chunks(
             self, article_metadata: List[ArticleMetadata], source: Source
-    ) -> List[str]:
-        chunks: List[str] = _to_chunks(
-            text=ArticleFiltering._to_text(article_metadata),
-            chunk_size=self._titles_chunk_max_token_count(source),
-            model_name=self._model_name,
-        )
+    ) -> List[TitlesChunk]:
         max_chunks: int = self._cost_calculator.max_chunks_within_budget(
             self._query_cost_limit_usd
         )
-        cost_limited_chunks: List[str] = chunks[:max_chunks]
-        return [
-            ArticleFiltering._number_lines(chunk)
-            for chunk in cost_limited_chunks
+        descriptions: List[str] = [
+            metadata.description() for metadata in article_metadata
         ]
+        self.prepare(article_metadata)
+        chunks: List[TitlesChunk] = _pack_titles(
+            descriptions=descriptions,
+            chunk_size=self._titles_chunk_max_token_count(source),
+            max_chunks=max_chunks,
+            model_name=self._model_name,
+            token_counts=[
+                self._description_tokens[description]
+                for description in descriptions
+            ],
+        )
+        self._description_tokens.clear()
+        return chunks
 
     @staticmethod
     def _with_openai_cost_logged(
@@ -283,9 +791,13 @@ class ArticleFiltering:
         def wrapper(
                 self: Any, *args: List[Any], **kwargs: Dict[Any, Any]
         ) -> Any:
-            with manager.get_openai_callback() as openai_callback:
+            with self._cost_calculator.usage_tracked() as usage:
                 result = func(self, *args, **kwargs)
-                _LOGGER.info(openai_callback)
+                _LOGGER.info(usage)
+            _LOGGER.info(
+                "Filter model usage in this run so far:\n%s",
+                self._cost_calculator.run_usage,
+            )
             return result
 
         return wrapper
@@ -294,68 +806,217 @@ class ArticleFiltering:
             self,
             source: Source,
             articles_metadta: List[ArticleMetadata],
-    ) -> Dict[str, str]:
-        article_titles_chunks: List[str] = self._titles_to_chunks(
-            articles_metadta, source
+            accept_limit: Optional[int] = None,
+    ) -> Dict[int, str]:
+        """
+        Articles the local classifier is confident about, or the model has
+        already decided on, are decided without the filter model.
+
+        Args:
+            accept_limit: Stops sending chunks once this many articles are
+            accepted among all articles up to the last one sent. Articles
+            after it can't make it into the top `accept_limit`.
+
+        Returns:
+            Dict[int, str]: [Index in `articles_metadata`, Reason why an
+            article was selected]
+        """
+        reasons_by_index: Dict[int, str]
+        uncertain_indices: List[int]
+        reasons_by_index, uncertain_indices = self._local_filter.triage(
+            articles_metadta
         )
-        remaining_titles: Dict[str, str] = self._filter_titles_by_prompt(
-            source, article_titles_chunks
+        remembered: Dict[int, Optional[str]] = {
+            index: self._verdicts[url]
+            for index in uncertain_indices
+            if (url := articles_metadta[index].url.geturl()) in self._verdicts
+        }
+        for index, remembered_reason in remembered.items():
+            if remembered_reason is not None:
+                reasons_by_index[index] = remembered_reason
+        uncertain_indices = [
+            index for index in uncertain_indices if index not in remembered
+        ]
+        uncertain_articles: List[ArticleMetadata] = [
+            articles_metadta[index] for index in uncertain_indices
+        ]
+
+        article_titles_chunks: List[TitlesChunk] = self._titles_to_chunks(
+            uncertain_articles, source
         )
+        model_reasons: Dict[int, str]
+        answered_chunks: List[TitlesChunk]
+        def enough_accepted(
+                model_reasons: Dict[int, str], last_chunk: TitlesChunk
+        ) -> bool:
+            if accept_limit is None:
+                return False
+            last_sent: int = uncertain_indices[last_chunk.article_indices[-1]]
+            accepted_locally: int = sum(
+                1 for index in reasons_by_index if index <= last_sent
+            )
+            return accepted_locally + len(model_reasons) >= accept_limit
 
-        return remaining_titles
+        model_reasons, answered_chunks = self._filter_titles_by_prompt(
+            source, article_titles_chunks, enough_accepted
+        )
+        self._record_verdicts(
+            uncertain_articles, answered_chunks, model_reasons
+        )
+
+        for index, reason in model_reasons.items():
+            reasons_by_index[uncertain_indices[index]] = reason
+        return reasons_by_index
+
+    def _record_verdicts(
+            self,
+            articles_metadata: List[ArticleMetadata],
+            chunks: List[TitlesChunk],
+            reasons_by_index: Dict[int, str],
+    ) -> None:
+        """Only articles that were actually sent to the model are recorded."""
+        sent_indices: List[int] = [
+            index for chunk in chunks for index in chunk.article_indices
+        ]
+        for index in sent_indices:
+            self._verdicts[articles_metadata[index].url.geturl()] = (
+                reasons_by_index.get(index)
+            )
+        self._local_filter.record(
+            [articles_metadata[index] for index in sent_indices],
+            [
+                position
+                for position, index in enumerate(sent_indices)
+                if index in reasons_by_index
+            ],
+        )
 
     @_with_openai_cost_logged
     def _filter_titles_by_prompt(
-            self, source: Source, numbered_chunks: List[str]
-    ) -> Dict[str, str]:
+            self,
+            source: Source,
+            chunks: List[TitlesChunk],
+            enough: Callable[[Dict[int, str], TitlesChunk], bool] = (
+                lambda reasons, last_chunk: False
+            ),
+    ) -> Tuple[Dict[int, str], List[TitlesChunk]]:
         """
+        Args:
+            enough: Called with reasons collected so far and the last
+            answered chunk. No more chunks are sent once it returns True.
+
         Returns:
-            Dict[str, str]: [Title, Reason why an article was selected]
+            Tuple[Dict[int, str], List[TitlesChunk]]: Reasons by article
+            index and chunks the model answered.
         """
-        remaining_titles_dict: Dict[str, str] = dict()
+        reasons_by_index: Dict[int, str] = dict()
+        answered_chunks: List[TitlesChunk] = []
+
+        for articles_chunk, chunk_reasons in self._filtered_chunks(
+            source, chunks
+        ):
+            reasons_by_index.update(chunk_reasons)
+            answered_chunks.append(articles_chunk)
+            if enough(reasons_by_index, articles_chunk):
+                _LOGGER.info(
+                    "Enough articles accepted after %d of %d title chunks.",
+                    len(answered_chunks),
+                    len(chunks),
+                )
+                break
 
-        for articles_chunk in numbered_chunks:
-            response: FilterArticlesResponse = self._invoke_model(
-                source, articles_chunk
-            )
-            remaining_titles_dict.update(
-                self._filter_titles_chunk(articles_chunk, response)
-            )
+        return reasons_by_index, answered_chunks
 
-        return remaining_titles_dict
+    def _filtered_chunks(
+            self, source: Source, chunks: List[TitlesChunk]
+    ) -> Iterator[Tuple[TitlesChunk, Dict[int, str]]]:
+        """
+        Sends chunks to the model lazily, one at a time. Chunks left when the
+        deadline is reached are skipped, as are chunks the model didn't
+        answer in time.
+        """
+        for position, articles_chunk in enumerate(chunks):
+            if current_deadline().expired():
+                _LOGGER.warning(
+                    "Deadline reached, skipping %d of %d title chunks.",
+                    len(chunks) - position,
+                    len(chunks),
+                )
+                return
+            try:
+                response: FilterArticlesResponse = self._invoke_model(
+                    source, articles_chunk
+                )
+            except TimeoutError:
+                _LOGGER.warning(
+                    "The filter model timed out, skipping a chunk."
+                )
+                continue
+            except NoBackendAvailable as e:
+                _LOGGER.warning("%s Skipping remaining title chunks.", e)
+                return
+            yield articles_chunk, self._filter_titles_chunk(
+                articles_chunk, response
+            )
 
     def _invoke_model(
             self,
             source: Source,
-            articles_chunk: str,
+            articles_chunk: TitlesChunk,
     ) -> FilterArticlesResponse:
-        prompt_variables: Dict[str, str] = ArticleFiltering._prompt_variables(
-            source, articles_chunk
+        prompt_variables: Dict[str, str] = self._prompt_variables(
+            source, articles_chunk.text
+        )
+        output: Any = self._router.call(
+            lambda label: self._models[label].invoke(prompt_variables),
+            self._timeout_s,
+            # An upper bound. Actual costs are tracked by the calculator.
+            cost_usd=self._cost_calculator.max_query_cost_usd(),
+            tokens=(
+                self._template_token_count(source)
+                + articles_chunk.token_count
+            ),
         )
-        output: Any = self._model.invoke(prompt_variables)
         return _verify_output(output=output, type_=FilterArticlesResponse)
 
     @staticmethod
     def _filter_titles_chunk(
-            articles_titles_chunk: str, model_response: FilterArticlesResponse
-    ) -> Dict[str, str]:
-        return {
-            ArticleMetadata.title_from_description(
-                line
-            ): model_response.reasonings[i]
-            for i, line in enumerate(articles_titles_chunk.split(os.linesep))
-            if i + 1 in model_response.relevant_articles
-        }
+            articles_titles_chunk: TitlesChunk,
+            model_response: FilterArticlesResponse,
+    ) -> Dict[int, str]:
+        """
+        Returns:
+            Dict[int, str]: [Article index, Reason why an article was selected]
+        """
+        reasons_by_index: Dict[int, str] = {}
+        reasonings: List[str] = model_response.reasonings
 
-    def _titles_chunk_max_token_count(self, source: Source) -> int:
-        prompt_variables: Dict[str, str] = ArticleFiltering._prompt_variables(
-            source, ""
-        )
-        template_token_count: int = (
-            self._cost_calculator.prompt_template_token_count(
-                self._filter_prompt_file_path, prompt_variables
+        for line_number in model_response.relevant_articles:
+            if not 1 <= line_number <= len(articles_titles_chunk):
+                _LOGGER.warning(
+                    "The model selected a non-existent line %d.", line_number
+                )
+                continue
+            reasons_by_index[
+                articles_titles_chunk.article_index(line_number)
+            ] = (
+                reasonings[line_number - 1]
+                if line_number <= len(reasonings)
+                else ""
             )
+
+        return reasons_by_index
+
+    @lru_cache
+    def _template_token_count(self, source: Source) -> int:
+        """Of the prompt without article titles."""
+        return self._cost_calculator.prompt_template_token_count(
+            str(self._filter_prompt_file_path),
+            self._prompt_variables(source, ""),
         )
+
+    def _titles_chunk_max_token_count(self, source: Source) -> int:
+        template_token_count: int = self._template_token_count(source)
         max_chunk_token_count: int = (
                 self._cost_calculator.max_prompt_token_count()
                 - template_token_count
@@ -376,30 +1037,22 @@ class ArticleFiltering:
             # prepending a number a the beginning of each article title line.
         )
 
-    @classmethod
     def _prompt_variables(
-            cls, source: Source, article_titles_chunks: str
+            self, source: Source, article_titles_chunks: str
     ) -> Dict[str, str]:
+        """
+        Prompts start with everything that is the same for all chunks of a
+        source (instructions and examples) and end with `articles_list`, so
+        providers can reuse a cached prompt prefix between chunks.
+        """
         return {
             **{
-                "examples": ArticleFiltering._load_n_shot_text(source),
+                "examples": self._load_n_shot_text(source),
                 "articles_list": article_titles_chunks,
             },
-            **cls._FILTER_PROMPT_MAPPINGS[source],
+            **self._FILTER_PROMPT_MAPPINGS[source],
         }
 
-    @staticmethod
-    def _to_text(articles_metadata: List[ArticleMetadata]) -> str:
-        return f"{os.linesep}".join(
-            [metadata.description() for metadata in articles_metadata]
-        )
-
-    @staticmethod
-    def _number_lines(text: str) -> str:
-        return os.linesep.join(
-            [f"{i + 1}. {line}" for i, line in enumerate(text.split(os.linesep))]
-        )
-
     @lru_cache
     def _load_n_shot_text(self, source: Source) -> str:
         return load_as_string(
@@ -409,41 +1062,117 @@ class ArticleFiltering:
     @staticmethod
     def _filter_metadata_adding_reasons(
             sorted_articles_metadata: List[ArticleMetadata],
-            remaining_titles_dict: Dict[str, str],
+            reasons_by_index: Dict[int, str],
     ) -> List[ArticleMetadata]:
-        remaining_metadata: List[ArticleMetadata] = []
-
-        for metadata in sorted_articles_metadata:
-            if metadata.title in remaining_titles_dict.keys():
-                metadata_with_reason: ArticleMetadata = replace(
-                    metadata,
-                    why_is_relevant=remaining_titles_dict[metadata.title],
-                )
-                remaining_metadata.append(metadata_with_reason)
-
-        return remaining_metadata
+        return [
+            sorted_articles_metadata[index].with_reason(reason)
+            for index, reason in sorted(reasons_by_index.items())
+        ]
 
     @staticmethod
     def _filter_summaries_adding_reasons(
             sorted_articles_summaries: List[ArticleSummary],
-            remaining_titles_dict: Dict[str, str],
+            reasons_by_index: Dict[int, str],
     ) -> List[ArticleSummary]:
-        remaining_summaries: List[ArticleSummary] = []
-
-        for summary in sorted_articles_summaries:
-            if summary.metadata.title in remaining_titles_dict.keys():
-                summary_with_reason: ArticleSummary = replace(
-                    summary,
-                    metadata=replace(
-                        summary.metadata,
-                        why_is_relevant=remaining_titles_dict[
-                            summary.metadata.title
-                        ],
-                    ),
+        return [
+            ArticleSummary(
+                metadata=sorted_articles_summaries[
+                    index
+                ].metadata.with_reason(reason),
+                summary=sorted_articles_summaries[index].summary,
+            )
+            for index, reason in sorted(reasons_by_index.items())
+        ]
+
+
+class OpenAIUsage(openai_info.OpenAICallbackHandler):
+    """
+    langchain's OpenAI callback that also counts prompt tokens served from
+    OpenAI's prompt cache and discounts them in `total_cost`. Like the
+    prompt tokens, they're priced for the model that answered (e.g. a
+    routed backend's), not the configured one.
+    """
+
+    cached_prompt_tokens: int = 0
+
+    def __init__(self, cached_prompt_price_ratio: float) -> None:
+        super().__init__()
+        self._cached_prompt_price_ratio = cached_prompt_price_ratio
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        return (
+            self.cached_prompt_tokens / self.prompt_tokens
+            if self.prompt_tokens
+            else 0.0
+        )
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        super().on_llm_end(response, **kwargs)
+        cached_tokens: int = OpenAIUsage._cached_tokens(response)
+        discount: float = max(
+            OpenAIUsage._token_price(OpenAIUsage._model_name(response))
+            * cached_tokens
+            * (1.0 - self._cached_prompt_price_ratio),
+            0.0,
+        )
+        with self._lock:
+            self.cached_prompt_tokens += cached_tokens
+            self.total_cost = max(self.total_cost - discount, 0.0)
+
+    def add(self, other: "OpenAIUsage") -> None:
+        with self._lock:
+            self.total_tokens += other.total_tokens
+            self.prompt_tokens += other.prompt_tokens
+            self.cached_prompt_tokens += other.cached_prompt_tokens
+            self.completion_tokens += other.completion_tokens
+            self.successful_requests += other.successful_requests
+            self.total_cost += other.total_cost
+
+    def __repr__(self) -> str:
+        return (
+            f"{super().__repr__()}\n"
+            f"\tCached Prompt Tokens: {self.cached_prompt_tokens} "
+            f"({self.cache_hit_ratio:.1%} of prompt tokens)"
+        )
+
+    @staticmethod
+    def _token_price(model_name: str) -> float:
+        if model_name not in openai_info.MODEL_COST_PER_1K_TOKENS:
+            return 0.0  # The parent doesn't price unknown models either
+        return openai_info.get_openai_token_cost_for_model(
+            model_name=model_name, num_tokens=1
+        )
+
+    @staticmethod
+    def _model_name(response: LLMResult) -> str:
+        """The one the parent prices prompt tokens of `response` for."""
+        model_name: Any = None
+        if response.generations and response.generations[0]:
+            generation: Any = response.generations[0][0]
+            if isinstance(generation, ChatGeneration) and isinstance(
+                generation.message, AIMessage
+            ):
+                model_name = generation.message.response_metadata.get(
+                    "model_name"
                 )
-                remaining_summaries.append(summary_with_reason)
+        if not model_name:
+            model_name = (response.llm_output or {}).get("model_name", "")
+        return openai_info.standardize_model_name(str(model_name))
 
-        return remaining_summaries
+    @staticmethod
+    def _cached_tokens(response: LLMResult) -> int:
+        token_usage: Any = (response.llm_output or {}).get("token_usage")
+        if token_usage is None and response.generations:
+            generation: Any = response.generations[0][0]
+            if isinstance(generation, ChatGeneration) and isinstance(
+                generation.message, AIMessage
+            ):
+                token_usage = generation.message.response_metadata.get(
+                    "token_usage"
+                )
+        details: Any = (token_usage or {}).get("prompt_tokens_details")
+        return int((details or {}).get("cached_tokens") or 0)
 
 
 class OpenAICostCalculator:
@@ -452,12 +1181,49 @@ class OpenAICostCalculator:
             openai: ChatOpenAI,
             prompt_to_completion_len_ratio: float,
             context_size_limit: Optional[int] = None,
+            cached_prompt_price_ratio: float = 1.0,
     ) -> None:
         self._openai = openai
         self._prompt_to_completion_len_ratio = prompt_to_completion_len_ratio
         self._context_size_limit = context_size_limit
+        self._cached_prompt_price_ratio = cached_prompt_price_ratio
+        self.run_usage = self._usage()
+
+    @contextmanager
+    def usage_tracked(self) -> Iterator[OpenAIUsage]:
+        """
+        Tracks usage and actual cost of OpenAI calls made in this context.
+        It's also added to `run_usage`, totals of the whole run.
+        """
+        usage: OpenAIUsage = self._usage()
+        token = manager.openai_callback_var.set(usage)
+        try:
+            yield usage
+        finally:
+            manager.openai_callback_var.reset(token)
+            self.run_usage.add(usage)
+
+    def prompt_cost_usd(
+            self, prompt_tokens: int, cached_prompt_tokens: int = 0
+    ) -> Decimal:
+        cached_prompt_tokens = min(cached_prompt_tokens, prompt_tokens)
+        return Decimal(
+            openai_info.get_openai_token_cost_for_model(
+                model_name=self._openai.model_name,
+                num_tokens=1,
+                is_completion=False,
+            )
+        ) * (
+            (prompt_tokens - cached_prompt_tokens)
+            + Decimal(max(self._cached_prompt_price_ratio, 0.0))
+            * cached_prompt_tokens
+        )
 
     def max_chunks_within_budget(self, max_query_cost_usd: Decimal) -> int:
+        """
+        Assumes no prompt cache hits, since they aren't guaranteed. Actual
+        costs are reported by :py:meth:`usage_tracked`.
+        """
         return math.floor(
             max_query_cost_usd
             / (self.max_prompt_cost_usd() + self.max_completion_cost_usd())
@@ -465,14 +1231,7 @@ class OpenAICostCalculator:
 
     @lru_cache
     def max_prompt_cost_usd(self) -> Decimal:
-        return Decimal(
-            self.max_prompt_token_count()
-            * openai_info.get_openai_token_cost_for_model(
-                model_name=self._openai.model_name,
-                num_tokens=1,
-                is_completion=False,
-            )
-        )
+        return self.prompt_cost_usd(self.max_prompt_token_count())
 
     def max_completion_cost_usd(self) -> Decimal:
         max_completion_len: int = (
@@ -490,6 +1249,9 @@ class OpenAICostCalculator:
     def max_query_cost_usd(self) -> Decimal:
         return self.max_completion_cost_usd() + self.max_prompt_cost_usd()
 
+    def _usage(self) -> OpenAIUsage:
+        return OpenAIUsage(self._cached_prompt_price_ratio)
+
     def prompt_template_token_count(
             self, prompt_file_name: str, variables: Dict[str, str]
     ) -> int:
@@ -539,16 +1301,124 @@ def _verify_output(output: Any, type_: Type[T]) -> T:
     return output
 
 
-def _to_chunks(text: str, chunk_size: int, model_name: str) -> List[str]:
-    splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-        model_name=model_name,
-        chunk_size=chunk_size,
-        separators=[os.linesep],
-        chunk_overlap=0,
+def _pack_titles(
+    descriptions: List[str],
+    chunk_size: int,
+    max_chunks: int,
+    model_name: str,
+    token_counts: Optional[Sequence[int]] = None,
+) -> List[TitlesChunk]:
+    """
+    Greedily packs consecutive descriptions into chunks of at most
+    `chunk_size` tokens (a single description that exceeds it gets a chunk
+    on its own). Packing stops after `max_chunks` chunks.
+
+    Args:
+        token_counts: Of `descriptions`, if already counted.
+    """
+    chunks: List[TitlesChunk] = []
+    if max_chunks <= 0 or not descriptions:
+        return chunks
+
+    if token_counts is None:
+        token_counts = [
+            len(tokens)
+            for tokens in _encoding(model_name).encode_ordinary_batch(
+                descriptions
+            )
+        ]
+    lines: List[str] = []
+    article_indices: List[int] = []
+    chunk_token_count: int = 0
+
+    for index, (description, token_count) in enumerate(
+        zip(descriptions, token_counts)
+    ):
+        line_token_count: int = token_count + _LINE_SEPARATOR_TOKEN_COUNT
+        if lines and chunk_token_count + line_token_count > chunk_size:
+            chunks.append(
+                TitlesChunk.from_lines(
+                    lines, article_indices, chunk_token_count
+                )
+            )
+            if len(chunks) == max_chunks:
+                return chunks
+            lines, article_indices, chunk_token_count = [], [], 0
+
+        lines.append(description)
+        article_indices.append(index)
+        chunk_token_count += line_token_count
+
+    chunks.append(
+        TitlesChunk.from_lines(lines, article_indices, chunk_token_count)
+    )
+    return chunks
+
+
+@lru_cache(maxsize=None)
+def _encoding(model_name: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        _LOGGER.warning(
+            "No tiktoken encoding for %s, using %s.",
+            model_name,
+            _FALLBACK_ENCODING,
+        )
+        return tiktoken.get_encoding(_FALLBACK_ENCODING)
+
+
+def _numbered_texts(texts: Sequence[str]) -> str:
+    return "\n\n".join(
+        f'<text index="{index + 1}">\n{text}\n</text>'
+        for index, text in enumerate(texts)
     )
-    return splitter.split_text(text)
 
 
-@lru_cache(maxsize=_NUM_OF_DIFFERENT_MODELS)
+def _parse_batch_summaries(output: str, text_count: int) -> Dict[int, str]:
+    """
+    Args:
+        output: The batch model's answer, a JSON object with a `summaries`
+        array of `{"index": <1-based>, "summary": ...}` objects, possibly
+        wrapped in a markdown code block.
+
+    Returns:
+        Dict[int, str]: Summaries by 0-based index. Entries with an index out
+        of range, repeated or without a summary are skipped.
+    """
+    start: int = output.find("{")
+    end: int = output.rfind("}")
+    try:
+        data: Any = json.loads(output[start : end + 1])
+    except ValueError:
+        _LOGGER.warning("Malformed batch summaries: %s", output[:200])
+        return {}
+
+    entries: Any = data.get("summaries") if isinstance(data, dict) else None
+    summaries: Dict[int, str] = {}
+    repeated: set[int] = set()
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        index: Any = entry.get("index")
+        summary: Any = entry.get("summary")
+        if (
+            not isinstance(index, int)
+            or not 1 <= index <= text_count
+            or not isinstance(summary, str)
+            or not summary.strip()
+        ):
+            continue
+        if index - 1 in summaries:
+            repeated.add(index - 1)
+        summaries[index - 1] = summary.strip()
+
+    # Two summaries for one text mean the model mixed texts up.
+    for index in repeated:
+        del summaries[index]
+    return summaries
+
+
+@lru_cache(maxsize=None)  # Prompts of every digest and backend
 def _prompt_template(prompt_file_name: str) -> PromptTemplate:
     return PromptTemplate.from_file(load_resource(prompt_file_name))
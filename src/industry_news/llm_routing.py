@@ -0,0 +1,315 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import partial
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple, TypeVar
+
+from industry_news.config import LLMBackendConfig, LLMRoutingConfig
+from industry_news.deadline import (
+    Deadline,
+    call_with_timeout,
+    current_deadline,
+)
+from industry_news.llm_scheduling import BackendScheduler, is_rate_limit_error
+
+_LOGGER = logging.getLogger(__name__)
+# Backends failing every request still get a finite expected time.
+_MIN_SUCCESS_RATE = 0.05
+T = TypeVar("T")
+
+
+class NoBackendAvailable(Exception):
+    """All backends are over budget, or busy until the deadline."""
+
+
+@dataclass
+class BackendHealth:
+    """Moving averages of a backend's recent requests."""
+
+    # Of successful requests. None until one succeeds.
+    latency_s: Optional[float] = None
+    error_rate: float = 0.0
+    consecutive_failures: int = 0
+    cooled_down_until: float = 0.0
+    # Of requests sent, and of ones still waiting for their quota.
+    spent_usd: Decimal = Decimal(0)
+    reserved_usd: Decimal = Decimal(0)
+
+    def expected_s(self, load: float) -> float:
+        """
+        Expected time to a successful answer, longer for busy backends.
+        Backends without any requests yet come first, so each one gets
+        tried, and ones that only failed come last.
+
+        Args:
+            load: Running requests relative to the backend's concurrency.
+        """
+        if self.latency_s is None:
+            return math.inf if self.error_rate else 0.0
+        return (
+            self.latency_s
+            / max(1.0 - self.error_rate, _MIN_SUCCESS_RATE)
+            * (1.0 + load)
+        )
+
+
+class LLMRouter:
+    """
+    Routes requests of a single model role (filtering, summarizing) between
+    its backends. A request goes to the healthiest backend with a free
+    concurrency slot and budget left, waits for the backend's quota (see
+    :py:class:`industry_news.llm_scheduling.BackendScheduler`) and falls
+    back to the next healthiest one if it fails or times out. Rate-limited
+    requests are retried on the same backend once it's unpaused.
+
+    Backends are passed to callers by label, so one router can balance
+    several prompts (e.g. single and batch summaries) over shared health.
+    """
+
+    def __init__(
+        self, backends: List[LLMBackendConfig], config: LLMRoutingConfig
+    ) -> None:
+        if not backends:
+            raise ValueError("At least one LLM backend is required.")
+        self._backends: Dict[str, LLMBackendConfig] = {
+            backend.label(): backend for backend in backends
+        }
+        self._config = config
+        self._health: Dict[str, BackendHealth] = {
+            label: BackendHealth() for label in self._backends
+        }
+        self._schedulers: Dict[str, BackendScheduler] = {
+            label: BackendScheduler(backend, config)
+            for label, backend in self._backends.items()
+        }
+        self._changed = threading.Condition()
+
+    def health(self, label: str) -> BackendHealth:
+        return self._health[label]
+
+    def call(
+        self,
+        func: Callable[[str], T],
+        timeout_s: float,
+        cost_usd: Decimal = Decimal(0),
+        tokens: int = 0,
+    ) -> T:
+        """
+        Args:
+            func: Sends the request to the backend with the given label.
+            timeout_s: Per backend, shortened to the current deadline.
+            cost_usd: The request's estimated cost, counted towards budgets
+            of backends it's sent to.
+            tokens: The request's estimated prompt tokens, counted
+            towards tokens per minute of backends it's sent to.
+
+        Raises:
+            NoBackendAvailable: If no backend could take the request.
+            Exception: The last backend's error if all of them failed.
+        """
+        tried: Set[str] = set()
+        rate_limited: Dict[str, int] = {}
+        last_error: Optional[Exception] = None
+        while len(tried) < len(self._backends):
+            acquired: Optional[Tuple[str, float]] = self._acquire(
+                tried, cost_usd, tokens
+            )
+            if acquired is None:
+                break
+            label, quota_wait_s = acquired
+            # An expired deadline would abandon the call right away, but
+            # it would keep running and be paid for.
+            if (
+                not self._waited_for_quota(quota_wait_s)
+                or current_deadline().expired()
+            ):
+                self._cancel(label, cost_usd, tokens)
+                break
+
+            started_s: float = time.monotonic()
+            try:
+                result: T = call_with_timeout(
+                    partial(func, label),
+                    current_deadline().timeout_s(timeout_s),
+                )
+            except Exception as e:
+                last_error = e
+                if is_rate_limit_error(e):
+                    self._release(label, None, cost_usd, rate_limited=True)
+                    rate_limited[label] = rate_limited.get(label, 0) + 1
+                    if rate_limited[label] <= self._config.rate_limit_retries:
+                        _LOGGER.warning(
+                            "LLM backend %s is rate-limiting, retrying.",
+                            label,
+                        )
+                        continue
+                else:
+                    self._release(label, None, cost_usd)
+                tried.add(label)
+                _LOGGER.warning(
+                    "LLM backend %s failed (%r)%s.",
+                    label,
+                    e,
+                    ", falling back"
+                    if len(tried) < len(self._backends)
+                    else "",
+                )
+                continue
+            self._release(label, time.monotonic() - started_s, cost_usd)
+            return result
+
+        if last_error is not None:
+            raise last_error
+        raise NoBackendAvailable(
+            f"No LLM backend available out of {', '.join(self._backends)}."
+        )
+
+    def _acquire(
+        self, tried: Set[str], cost_usd: Decimal, tokens: int
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Reserves a concurrency slot, budget and quota of the best backend
+        not tried yet, waiting for a slot if all are busy or paused.
+
+        Returns:
+            Optional[Tuple[str, float]]: The backend's label and seconds to
+            wait for its quota. None if no backend has budget left, or the
+            deadline passed while waiting.
+        """
+        with self._changed:
+            while True:
+                self._end_cooldowns()
+                candidates: List[str] = [
+                    label
+                    for label, backend in self._backends.items()
+                    if label not in tried
+                    and self._within_budget(label, backend, cost_usd)
+                ]
+                if not candidates:
+                    return None
+                free: List[str] = [
+                    label
+                    for label in candidates
+                    if self._schedulers[label].has_capacity()
+                ]
+                if free:
+                    label = min(free, key=partial(self._rank, tokens=tokens))
+                    self._health[label].reserved_usd += cost_usd
+                    return label, self._schedulers[label].start(tokens)
+
+                deadline: Deadline = current_deadline()
+                if deadline.expired():
+                    return None
+                # Paused backends free up without a notification.
+                wait_s: List[float] = [
+                    paused_s
+                    for label in candidates
+                    if (paused_s := self._schedulers[label].paused_s()) > 0
+                ]
+                if deadline.is_set():
+                    wait_s.append(deadline.remaining_s())
+                self._changed.wait(min(wait_s) if wait_s else None)
+
+    @staticmethod
+    def _waited_for_quota(wait_s: float) -> bool:
+        """
+        Returns:
+            bool: False if the deadline would pass before the quota allows
+            the call.
+        """
+        if wait_s <= 0.0:
+            return True
+        if current_deadline().remaining_s() <= wait_s:
+            return False
+        _LOGGER.debug("Waiting %.1f s for an LLM quota.", wait_s)
+        time.sleep(wait_s)
+        return True
+
+    def _cancel(self, label: str, cost_usd: Decimal, tokens: int) -> None:
+        """Returns what :py:meth:`_acquire` reserved for a request that
+        wasn't sent. Nothing is recorded."""
+        with self._changed:
+            self._health[label].reserved_usd -= cost_usd
+            self._schedulers[label].cancel(tokens)
+            self._changed.notify_all()
+
+    def _release(
+        self,
+        label: str,
+        latency_s: Optional[float],
+        cost_usd: Decimal,
+        rate_limited: bool = False,
+    ) -> None:
+        """
+        Args:
+            latency_s: Of a successful request, None if it failed.
+            cost_usd: Charged to the backend's budget unless the request
+            was rate-limited, i.e. rejected without being processed.
+            rate_limited: Whether the request failed with a rate limit
+            error. It doesn't count towards the cooldown, pausing the
+            backend is enough.
+        """
+        smoothing: float = self._config.smoothing
+        with self._changed:
+            health: BackendHealth = self._health[label]
+            self._schedulers[label].finish(rate_limited)
+            self._changed.notify_all()
+            health.reserved_usd -= cost_usd
+            if not rate_limited:
+                health.spent_usd += cost_usd
+
+            failed: float = 0.0 if latency_s is not None else 1.0
+            health.error_rate += smoothing * (failed - health.error_rate)
+            if latency_s is not None:
+                health.consecutive_failures = 0
+                health.latency_s = (
+                    latency_s
+                    if health.latency_s is None
+                    else health.latency_s
+                    + smoothing * (latency_s - health.latency_s)
+                )
+            elif not rate_limited:
+                health.consecutive_failures += 1
+                if (
+                    health.consecutive_failures
+                    >= self._config.failures_to_cool_down
+                    or health.latency_s is None
+                ):
+                    health.cooled_down_until = (
+                        time.monotonic() + self._config.cooldown_s
+                    )
+
+    def _end_cooldowns(self) -> None:
+        """Backends are tried again after cooling down, as if healthy."""
+        now: float = time.monotonic()
+        for health in self._health.values():
+            if 0.0 < health.cooled_down_until <= now:
+                health.cooled_down_until = 0.0
+                health.consecutive_failures = 0
+                health.error_rate = 0.0
+
+    def _rank(self, label: str, tokens: int) -> Tuple[bool, float]:
+        """
+        Backends cooling down come last, then by expected time, including
+        the wait for their quota.
+        """
+        health: BackendHealth = self._health[label]
+        scheduler: BackendScheduler = self._schedulers[label]
+        return (
+            health.cooled_down_until > time.monotonic(),
+            health.expected_s(scheduler.load())
+            + scheduler.quota_wait_s(tokens),
+        )
+
+    def _within_budget(
+        self, label: str, backend: LLMBackendConfig, cost_usd: Decimal
+    ) -> bool:
+        health: BackendHealth = self._health[label]
+        return (
+            backend.budget_usd is None
+            or health.spent_usd + health.reserved_usd + cost_usd
+            <= backend.budget_usd
+        )
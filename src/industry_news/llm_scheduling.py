@@ -0,0 +1,141 @@
+import logging
+import time
+from typing import Any, Optional
+
+from industry_news.config import LLMBackendConfig, LLMRoutingConfig
+
+_LOGGER = logging.getLogger(__name__)
+_TOO_MANY_REQUESTS = 429
+
+
+class TokenBucket:
+    """
+    A per-minute quota refilled continuously, holding at most a minute's
+    worth. Reservations are made up front, so the level goes negative when
+    a call has to wait for the quota, and calls queue up in order.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self._capacity = per_minute
+        self._per_second = per_minute / 60.0
+        self._level = per_minute
+        self._updated_s = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Returns:
+            float: Seconds to wait before using the reserved amount.
+        """
+        self._refill()
+        self._level -= amount
+        return self.wait_s()
+
+    def release(self, amount: float) -> None:
+        """Returns a reservation that wasn't used."""
+        self._refill()
+        self._level = min(self._capacity, self._level + amount)
+
+    def wait_s(self, amount: float = 0.0) -> float:
+        """How long a reservation of `amount` would have to wait."""
+        self._refill()
+        return max(amount - self._level, 0.0) / self._per_second
+
+    def _refill(self) -> None:
+        now: float = time.monotonic()
+        self._level = min(
+            self._capacity,
+            self._level + (now - self._updated_s) * self._per_second,
+        )
+        self._updated_s = now
+
+
+class BackendScheduler:
+    """
+    Keeps calls to a backend within its concurrency, requests and tokens
+    per minute. Rate-limited backends are paused for a while.
+
+    Not thread-safe, :py:class:`industry_news.llm_routing.LLMRouter` calls
+    it under its lock.
+    """
+
+    def __init__(
+        self, backend: LLMBackendConfig, config: LLMRoutingConfig
+    ) -> None:
+        self._max_concurrency = backend.max_concurrency
+        self._config = config
+        self._requests: Optional[TokenBucket] = (
+            TokenBucket(backend.requests_per_minute)
+            if backend.requests_per_minute
+            else None
+        )
+        self._tokens: Optional[TokenBucket] = (
+            TokenBucket(backend.tokens_per_minute)
+            if backend.tokens_per_minute
+            else None
+        )
+        self.in_flight: int = 0
+        self._paused_until: float = 0.0
+
+    def has_capacity(self) -> bool:
+        return (
+            self.in_flight < self._max_concurrency
+            and self.paused_s() == 0.0
+        )
+
+    def load(self) -> float:
+        return self.in_flight / self._max_concurrency
+
+    def paused_s(self) -> float:
+        return max(self._paused_until - time.monotonic(), 0.0)
+
+    def quota_wait_s(self, tokens: int) -> float:
+        """How long a call of `tokens` would wait for the quota."""
+        return max(
+            self._requests.wait_s(1) if self._requests else 0.0,
+            self._tokens.wait_s(tokens) if self._tokens else 0.0,
+        )
+
+    def start(self, tokens: int) -> float:
+        """
+        Reserves a concurrency slot and the call's quota.
+
+        Returns:
+            float: Seconds to wait for the quota before calling.
+        """
+        self.in_flight += 1
+        return max(
+            self._requests.reserve(1) if self._requests else 0.0,
+            self._tokens.reserve(tokens) if self._tokens else 0.0,
+        )
+
+    def cancel(self, tokens: int) -> None:
+        """Frees the slot and quota of a call :py:meth:`start` reserved for,
+        but that wasn't sent."""
+        self.in_flight -= 1
+        if self._requests:
+            self._requests.release(1)
+        if self._tokens:
+            self._tokens.release(tokens)
+
+    def finish(self, rate_limited: bool = False) -> None:
+        """
+        Args:
+            rate_limited: Whether the call failed with a rate limit error.
+        """
+        self.in_flight -= 1
+        if rate_limited:
+            self._paused_until = (
+                time.monotonic() + self._config.rate_limit_pause_s
+            )
+            _LOGGER.info(
+                "Pausing an LLM backend for %.0f s, it's rate-limited.",
+                self._config.rate_limit_pause_s,
+            )
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """OpenAI's `RateLimitError`, Google's `ResourceExhausted`, etc."""
+    status: Any = getattr(error, "status_code", None) or getattr(
+        error, "code", None
+    )
+    return bool(status == _TOO_MANY_REQUESTS)
@@ -0,0 +1,118 @@
+import cProfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+from pathlib import Path
+import pstats
+import re
+import tracemalloc
+from typing import Iterator, Optional
+
+_LOGGER = logging.getLogger(__name__)
+_TOP_ALLOCATIONS = 25
+_TOP_FUNCTIONS = 40
+
+
+@dataclass(frozen=True)
+class _ProfilingSettings:
+    output_dir: Path
+    cpu: bool
+    memory: bool
+
+
+_settings: Optional[_ProfilingSettings] = None
+
+
+def enable_profiling(output_dir: Path, cpu: bool, memory: bool) -> Path:
+    """
+    Turns on per-stage profiling for the rest of the process. Every stage
+    wrapped in :py:func:`profiled_stage` dumps its results to a timestamped
+    subdirectory of `output_dir`.
+
+    Returns:
+        Path: The directory profiles will be written to.
+    """
+    global _settings
+    profiles_dir: Path = (
+        output_dir
+        / "profiles"
+        / datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+    )
+    profiles_dir.mkdir(parents=True, exist_ok=True)
+    _settings = _ProfilingSettings(profiles_dir, cpu, memory)
+
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    _LOGGER.info("Writing profiles to %s", profiles_dir)
+    return profiles_dir
+
+
+@contextmanager
+def profiled_stage(name: str) -> Iterator[None]:
+    """
+    A no-op unless :py:func:`enable_profiling` was called. Otherwise records
+    a cProfile dump (`<name>.prof` + a readable `<name>.txt`) and/or the top
+    allocation sites (`<name>_allocations.txt`) of the wrapped block.
+    """
+    settings: Optional[_ProfilingSettings] = _settings
+    if settings is None:
+        yield
+        return
+
+    file_stem: str = _file_stem(name)
+    profiler: Optional[cProfile.Profile] = (
+        cProfile.Profile() if settings.cpu else None
+    )
+    snapshot_before: Optional[tracemalloc.Snapshot] = None
+    if settings.memory:
+        snapshot_before = tracemalloc.take_snapshot()
+        # The peak is process-wide, it would include earlier stages (and
+        # the snapshot).
+        tracemalloc.reset_peak()
+
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            _dump_cpu_profile(profiler, settings.output_dir / file_stem)
+        if snapshot_before:
+            _dump_allocations(
+                snapshot_before, settings.output_dir / file_stem
+            )
+
+
+def _dump_cpu_profile(profiler: cProfile.Profile, path_stem: Path) -> None:
+    profiler.dump_stats(path_stem.with_suffix(".prof"))
+    with path_stem.with_suffix(".txt").open("w") as file:
+        stats = pstats.Stats(profiler, stream=file)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(
+            _TOP_FUNCTIONS
+        )
+
+
+def _dump_allocations(
+    snapshot_before: tracemalloc.Snapshot, path_stem: Path
+) -> None:
+    snapshot_after: tracemalloc.Snapshot = tracemalloc.take_snapshot()
+    stats = snapshot_after.compare_to(snapshot_before, "lineno")
+    current, peak = tracemalloc.get_traced_memory()
+    allocations_path: Path = path_stem.parent / (
+        f"{path_stem.name}_allocations.txt"
+    )
+
+    with allocations_path.open("w") as file:
+        file.write(
+            f"Current traced memory: {current / 2**20:.1f} MiB, "
+            f"peak during the stage: {peak / 2**20:.1f} MiB\n\n"
+        )
+        for stat in stats[:_TOP_ALLOCATIONS]:
+            file.write(f"{stat}\n")
+
+
+def _file_stem(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_")
@@ -0,0 +1,471 @@
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+import json
+import logging
+from pathlib import Path
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+import zlib
+
+import numpy as np
+import numpy.typing as npt
+
+from industry_news.config import LocalClassifierConfig, load_config
+from industry_news.digest.article import ArticleMetadata
+
+_LOGGER = logging.getLogger(__name__)
+_TOKEN_PATTERN = re.compile(r"\w+")
+_EPOCHS = 300
+_LEARNING_RATE = 0.5
+_L2_PENALTY = 1e-4
+_SPLIT_SEED = 0
+
+FloatArray = npt.NDArray[np.float64]
+IntArray = npt.NDArray[np.int64]
+
+
+@dataclass(frozen=True)
+class Verdict:
+    source: str
+    description: str
+    kept: bool
+
+
+class VerdictDataset:
+    """
+    Filter model verdicts (an article description and whether the model kept
+    it) appended after every run, one JSON object per line.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def append(self, verdicts: Sequence[Verdict]) -> None:
+        if not verdicts:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        logged_at: str = datetime.now(timezone.utc).isoformat()
+        with self.path.open("a") as file:
+            for verdict in verdicts:
+                file.write(
+                    json.dumps(
+                        {
+                            "source": verdict.source,
+                            "description": verdict.description,
+                            "kept": verdict.kept,
+                            "logged_at": logged_at,
+                        }
+                    )
+                    + "\n"
+                )
+
+    def load(self) -> List[Verdict]:
+        """
+        Returns:
+            List[Verdict]: The latest verdict per source and description.
+            Articles are seen again e.g. in overlapping backfill windows.
+        """
+        if not self.path.exists():
+            return []
+        latest: Dict[Tuple[str, str], Verdict] = {}
+        with self.path.open("r") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                verdict = Verdict(
+                    record["source"], record["description"], record["kept"]
+                )
+                latest[(verdict.source, verdict.description)] = verdict
+        return list(latest.values())
+
+
+@dataclass(frozen=True)
+class EvaluationReport:
+    examples: int
+    precision: float
+    recall: float
+    auto_accepted: int
+    auto_accepted_precision: float
+    auto_rejected: int
+    # How many articles the filter model kept were auto-rejected.
+    auto_rejected_kept: int
+
+
+class RelevanceClassifier:
+    """
+    A logistic regression over hashed word unigrams and bigrams of article
+    descriptions (plus the source), trained with plain NumPy.
+    """
+
+    def __init__(
+        self,
+        feature_bits: int,
+        weights: Optional[FloatArray] = None,
+        trained_examples: int = 0,
+        trained_at: Optional[datetime] = None,
+    ) -> None:
+        self._feature_bits = feature_bits
+        self._weights: FloatArray = (
+            weights
+            if weights is not None
+            else np.zeros((1 << feature_bits) + 1)  # + bias
+        )
+        self.trained_examples = trained_examples
+        self.trained_at = trained_at
+
+    @classmethod
+    def load(cls, path: Path) -> "RelevanceClassifier":
+        with np.load(path) as data:
+            if "trained_at_s" not in data:  # Saved by an older version
+                return cls(int(data["feature_bits"]), data["weights"])
+            return cls(
+                int(data["feature_bits"]),
+                data["weights"],
+                int(data["trained_examples"]),
+                datetime.fromtimestamp(
+                    float(data["trained_at_s"]), timezone.utc
+                ),
+            )
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays: Dict[str, npt.ArrayLike] = {
+            "feature_bits": self._feature_bits,
+            "weights": self._weights,
+        }
+        if self.trained_at is not None:
+            arrays["trained_examples"] = self.trained_examples
+            arrays["trained_at_s"] = self.trained_at.timestamp()
+        with path.open("wb") as file:
+            np.savez(file, **arrays)
+
+    def fit(self, verdicts: Sequence[Verdict]) -> "RelevanceClassifier":
+        indices, offsets = self._features(verdicts)
+        labels: FloatArray = np.array(
+            [verdict.kept for verdict in verdicts], dtype=np.float64
+        )
+        counts: IntArray = np.diff(offsets)
+        bias: int = len(self._weights) - 1
+        gradient_norms: FloatArray = np.full(len(self._weights), 1e-8)
+
+        # Full-batch gradient descent with AdaGrad step sizes, the feature
+        # matrix is never materialized.
+        for _ in range(_EPOCHS):
+            errors: FloatArray = (
+                self._probabilities(indices, offsets) - labels
+            )
+            gradient: FloatArray = np.bincount(
+                indices,
+                weights=np.repeat(errors, counts),
+                minlength=len(self._weights),
+            ) / len(labels)
+            gradient[bias] = errors.mean()
+            gradient[:bias] += _L2_PENALTY * self._weights[:bias]
+            gradient_norms += gradient**2
+            self._weights -= (
+                _LEARNING_RATE * gradient / np.sqrt(gradient_norms)
+            )
+
+        self.trained_examples = len(verdicts)
+        self.trained_at = datetime.now(timezone.utc)
+        return self
+
+    def predict(self, verdicts: Sequence[Verdict]) -> FloatArray:
+        """
+        Returns:
+            FloatArray: Probabilities of the filter model keeping each article.
+            `kept` of the passed verdicts is ignored.
+        """
+        if not verdicts:
+            return np.empty(0)
+        return self._probabilities(*self._features(verdicts))
+
+    def evaluate(
+        self,
+        verdicts: Sequence[Verdict],
+        reject_below: float,
+        accept_above: float,
+    ) -> EvaluationReport:
+        probabilities: FloatArray = self.predict(verdicts)
+        kept: npt.NDArray[np.bool_] = np.array(
+            [verdict.kept for verdict in verdicts], dtype=bool
+        )
+        predicted: npt.NDArray[np.bool_] = probabilities >= 0.5
+        accepted: npt.NDArray[np.bool_] = probabilities >= accept_above
+        rejected: npt.NDArray[np.bool_] = probabilities <= reject_below
+        return EvaluationReport(
+            examples=len(verdicts),
+            precision=_ratio(np.count_nonzero(predicted & kept), predicted),
+            recall=_ratio(np.count_nonzero(predicted & kept), kept),
+            auto_accepted=int(np.count_nonzero(accepted)),
+            auto_accepted_precision=_ratio(
+                np.count_nonzero(accepted & kept), accepted
+            ),
+            auto_rejected=int(np.count_nonzero(rejected)),
+            auto_rejected_kept=int(np.count_nonzero(rejected & kept)),
+        )
+
+    def _features(
+        self, verdicts: Sequence[Verdict]
+    ) -> Tuple[IntArray, IntArray]:
+        """
+        Returns:
+            Tuple[IntArray, IntArray]: Hashed feature indices of all
+            articles and offsets where each article's indices start (CSR).
+        """
+        mask: int = (1 << self._feature_bits) - 1
+        indices: List[int] = []
+        offsets: List[int] = [0]
+
+        for verdict in verdicts:
+            tokens: List[str] = _TOKEN_PATTERN.findall(
+                verdict.description.lower()
+            )
+            features: List[str] = [f"__source={verdict.source}"] + tokens
+            features += [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            # crc32 rather than hash() to be stable between processes.
+            indices.extend(
+                zlib.crc32(feature.encode()) & mask for feature in features
+            )
+            offsets.append(len(indices))
+
+        return (
+            np.array(indices, dtype=np.int64),
+            np.array(offsets, dtype=np.int64),
+        )
+
+    def _probabilities(
+        self, indices: IntArray, offsets: IntArray
+    ) -> FloatArray:
+        counts: IntArray = np.diff(offsets)
+        rows: IntArray = np.repeat(np.arange(len(counts)), counts)
+        sums: FloatArray = np.bincount(
+            rows, weights=self._weights[indices], minlength=len(counts)
+        ).astype(np.float64, copy=False)
+        logits: FloatArray = np.clip(sums + self._weights[-1], -30.0, 30.0)
+        probabilities: FloatArray = 1.0 / (1.0 + np.exp(-logits))
+        return probabilities
+
+
+class LocalRelevanceFilter:
+    """
+    Decides on articles the local classifier is confident about, so only
+    the uncertain middle band (and a random sample of the rest) is sent to
+    the filter model. Also records filter model verdicts used to (re)train
+    the classifier. A classifier not meeting the held-out evaluation
+    thresholds decides on nothing.
+    """
+
+    def __init__(
+        self,
+        config: Optional[LocalClassifierConfig] = None,
+        data_dir: Optional[Path] = None,
+        digest_name: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            config, data_dir, digest_name: Default to ones of the
+            `DIGEST_NAME` digest.
+        """
+        config = config or load_config().llm.filter_model.local_classifier
+        data_dir = data_dir or (
+            load_config().digest.out_path / "data" / "filter_verdicts"
+        )
+        digest_name = digest_name or load_config().digest.name
+        self._config = config
+        self._dataset = VerdictDataset(data_dir / f"{digest_name}.jsonl")
+        self._model_path: Path = data_dir / f"{digest_name}_classifier.npz"
+        self._report_path: Path = (
+            data_dir / f"{digest_name}_classifier_report.json"
+        )
+        self._rng: np.random.Generator = np.random.default_rng()
+        self._classifier: Optional[RelevanceClassifier] = (
+            self._load_or_train() if config.enabled else None
+        )
+        if self._classifier is not None and not self._passed_evaluation():
+            self._classifier = None
+
+    def triage(
+        self, articles: Sequence[ArticleMetadata]
+    ) -> Tuple[Dict[int, str], List[int]]:
+        """
+        Returns:
+            Tuple[Dict[int, str], List[int]]: Reasons for auto-accepted
+            articles by their index and indices of articles the classifier
+            is not confident about. Indices missing in both were rejected.
+            A random sample of articles the classifier is confident about
+            counts as uncertain, so their verdicts are recorded too.
+        """
+        if self._classifier is None:
+            return {}, list(range(len(articles)))
+
+        probabilities: FloatArray = self._classifier.predict(
+            [_unlabeled(article) for article in articles]
+        )
+        audited: npt.NDArray[np.bool_] = (
+            self._rng.random(len(probabilities)) < self._config.audit_fraction
+        )
+        accepted: Dict[int, str] = {}
+        uncertain: List[int] = []
+
+        for index, probability in enumerate(probabilities):
+            if (
+                self._config.reject_below < probability
+                < self._config.accept_above
+                or audited[index]
+            ):
+                uncertain.append(index)
+            elif probability >= self._config.accept_above:
+                accepted[index] = (
+                    "Accepted by the local classifier "
+                    f"(p={probability:.2f})."
+                )
+
+        _LOGGER.info(
+            "Local classifier accepted %d, rejected %d and passed %d "
+            "articles to the filter model (%d of them as an audit).",
+            len(accepted),
+            len(articles) - len(accepted) - len(uncertain),
+            len(uncertain),
+            int(np.count_nonzero(audited)),
+        )
+        return accepted, uncertain
+
+    def record(
+        self, articles: Sequence[ArticleMetadata], kept_indices: Sequence[int]
+    ) -> None:
+        """Stores filter model verdicts for articles it has seen."""
+        kept = set(kept_indices)
+        self._dataset.append(
+            [
+                Verdict(
+                    article.source.value, article.description(), index in kept
+                )
+                for index, article in enumerate(articles)
+            ]
+        )
+
+    def _load_or_train(self) -> Optional[RelevanceClassifier]:
+        """
+        Loads the saved classifier, unless enough verdicts were recorded
+        since it was trained (see :py:class:`LocalClassifierConfig`).
+        """
+        saved: Optional[RelevanceClassifier] = (
+            RelevanceClassifier.load(self._model_path)
+            if self._model_path.exists()
+            else None
+        )
+        verdicts: List[Verdict] = self._dataset.load()
+        if saved is not None and not self._stale(saved, len(verdicts)):
+            return saved
+
+        if len(verdicts) < self._config.min_training_examples:
+            _LOGGER.info(
+                "Not enough filter verdicts to train a local classifier "
+                "(%d of %d).",
+                len(verdicts),
+                self._config.min_training_examples,
+            )
+            return saved
+
+        self._evaluate_on_holdout(verdicts)
+        classifier = RelevanceClassifier(self._config.feature_bits).fit(
+            verdicts
+        )
+        classifier.save(self._model_path)
+        return classifier
+
+    def _passed_evaluation(self) -> bool:
+        """
+        Whether the held-out evaluation of the classifier, written when it
+        was trained, meets the thresholds of
+        :py:class:`LocalClassifierConfig`. Classifiers without one don't.
+        """
+        if not self._report_path.exists():
+            _LOGGER.warning(
+                "The local classifier has no held-out evaluation, "
+                "not using it."
+            )
+            return False
+        with self._report_path.open("r") as file:
+            report = EvaluationReport(**json.load(file))
+        rejected_kept_ratio: float = (
+            report.auto_rejected_kept / report.auto_rejected
+            if report.auto_rejected
+            else 0.0
+        )
+        passed: bool = (
+            report.auto_accepted == 0
+            or report.auto_accepted_precision
+            >= self._config.min_auto_accepted_precision
+        ) and rejected_kept_ratio <= self._config.max_auto_rejected_kept_ratio
+        if not passed:
+            _LOGGER.warning(
+                "The local classifier doesn't meet the held-out evaluation "
+                "thresholds, not using it: %s",
+                report,
+            )
+        return passed
+
+    def _stale(self, classifier: RelevanceClassifier, examples: int) -> bool:
+        if classifier.trained_at is None:
+            return True
+        new_examples: int = examples - classifier.trained_examples
+        age_days: float = (
+            datetime.now(timezone.utc) - classifier.trained_at
+        ).total_seconds() / 86400
+        return new_examples > 0 and (
+            new_examples >= self._config.retrain_after_examples
+            or age_days >= self._config.retrain_after_days
+        )
+
+    def _evaluate_on_holdout(self, verdicts: List[Verdict]) -> None:
+        """
+        Holds out a fraction of descriptions, so no title is both trained
+        and evaluated on (e.g. one seen from two sources).
+        """
+        descriptions: npt.NDArray[np.str_] = np.array(
+            [verdict.description for verdict in verdicts]
+        )
+        unique_descriptions: npt.NDArray[np.str_]
+        description_ids: IntArray
+        unique_descriptions, description_ids = np.unique(
+            descriptions, return_inverse=True
+        )
+        held_out: npt.NDArray[np.bool_] = np.zeros(
+            len(unique_descriptions), dtype=bool
+        )
+        held_out[
+            np.random.default_rng(_SPLIT_SEED).permutation(
+                len(unique_descriptions)
+            )[: int(len(unique_descriptions) * self._config.holdout_fraction)]
+        ] = True
+        holdout: List[Verdict] = [
+            verdict
+            for verdict, description_id in zip(verdicts, description_ids)
+            if held_out[description_id]
+        ]
+        training: List[Verdict] = [
+            verdict
+            for verdict, description_id in zip(verdicts, description_ids)
+            if not held_out[description_id]
+        ]
+
+        report: EvaluationReport = RelevanceClassifier(
+            self._config.feature_bits
+        ).fit(training).evaluate(
+            holdout, self._config.reject_below, self._config.accept_above
+        )
+        _LOGGER.info("Local classifier held-out evaluation: %s", report)
+        with self._report_path.open("w") as file:
+            json.dump(asdict(report), file, indent=2)
+
+
+def _unlabeled(article: ArticleMetadata) -> Verdict:
+    return Verdict(article.source.value, article.description(), kept=False)
+
+
+def _ratio(numerator: int, denominator: npt.NDArray[np.bool_]) -> float:
+    count: int = int(np.count_nonzero(denominator))
+    return numerator / count if count else 0.0
@@ -0,0 +1,378 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from enum import Enum
+import hashlib
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+from pathlib import Path
+import re
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from industry_news.config import Config, load_config
+from industry_news.digest.news_digest import NewsDigest
+from industry_news.fetcher.fetch_cache import FetchCache
+
+_LOGGER = logging.getLogger(__name__)
+_JOB_PATH = re.compile(
+    r"^/digests/(?P<id>\w+)(?P<view>/progress|/markdown)?$"
+)
+_PROGRESS_POLL_S = 1.0
+# Finished jobs beyond this many are forgotten, oldest first.
+_MAX_JOBS = 1000
+
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class DigestRequest:
+    digest_name: str
+    since: datetime
+    until: datetime
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "DigestRequest":
+        """
+        Args:
+            data: `digest`, `since` and `until`, the latter two in ISO
+            format. Datetimes without a timezone are assumed to be in UTC.
+
+        Raises:
+            ValueError: If any of them is missing or invalid.
+        """
+        try:
+            request = DigestRequest(
+                digest_name=str(data["digest"]),
+                since=_to_utc(datetime.fromisoformat(data["since"])),
+                until=_to_utc(datetime.fromisoformat(data["until"])),
+            )
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid digest request: {e}") from e
+        if request.since >= request.until:
+            raise ValueError("`since` must be earlier than `until`.")
+        return request
+
+    def job_id(self) -> str:
+        """The same for identical requests, so their results are reused."""
+        key: str = (
+            f"{self.digest_name}|{self.since.isoformat()}"
+            f"|{self.until.isoformat()}"
+        )
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+class DigestJob:
+    """
+    A digest being built for a request. Log records emitted while building
+    it are kept as progress lines.
+    """
+
+    def __init__(self, request: DigestRequest, output_file: Path) -> None:
+        self.id: str = request.job_id()
+        self.request = request
+        self.output_file = output_file
+        self.status = JobStatus.QUEUED
+        self.error: Optional[str] = None
+        self._progress: List[str] = []
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.FAILED)
+
+    def add_progress(self, line: str) -> None:
+        with self._changed:
+            self._progress.append(line)
+            self._changed.notify_all()
+
+    def set_status(
+        self, status: JobStatus, error: Optional[str] = None
+    ) -> None:
+        with self._changed:
+            self.status = status
+            self.error = error
+            self._changed.notify_all()
+
+    def follow_progress(self) -> Iterator[str]:
+        """Yields all progress lines, including future ones, until the job
+        finishes."""
+        position: int = 0
+        while True:
+            with self._changed:
+                while position == len(self._progress) and not self.finished:
+                    self._changed.wait(timeout=_PROGRESS_POLL_S)
+                lines: List[str] = self._progress[position:]
+                finished: bool = self.finished
+            position += len(lines)
+            yield from lines
+            if finished:
+                return
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "digest": self.request.digest_name,
+            "since": self.request.since.isoformat(),
+            "until": self.request.until.isoformat(),
+            "status": self.status.value,
+            "error": self.error,
+        }
+
+
+class DigestService:
+    """
+    Keeps digests (with their LLM clients) alive between requests and builds
+    requested ones one at a time, so they don't compete for rate limits.
+    Results of identical requests are reused unless building failed, or
+    the job was forgotten.
+    """
+
+    def __init__(self, digest_names: List[str]) -> None:
+        self._configs: Dict[str, Config] = {
+            name: load_config(name) for name in digest_names
+        }
+        # Jobs are built one at a time, and so are their sources fetched.
+        # A long-lived thread keeps its HTTP sessions between them.
+        self._fetch_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="fetch"
+        )
+        # Ad-hoc windows neither skip articles of scheduled digests nor
+        # hide their own ones from them.
+        self._digests: Dict[str, NewsDigest] = {
+            name: NewsDigest.for_digest(
+                config,
+                FetchCache(config.web, self._fetch_executor),
+                use_seen_index=False,
+            )
+            for name, config in self._configs.items()
+        }
+        self._jobs: Dict[str, DigestJob] = {}
+        self._jobs_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="digest"
+        )
+
+    def digest_names(self) -> List[str]:
+        return list(self._digests)
+
+    def submit(self, request: DigestRequest) -> Tuple[DigestJob, bool]:
+        """
+        Raises:
+            KeyError: If the service doesn't serve the requested digest.
+
+        Returns:
+            Tuple[DigestJob, bool]: The job and whether it was just created
+            (False if an existing one is reused).
+        """
+        if request.digest_name not in self._digests:
+            raise KeyError(request.digest_name)
+
+        with self._jobs_lock:
+            job: Optional[DigestJob] = self._jobs.get(request.job_id())
+            if job is not None and job.status != JobStatus.FAILED:
+                return job, False
+
+            job = DigestJob(request, self._output_file(request))
+            self._jobs.pop(job.id, None)  # Newest last
+            self._jobs[job.id] = job
+            self._forget_old_jobs()
+        self._executor.submit(self._build, job)
+        return job, True
+
+    def job(self, job_id: str) -> Optional[DigestJob]:
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._fetch_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _forget_old_jobs(self) -> None:
+        """Called under `_jobs_lock`. Unfinished jobs are kept."""
+        finished: List[str] = [
+            job_id for job_id, job in self._jobs.items() if job.finished
+        ]
+        for job_id in finished[: max(len(self._jobs) - _MAX_JOBS, 0)]:
+            del self._jobs[job_id]
+
+    def _build(self, job: DigestJob) -> None:
+        # A long-lived service doesn't accumulate fetched articles and
+        # verdicts. Sources are fetched incrementally anyway.
+        digest: NewsDigest = self._digests[
+            job.request.digest_name
+        ].for_new_job()
+        handler = _JobLogHandler(job)
+        root_logger: logging.Logger = logging.getLogger()
+        root_logger.addHandler(handler)
+        job.set_status(JobStatus.RUNNING)
+        try:
+            job.output_file.parent.mkdir(parents=True, exist_ok=True)
+            # Digests are appended to output files section by section.
+            job.output_file.unlink(missing_ok=True)
+            digest.to_markdown_file(
+                since=job.request.since,
+                until=job.request.until,
+                output_file=job.output_file,
+                articles_per_source_limit=self._configs[
+                    job.request.digest_name
+                ].sources.articles_per_source_limit,
+            )
+            job.set_status(JobStatus.DONE)
+        except Exception as e:
+            _LOGGER.exception(e)
+            job.set_status(JobStatus.FAILED, error=repr(e))
+        finally:
+            root_logger.removeHandler(handler)
+
+    def _output_file(self, request: DigestRequest) -> Path:
+        config: Config = self._configs[request.digest_name]
+        return (
+            config.digest.out_path
+            / config.digest.name
+            / "service"
+            / f"{request.job_id()}.md"
+        )
+
+
+def serve(digest_names: List[str], host: str, port: int) -> None:
+    """
+    Serves digests over a local HTTP API until interrupted:
+
+    - `POST /digests` with a JSON body `{"digest": ..., "since": ...,
+      "until": ...}` requests a digest. Responds with the job (`202` if
+      it was queued, `200` if an identical request was made before).
+    - `GET /digests/<id>` returns the job's status.
+    - `GET /digests/<id>/progress` streams its log lines until it finishes.
+    - `GET /digests/<id>/markdown` returns the digest once it's done.
+    """
+    service = DigestService(digest_names)
+    server = _DigestServer((host, port), service)
+    _LOGGER.info(
+        "Serving digests %s on http://%s:%d",
+        ", ".join(service.digest_names()),
+        host,
+        port,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+class _JobLogHandler(logging.Handler):
+    def __init__(self, job: DigestJob) -> None:
+        super().__init__(level=logging.INFO)
+        self._job = job
+        self.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+        )
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._job.add_progress(self.format(record))
+
+
+class _DigestServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self, address: Tuple[str, int], service: DigestService
+    ) -> None:
+        super().__init__(address, _DigestRequestHandler)
+        self.service = service
+
+
+class _DigestRequestHandler(BaseHTTPRequestHandler):
+    server: _DigestServer
+
+    def do_POST(self) -> None:
+        if self.path != "/digests":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found."})
+            return
+
+        try:
+            length: int = int(self.headers.get("Content-Length", 0))
+            request = DigestRequest.from_dict(
+                json.loads(self.rfile.read(length))
+            )
+            job, created = self.server.service.submit(request)
+        except ValueError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        except KeyError as e:
+            self._send_json(
+                HTTPStatus.NOT_FOUND, {"error": f"Unknown digest: {e}"}
+            )
+            return
+
+        self._send_json(
+            HTTPStatus.ACCEPTED if created else HTTPStatus.OK, job.to_dict()
+        )
+
+    def do_GET(self) -> None:
+        match: Optional[re.Match[str]] = _JOB_PATH.match(self.path)
+        job: Optional[DigestJob] = (
+            self.server.service.job(match["id"]) if match else None
+        )
+        if match is None or job is None:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found."})
+        elif match["view"] == "/progress":
+            self._stream_progress(job)
+        elif match["view"] == "/markdown":
+            self._send_markdown(job)
+        else:
+            self._send_json(HTTPStatus.OK, job.to_dict())
+
+    def _stream_progress(self, job: DigestJob) -> None:
+        # No Content-Length, the response ends when the connection closes.
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.end_headers()
+        for line in job.follow_progress():
+            self.wfile.write(f"{line}\n".encode())
+            self.wfile.flush()
+        self.wfile.write(f"{job.status.value}\n".encode())
+
+    def _send_markdown(self, job: DigestJob) -> None:
+        if job.status != JobStatus.DONE:
+            self._send_json(HTTPStatus.CONFLICT, job.to_dict())
+            return
+        # Sources without relevant articles don't write anything.
+        body: bytes = (
+            job.output_file.read_bytes() if job.output_file.exists() else b""
+        )
+        self._send_body(HTTPStatus.OK, body, "text/markdown; charset=utf-8")
+
+    def _send_json(self, status: HTTPStatus, data: Dict[str, Any]) -> None:
+        self._send_body(
+            status, json.dumps(data).encode(), "application/json"
+        )
+
+    def _send_body(
+        self, status: HTTPStatus, body: bytes, content_type: str
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Not INFO, these would show up in progress of a running job.
+        _LOGGER.debug(format, *args)
+
+
+def _to_utc(date_time: datetime) -> datetime:
+    if date_time.tzinfo is None:
+        return date_time.replace(tzinfo=timezone.utc)
+    return date_time.astimezone(timezone.utc)
@@ -0,0 +1,154 @@
+from dataclasses import dataclass
+from decimal import Decimal
+import logging
+import re
+from typing import Dict, List
+
+import numpy as np
+import numpy.typing as npt
+
+from industry_news.config import SummaryCompressionConfig
+
+_LOGGER = logging.getLogger(__name__)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Navigation links, buttons, etc. rather than sentences.
+_MIN_SENTENCE_TOKENS = 4
+_DAMPING = 0.85
+_TEXTRANK_ITERATIONS = 30
+
+FloatArray = npt.NDArray[np.float64]
+
+
+@dataclass
+class CompressionStats:
+    """Totals over texts compressed in a single summarization query."""
+
+    texts: int = 0
+    original_chars: int = 0
+    compressed_chars: int = 0
+    elapsed_s: float = 0.0
+    saved_usd: Decimal = Decimal(0)
+
+    def add(
+        self,
+        original_chars: int,
+        compressed_chars: int,
+        elapsed_s: float,
+        saved_usd: Decimal,
+    ) -> None:
+        self.texts += 1
+        self.original_chars += original_chars
+        self.compressed_chars += compressed_chars
+        self.elapsed_s += elapsed_s
+        self.saved_usd += saved_usd
+
+    def log(self) -> None:
+        if not self.texts:
+            return
+        _LOGGER.info(
+            "Compressed %d texts from %d to %d chars (%.0f%%), %.1f ms per "
+            "text. Est. savings: %.3f USD.",
+            self.texts,
+            self.original_chars,
+            self.compressed_chars,
+            100 * self.compressed_chars / self.original_chars,
+            1000 * self.elapsed_s / self.texts,
+            float(self.saved_usd),
+        )
+
+
+class ExtractiveCompressor:
+    """
+    Shortens a text to a character budget by keeping its most central
+    sentences, in their original order. Only the first `max_input_chars`
+    are considered. Sentences are TF-IDF vectors and are scored either by
+    similarity to the whole text (`tfidf`) or by TextRank over their
+    similarity graph (`textrank`).
+    """
+
+    def __init__(self, config: SummaryCompressionConfig) -> None:
+        self._max_chars = config.max_chars
+        self._max_input_chars = config.max_input_chars
+        self._method = config.method
+
+    def compress(self, text: str) -> str:
+        if len(text) <= self._max_chars:
+            return text
+
+        sentences: List[str] = [
+            sentence
+            for sentence in _SENTENCE_END.split(
+                text[: self._max_input_chars]
+            )
+            if len(_TOKEN_PATTERN.findall(sentence)) >= _MIN_SENTENCE_TOKENS
+        ]
+        if not sentences:
+            return text[: self._max_chars]
+
+        vectors: FloatArray = _tfidf_vectors(sentences)
+        scores: FloatArray = (
+            _textrank_scores(vectors)
+            if self._method == "textrank"
+            else vectors @ vectors.sum(axis=0)
+        )
+        return "\n".join(
+            sentences[index] for index in self._selected(sentences, scores)
+        )
+
+    def _selected(
+        self, sentences: List[str], scores: FloatArray
+    ) -> List[int]:
+        """Best scored sentences that fit the budget, in text order."""
+        selected: List[int] = []
+        chars: int = 0
+        for index in np.argsort(-scores, kind="stable"):
+            length: int = len(sentences[index]) + 1  # A separator
+            if chars + length <= self._max_chars:
+                selected.append(int(index))
+                chars += length
+        return sorted(selected)
+
+
+def _tfidf_vectors(sentences: List[str]) -> FloatArray:
+    """
+    Returns:
+        FloatArray: A (sentences, vocabulary) matrix of L2-normalized
+        TF-IDF vectors.
+    """
+    vocabulary: Dict[str, int] = {}
+    rows: List[int] = []
+    columns: List[int] = []
+    for row, sentence in enumerate(sentences):
+        for token in _TOKEN_PATTERN.findall(sentence.lower()):
+            rows.append(row)
+            columns.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    counts: FloatArray = np.zeros((len(sentences), len(vocabulary)))
+    np.add.at(counts, (rows, columns), 1.0)
+    document_frequency: FloatArray = np.count_nonzero(counts, axis=0)
+    idf: FloatArray = np.log(len(sentences) / document_frequency) + 1.0
+    vectors: FloatArray = (
+        counts / counts.sum(axis=1, keepdims=True)
+    ) * idf
+    norms: FloatArray = np.linalg.norm(vectors, axis=1, keepdims=True)
+    normalized: FloatArray = vectors / np.maximum(norms, 1e-12)
+    return normalized
+
+
+def _textrank_scores(vectors: FloatArray) -> FloatArray:
+    """PageRank over sentences linked by their cosine similarity."""
+    similarity: FloatArray = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    out_weights: FloatArray = similarity.sum(axis=1, keepdims=True)
+    transitions: FloatArray = np.divide(
+        similarity,
+        out_weights,
+        out=np.zeros_like(similarity),
+        where=out_weights > 0,
+    )
+    count: int = len(vectors)
+    scores: FloatArray = np.full(count, 1.0 / count)
+    for _ in range(_TEXTRANK_ITERATIONS):
+        scores = (1 - _DAMPING) / count + _DAMPING * (transitions.T @ scores)
+    return scores
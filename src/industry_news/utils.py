@@ -10,6 +10,7 @@ import time
 import yaml
 from typing import Callable, Optional, Tuple, TypeVar
 from typing import Dict, Any
+from industry_news.deadline import current_deadline
 
 T = TypeVar("T")
 RETRIES = 3
@@ -58,11 +59,14 @@ def retry(
     delay_range_s: Tuple[float, float],
     retries: int = RETRIES,
 ) -> T:
+    """Stops retrying once the current deadline is about to expire."""
     for _ in range(retries - 1):
         try:
             return func()
         except Exception as e:
             logging.exception(e)
+            if current_deadline().expired(reserve_s=delay_range_s[1]):
+                break
             delay_random(delay_range_s)
     return func()
 
@@ -0,0 +1,200 @@
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Sequence
+from urllib.parse import urlparse
+
+import pytest
+from langchain_openai import ChatOpenAI
+
+import industry_news.llm
+from industry_news.config import (
+    FilterModelConfig,
+    LLMRoutingConfig,
+    LocalClassifierConfig,
+    PreRankingConfig,
+)
+from industry_news.digest.article import ArticleMetadata
+from industry_news.digest.pre_ranking import PreRanking
+from industry_news.llm import (
+    ArticleFiltering,
+    FilterArticlesResponse,
+    TitlesChunk,
+)
+from industry_news.relevance_classifier import LocalRelevanceFilter
+from industry_news.sources import Source
+
+_ARTICLE_COUNT = 12_000
+_LINE_NUMBER = re.compile(r"^(\d+)\. ")
+
+
+class _WordEncoding:
+    """Counts words instead of downloading tiktoken's encodings."""
+
+    def encode_ordinary_batch(self, texts: Sequence[str]) -> List[List[str]]:
+        return [text.split() for text in texts]
+
+
+class _OfflineChatOpenAI(ChatOpenAI):
+    def get_num_tokens(self, text: str) -> int:
+        return len(text.split())
+
+
+@pytest.fixture
+def filtering(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> ArticleFiltering:
+    return _filtering(monkeypatch, tmp_path, PreRankingConfig())
+
+
+def _filtering(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    pre_ranking: PreRankingConfig,
+) -> ArticleFiltering:
+    monkeypatch.setattr(
+        industry_news.llm, "_encoding", lambda model_name: _WordEncoding()
+    )
+    config = FilterModelConfig(
+        name="gpt-4o-2024-05-13",
+        # Enough for every title to get a chunk.
+        query_cost_limit_usd=Decimal(1000),
+        prompt_to_completion_len_ratio=0.5,
+        context_size_limit=16_000,
+    )
+    return ArticleFiltering(
+        config=config,
+        prompt_dir=Path("ai") / "prompts",
+        openai_factory=lambda backend: _OfflineChatOpenAI(
+            model_name=backend.model, openai_api_key="test"
+        ),
+        pre_ranking=PreRanking(pre_ranking),
+        local_filter=LocalRelevanceFilter(
+            LocalClassifierConfig(), data_dir=tmp_path, digest_name="test"
+        ),
+        routing=LLMRoutingConfig(),
+    )
+
+
+def _articles() -> List[ArticleMetadata]:
+    """Every 10th title repeats an earlier one, many contain periods and
+    numbers followed by one, like the numbered lines of a chunk."""
+    published = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    titles: List[str] = [
+        f"Article {index % 10 * 1000 + index // 10}. Version 1.{index} out"
+        if index % 3
+        else f"{index}. Show HN: A tool, v2.{index}... Really."
+        for index in range(_ARTICLE_COUNT)
+    ]
+    for index in range(0, _ARTICLE_COUNT, 10):
+        titles[index] = titles[index // 2]
+    return [
+        ArticleMetadata(
+            title=title,
+            source=Source.HACKER_NEWS,
+            url=urlparse(f"https://example.com/{index}"),
+            publication_date_utc=published - timedelta(minutes=index),
+            score=index,
+        )
+        for index, title in enumerate(titles)
+    ]
+
+
+def _numbered_lines(chunk: TitlesChunk) -> List[str]:
+    """Lines of a chunk without their numbers, checking the numbering."""
+    lines: List[str] = []
+    for expected_number, line in enumerate(
+        chunk.text.split(os.linesep), start=1
+    ):
+        match = _LINE_NUMBER.match(line)
+        assert match is not None and int(match[1]) == expected_number
+        lines.append(line[match.end():])
+    return lines
+
+
+def test_chunks_cover_every_article_once_in_order(
+    filtering: ArticleFiltering,
+) -> None:
+    articles: List[ArticleMetadata] = _articles()
+
+    chunks: List[TitlesChunk] = filtering._titles_to_chunks(
+        articles, Source.HACKER_NEWS
+    )
+
+    assert len(chunks) > 1
+    assert [index for chunk in chunks for index in chunk.article_indices] == (
+        list(range(len(articles)))
+    )
+    for chunk in chunks:
+        assert _numbered_lines(chunk) == [
+            articles[index].description() for index in chunk.article_indices
+        ]
+
+
+def test_selected_lines_map_back_to_their_articles(
+    filtering: ArticleFiltering,
+) -> None:
+    articles: List[ArticleMetadata] = _articles()
+    chunks: List[TitlesChunk] = filtering._titles_to_chunks(
+        articles, Source.HACKER_NEWS
+    )
+
+    selected: List[int] = []
+    for chunk in chunks:
+        # Every third line, plus a duplicated title's line and one that
+        # doesn't exist.
+        line_numbers: List[int] = list(range(1, len(chunk) + 1, 3))
+        duplicates: List[int] = [
+            line_number
+            for line_number in range(1, len(chunk) + 1)
+            if chunk.article_index(line_number) % 10 == 0
+        ]
+        line_numbers += duplicates[:1]
+        response = FilterArticlesResponse(
+            relevant_articles=line_numbers + [len(chunk) + 1],
+            reasonings=[f"line {number}" for number in range(1, len(chunk))],
+        )
+
+        reasons: Dict[int, str] = ArticleFiltering._filter_titles_chunk(
+            chunk, response
+        )
+
+        assert set(reasons) == {
+            chunk.article_index(number) for number in line_numbers
+        }
+        for number in line_numbers:
+            expected: str = f"line {number}" if number < len(chunk) else ""
+            assert reasons[chunk.article_index(number)] == expected
+        selected += reasons
+
+    assert len(set(selected)) > _ARTICLE_COUNT // 3
+    # Duplicated titles map to their own articles, not to the first one.
+    assert {index for index in selected if index % 10 == 0} - {0}
+
+
+def test_streamed_articles_are_shortlisted_before_counting_tokens(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    filtering: ArticleFiltering = _filtering(
+        monkeypatch, tmp_path, PreRankingConfig(top_k=50)
+    )
+    articles: List[ArticleMetadata] = _articles()
+
+    shortlisted: List[ArticleMetadata] = []
+    batches: int = 0
+    for start in range(0, len(articles), 200):
+        batches += 1
+        shortlisted = filtering.shortlist(
+            shortlisted, articles[start:start + 200]
+        )
+        assert len(shortlisted) == 50
+
+    # Only articles that made it into a shortlist are counted, even when
+    # each batch displaces the whole shortlist.
+    assert len(filtering._description_tokens) <= 50 * batches
+    assert articles[-1].url in {article.url for article in shortlisted}
+    assert {
+        article.description() for article in shortlisted
+    } <= filtering._description_tokens.keys()
@@ -0,0 +1,154 @@
+import time
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+import pytest
+
+from industry_news.config import LLMBackendConfig, LLMRoutingConfig
+from industry_news.deadline import Deadline, deadline_scope
+from industry_news.llm_routing import LLMRouter, NoBackendAvailable
+
+_TIMEOUT_S = 5.0
+
+
+class _RateLimitError(Exception):
+    status_code = 429
+
+
+class _Backends:
+    """Stand-ins for backends answering with their label, or failing with
+    queued errors first."""
+
+    def __init__(self) -> None:
+        self.calls: List[str] = []
+        self.errors: Dict[str, List[Exception]] = {}
+
+    def __call__(self, label: str) -> str:
+        self.calls.append(label)
+        errors: List[Exception] = self.errors.get(label, [])
+        if errors:
+            raise errors.pop(0)
+        return label
+
+
+def _router(
+    *budgets_usd: Optional[Decimal], **routing: float
+) -> LLMRouter:
+    """Backends `a`, `b`, ... with the given budgets."""
+    return LLMRouter(
+        [
+            LLMBackendConfig(
+                provider="openai",
+                model=chr(ord("a") + index),
+                budget_usd=budget,
+            )
+            for index, budget in enumerate(budgets_usd)
+        ],
+        LLMRoutingConfig(**routing),
+    )
+
+
+def _call(
+    router: LLMRouter,
+    backends: Callable[[str], str],
+    cost_usd: Decimal = Decimal(0),
+) -> str:
+    return router.call(backends, _TIMEOUT_S, cost_usd=cost_usd)
+
+
+def test_falls_back_to_the_next_backend_on_errors() -> None:
+    router = _router(None, None)
+    backends = _Backends()
+    backends.errors["openai:a"] = [RuntimeError("down")]
+
+    assert _call(router, backends) == "openai:b"
+    assert backends.calls == ["openai:a", "openai:b"]
+    assert router.health("openai:a").error_rate > 0.0
+    assert router.health("openai:b").latency_s is not None
+
+
+def test_raises_the_last_error_if_every_backend_fails() -> None:
+    router = _router(None, None)
+    backends = _Backends()
+    backends.errors["openai:a"] = [RuntimeError("a down")]
+    backends.errors["openai:b"] = [RuntimeError("b down")]
+
+    with pytest.raises(RuntimeError, match="b down"):
+        _call(router, backends)
+
+
+def test_retries_rate_limited_requests_once_the_backend_is_unpaused() -> None:
+    router = _router(Decimal(1), rate_limit_pause_s=0.05)
+    backends = _Backends()
+    backends.errors["openai:a"] = [_RateLimitError()]
+
+    started_s: float = time.monotonic()
+    assert _call(router, backends, cost_usd=Decimal("0.1")) == "openai:a"
+
+    assert backends.calls == ["openai:a", "openai:a"]
+    assert time.monotonic() - started_s >= 0.05
+    # The rejected request isn't charged.
+    assert router.health("openai:a").spent_usd == Decimal("0.1")
+    assert router.health("openai:a").consecutive_failures == 0
+
+
+def test_gives_up_after_rate_limit_retries() -> None:
+    router = _router(None, rate_limit_pause_s=0.0, rate_limit_retries=2)
+    backends = _Backends()
+    backends.errors["openai:a"] = [_RateLimitError() for _ in range(3)]
+
+    with pytest.raises(_RateLimitError):
+        _call(router, backends)
+    assert len(backends.calls) == 3
+
+
+def test_failing_backends_cool_down_and_are_tried_again_after() -> None:
+    router = _router(None, None, failures_to_cool_down=2, cooldown_s=0.1)
+    backends = _Backends()
+    # `a` stays preferred by its latency unless it's cooling down.
+    router.health("openai:b").latency_s = 1000.0
+    assert _call(router, backends) == "openai:a"
+
+    backends.errors["openai:a"] = [RuntimeError("down"), RuntimeError("down")]
+    assert _call(router, backends) == "openai:b"
+    assert _call(router, backends) == "openai:b"
+    assert router.health("openai:a").cooled_down_until > 0.0
+    backends.calls.clear()
+    assert _call(router, backends) == "openai:b"
+    assert backends.calls == ["openai:b"]
+
+    time.sleep(0.1)
+    assert _call(router, backends) == "openai:a"
+    assert router.health("openai:a").consecutive_failures == 0
+
+
+def test_backends_over_budget_are_skipped() -> None:
+    router = _router(Decimal("1.0"), None)
+    backends = _Backends()
+
+    assert _call(router, backends, cost_usd=Decimal("0.6")) == "openai:a"
+    assert _call(router, backends, cost_usd=Decimal("0.6")) == "openai:b"
+    assert router.health("openai:a").spent_usd == Decimal("0.6")
+    assert router.health("openai:b").spent_usd == Decimal("0.6")
+
+
+def test_raises_if_no_backend_has_budget_left() -> None:
+    router = _router(Decimal("0.5"))
+    backends = _Backends()
+
+    with pytest.raises(NoBackendAvailable):
+        _call(router, backends, cost_usd=Decimal("0.6"))
+    assert backends.calls == []
+
+
+def test_nothing_is_sent_or_charged_past_the_deadline() -> None:
+    router = _router(Decimal(1))
+    backends = _Backends()
+
+    with deadline_scope(Deadline.after(0.0)):
+        with pytest.raises(NoBackendAvailable):
+            _call(router, backends, cost_usd=Decimal("0.5"))
+
+    assert backends.calls == []
+    assert router.health("openai:a").spent_usd == Decimal(0)
+    assert router.health("openai:a").reserved_usd == Decimal(0)